@@ -0,0 +1,75 @@
+import os
+import pandas as pd
+
+import benchmarking.benchmark_python as bp
+import benchmarking.methods as mt
+import benchmarking.slides as sld
+
+# Placement policies understood by the harness affinity= option, see
+# stream_cpu_set() in benchmarking.cpp. "cap" additionally takes cores=N.
+AFFINITY_POLICIES = ["none", "core", "packed", "spread", "cap"]
+
+# Physical cores the "cap" policy confines all streams to
+CAP_CORES = 2
+
+
+def affinity_label(policy, cap_cores):
+    return f"cap:{cap_cores}" if policy == "cap" else policy
+
+
+def run_affinity_sweep(
+    input_path,
+    max_streams,
+    exe,
+    project_absolute_path,
+    results_absolute_path,
+    slides_config,
+    plots_folder,
+    method_ids=None,
+    policies=None,
+    cap_cores=CAP_CORES,
+):
+    """Run every affinity policy against every stream count; the policy is
+    recorded in the "affinity" column of the results."""
+    method_ids = method_ids or mt.high_profile_method_ids()
+    policies = policies or AFFINITY_POLICIES
+    stream_steps = bp.generate_stream_runs(max_streams)
+    print(f"Affinity policies to test: {policies}, streams to test: {stream_steps}")
+
+    all_results = []
+    for policy in policies:
+        harness_options = {
+            "methods": ",".join(str(m) for m in method_ids),
+            "affinity": policy,
+        }
+        if policy == "cap":
+            harness_options["cores"] = cap_cores
+
+        for s in stream_steps:
+            df, _ = bp.run_benchmark(
+                input_path,
+                s,
+                project_absolute_path,
+                results_absolute_path,
+                exe=exe,
+                harness_options=harness_options,
+            )
+            if df.empty:
+                print(f"Warning: No data returned for streams={s}, affinity={policy}")
+                continue
+            df["affinity"] = affinity_label(policy, cap_cores)
+            all_results.append(df)
+
+    if not all_results:
+        print("No affinity sweep results collected!")
+        return pd.DataFrame()
+
+    df_affinity = pd.concat(all_results, ignore_index=True)
+    csv_path = os.path.join(plots_folder, "affinity_results.csv")
+    df_affinity.to_csv(csv_path, index=False)
+    print(f"Saved affinity sweep results: {csv_path}")
+
+    sld.produce_affinity_slides(
+        df_affinity, slides_config, "affinity_slides.pptx", plots_folder
+    )
+    return df_affinity
@@ -4,6 +4,9 @@ import os
 
 import benchmarking.slides as sld
 
+# Decoder thread counts explored by the grid sweep, 0 = auto (FFmpeg picks based on CPU cores)
+THREAD_SWEEP = [1, 2, 4, 0]
+
 
 def generate_stream_runs(max_streams):
     base = [x for x in [1, 3, 5] if x <= max_streams]
@@ -18,16 +21,28 @@ def run_benchmark(
     project_absolute_path,
     results_absolute_path,
     exe,
+    do_print=0,
+    options=None,
+    harness_options=None,
 ):
+    # options reach every extractor and are recorded as result columns,
+    # harness_options (methods=, frames=, cache=, ...) only steer benchmarking.cpp
+    options = options or {}
+    harness_options = harness_options or {}
     print(f"Running benchmark with {streams} streams...")
+    cmd = [
+        exe,
+        input_file,
+        str(streams),
+        results_absolute_path,
+        project_absolute_path,
+        str(do_print),
+    ]
+    cmd += [f"{key}={value}" for key, value in options.items()]
+    cmd += [f"{key}={value}" for key, value in harness_options.items()]
+
     result = subprocess.run(
-        [
-            exe,
-            input_file,
-            str(streams),
-            results_absolute_path,
-            project_absolute_path,
-        ],
+        cmd,
         stdout=subprocess.PIPE,
         stderr=subprocess.PIPE,
         encoding="utf-8",
@@ -35,7 +50,11 @@ def run_benchmark(
     if result.returncode != 0:
         print(f"Error running benchmark: {result.stderr}")
         return pd.DataFrame(), result.stdout
-    return parse_output(result.stdout, streams), result.stdout
+
+    df = parse_output(result.stdout, streams)
+    for key, value in options.items():
+        df[key] = value
+    return df, result.stdout
 
 
 def parse_output(output_text, stream_count):
@@ -61,6 +80,9 @@ def parse_output(output_text, stream_count):
                 mvs = int(parts[5])
                 frames = int(parts[6])
                 high_profile = parts[7]
+                min_stream_fps = float(parts[8]) if len(parts) > 8 else None
+                run_order = int(parts[9]) if len(parts) > 9 else None
+                input_cache = parts[10] if len(parts) > 10 else None
                 results.append(
                     {
                         "method": method,
@@ -72,6 +94,9 @@ def parse_output(output_text, stream_count):
                         "mvs": mvs,
                         "frames": frames,
                         "high_profile": high_profile,
+                        "min_stream_fps": min_stream_fps,
+                        "run_order": run_order,
+                        "input_cache": input_cache,
                     }
                 )
             except Exception:
@@ -79,6 +104,24 @@ def parse_output(output_text, stream_count):
     return pd.DataFrame(results)
 
 
+def parse_stat_lines(output_text, stat_name):
+    """Collect "STAT <name> key=value ..." lines printed by the extractors."""
+    rows = []
+    for line in output_text.split("\n"):
+        parts = line.strip().split()
+        if len(parts) < 2 or parts[0] != "STAT" or parts[1] != stat_name:
+            continue
+        row = {}
+        for token in parts[2:]:
+            key, _, value = token.partition("=")
+            try:
+                row[key] = float(value)
+            except ValueError:
+                row[key] = value
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
 def run_all(
     input_path,
     max_streams,
@@ -87,22 +130,33 @@ def run_all(
     results_absolute_path,
     slides_config,
     plots_folder,
+    thread_counts=None,
 ):
     stream_steps = generate_stream_runs(max_streams)
     print(f"Stream ranges to test: {stream_steps}")
 
+    # Grid sweep: every decoder thread count is run against every stream count
+    thread_steps = thread_counts if thread_counts else [None]
+    if thread_counts:
+        print(f"Decoder thread counts to test: {thread_counts} (0 = auto)")
+
     all_results = []
-    for s in stream_steps:
-        df, _ = run_benchmark(
-            input_path,
-            s,
-            project_absolute_path,
-            results_absolute_path,
-            exe=exe,
-        )
-        if df.empty:
-            print(f"Warning: No data returned for streams={s}")
-        all_results.append(df)
+    for t in thread_steps:
+        options = {"threads": t} if t is not None else None
+        for n, s in enumerate(stream_steps):
+            df, _ = run_benchmark(
+                input_path,
+                s,
+                project_absolute_path,
+                results_absolute_path,
+                exe=exe,
+                options=options,
+                # A different method goes first at each stream count
+                harness_options={"rotate": n},
+            )
+            if df.empty:
+                print(f"Warning: No data returned for streams={s}, threads={t}")
+            all_results.append(df)
 
     full_df = pd.concat(all_results, ignore_index=True)
 
@@ -118,11 +172,23 @@ def run_all(
         print("No high profile algorithms found in results!")
         return full_df
 
+    df_grid = None
+    if thread_counts:
+        # Frames decoded per fully used core, so 400% CPU at 200 FPS scores 50
+        df_hp["cpu_efficiency"] = df_hp["fps"] / (df_hp["cpu"] / 100.0).where(
+            df_hp["cpu"] > 0
+        )
+        df_grid = df_hp
+        # Regular charts keep showing the default (auto) decoder threading
+        default_threads = 0 if 0 in thread_counts else thread_counts[0]
+        df_hp = df_hp[df_hp["threads"] == default_threads].copy()
+
     sld.produce_slides(
         df_hp,
         slides_config,
         "benchmark_comparison_slides_high_profile.pptx",
         plots_folder,
+        df_grid=df_grid,
     )
 
 
@@ -135,6 +201,7 @@ def benchmark(
     slides_config_path,
     plots_folder,
     exe,
+    thread_counts=None,
 ):
     exe_fullpath = os.path.join(executable_absolute_path, exe)
 
@@ -146,4 +213,5 @@ def benchmark(
         results_absolute_path,
         slides_config_path,
         plots_folder,
+        thread_counts=thread_counts,
     )
@@ -10,10 +10,18 @@
 #include <cstdio>
 #include <cerrno>
 #include <iomanip>
+#include <algorithm>
+#include <map>
+#include <utility>
+#include <sched.h>
+#include <fcntl.h>
 #include <unistd.h>
 #include <sys/time.h>
 #include <sys/resource.h>
 #include <sys/wait.h>
+#ifdef HAVE_ZSTD
+#include <zstd.h>
+#endif
 
 struct MethodInfo {
     std::string name;
@@ -32,6 +40,21 @@ struct BenchmarkResult {
     int total_motion_vectors = 0;
     int frame_count = 0;
     int supports_high_profile = 0;
+    double min_stream_fps = 0; // FPS of the slowest stream, compared against the source frame rate
+    int run_order = 0; // position of the method in this run (1 = ran first)
+    std::string input_cache = "asis";
+};
+
+struct HarnessOptions {
+    std::vector<std::string> extractor_args; // key=value options forwarded to every extractor (e.g. threads=2)
+    std::vector<int> method_ids; // methods=0,6 runs only those extractors, empty runs all
+    int frames_per_stream = 298;
+    int port_base = 18554; // stream i reads from port port_base + i when the input contains {port}
+    std::string affinity = "none"; // none | core | packed | spread | cap, see stream_cpu_set()
+    int affinity_cores = 0; // cores=N for affinity=cap, 0 = all physical cores
+    std::string input_cache = "asis"; // cache=cold|warm evicts / pre-reads the input before each method
+    int rotate = 0; // rotate=K starts the method order at the K-th selected method
+    std::string output_format = "csv"; // format= is also forwarded; it picks the output extension
 };
 
 std::vector<MethodInfo> methods = {
@@ -54,6 +77,29 @@ double now_ms() {
     return 1000.0 * tv.tv_sec + tv.tv_usec / 1000.0;
 }
 
+// Counts the vectors and frames of CSV lines fed one at a time; the first line is the header
+struct CsvRowCounter {
+    int* frames;
+    int* mvs;
+    int last = -1;
+    bool header = true;
+
+    void line(const char* text) {
+        if (header) {
+            header = false;
+            return;
+        }
+        int frame = -1;
+        if (sscanf(text, "%d", &frame) == 1) {
+            (*mvs)++;
+            if (frame != last) {
+                (*frames)++;
+                last = frame;
+            }
+        }
+    }
+};
+
 void parse_csv(const std::string& fname, int* frames, int* mvs) {
     std::ifstream file(fname);
     
@@ -62,35 +108,291 @@ void parse_csv(const std::string& fname, int* frames, int* mvs) {
         return;
     }
 
+    CsvRowCounter counter{frames, mvs};
     std::string line;
-    int last = -1;
-    
-    if (!std::getline(file, line))
+    while (std::getline(file, line))
+        counter.line(line.c_str());
+}
+
+// format=zstd output: the CSV decompressed in chunks, never held whole in memory
+void parse_csv_zst(const std::string& fname, int* frames, int* mvs) {
+#ifdef HAVE_ZSTD
+    FILE* file = fopen(fname.c_str(), "rb");
+    if (!file) {
+        fprintf(stderr, "Warning: cannot open zstd file '%s': %s\n", fname.c_str(), strerror(errno));
         return;
-        
-    while (std::getline(file, line)) {
-        std::istringstream iss(line);
-        int frame = -1;
-        if (iss >> frame) {
-            (*mvs)++;
-            if (frame != last) {
-                (*frames)++;
-                last = frame;
+    }
+
+    ZSTD_DCtx* dctx = ZSTD_createDCtx();
+    std::vector<char> in(ZSTD_DStreamInSize()), out(ZSTD_DStreamOutSize());
+    CsvRowCounter counter{frames, mvs};
+    std::string pending;
+    size_t read;
+    while ((read = fread(in.data(), 1, in.size(), file)) > 0) {
+        ZSTD_inBuffer input = {in.data(), read, 0};
+        while (input.pos < input.size) {
+            ZSTD_outBuffer output = {out.data(), out.size(), 0};
+            size_t ret = ZSTD_decompressStream(dctx, &output, &input);
+            if (ZSTD_isError(ret)) {
+                fprintf(stderr, "Warning: corrupt zstd file '%s': %s\n", fname.c_str(), ZSTD_getErrorName(ret));
+                ZSTD_freeDCtx(dctx);
+                fclose(file);
+                return;
             }
+            pending.append(out.data(), output.pos);
+            size_t start = 0, end;
+            while ((end = pending.find('\n', start)) != std::string::npos) {
+                pending[end] = '\0';
+                counter.line(pending.c_str() + start);
+                start = end + 1;
+            }
+            pending.erase(0, start);
+        }
+    }
+    if (!pending.empty())
+        counter.line(pending.c_str());
+    ZSTD_freeDCtx(dctx);
+    fclose(file);
+#else
+    (void)frames;
+    (void)mvs;
+    fprintf(stderr, "Warning: cannot count '%s': the harness was built without zstd\n", fname.c_str());
+#endif
+}
+
+// format=binary output: "MVB1" then packed 40-byte rows (MotionVectorRecord in
+// extractors/writer.h) starting with the int32 frame number
+void parse_mvb(const std::string& fname, int* frames, int* mvs) {
+    const size_t kMagicSize = 4, kRecordSize = 40;
+    FILE* file = fopen(fname.c_str(), "rb");
+    if (!file) {
+        fprintf(stderr, "Warning: cannot open binary file '%s': %s\n", fname.c_str(), strerror(errno));
+        return;
+    }
+
+    std::vector<char> records(kRecordSize * 4096);
+    int last = -1;
+    size_t read;
+    if (fseek(file, kMagicSize, SEEK_SET) == 0) {
+        while ((read = fread(records.data(), kRecordSize, 4096, file)) > 0) {
+            for (size_t r = 0; r < read; ++r) {
+                int32_t frame;
+                memcpy(&frame, records.data() + r * kRecordSize, sizeof(frame));
+                (*mvs)++;
+                if (frame != last) {
+                    (*frames)++;
+                    last = frame;
+                }
+            }
+        }
+    }
+    fclose(file);
+}
+
+// Frames and vectors of one stream's output; null and shm leave nothing to count
+void parse_output(const std::string& fname, const HarnessOptions& opts, int* frames, int* mvs) {
+    if (opts.output_format == "csv")
+        parse_csv(fname, frames, mvs);
+    else if (opts.output_format == "zstd")
+        parse_csv_zst(fname, frames, mvs);
+    else if (opts.output_format == "binary")
+        parse_mvb(fname, frames, mvs);
+}
+
+// Output file of one stream: .csv, .csv.zst or .mvb by format= (format=null writes to /dev/null).
+// format=shm publishes to the shared-memory ring "/<output>_<stream>" instead.
+std::string output_filename(const std::string& dir, const MethodInfo& m, int stream, const HarnessOptions& opts) {
+    if (opts.output_format == "shm")
+        return "/" + m.output_csv + "_" + std::to_string(stream);
+    const char* ext = ".csv";
+    if (opts.output_format == "zstd")
+        ext = ".csv.zst";
+    else if (opts.output_format == "binary")
+        ext = ".mvb";
+    return dir + "/" + m.output_csv + "_" + std::to_string(stream) + ext;
+}
+
+int method_id(const MethodInfo& m) {
+    int id = -1;
+    sscanf(m.output_csv.c_str(), "method%d_output", &id);
+    return id;
+}
+
+HarnessOptions parse_harness_options(int argc, char** argv, int first) {
+    HarnessOptions opts;
+    for (int i = first; i < argc; ++i) {
+        const char* eq = strchr(argv[i], '=');
+        if (!eq) {
+            fprintf(stderr, "Ignoring malformed option '%s' (expected key=value)\n", argv[i]);
+            continue;
+        }
+        std::string key(argv[i], eq - argv[i]);
+        std::string value(eq + 1);
+
+        if (key == "methods") {
+            std::istringstream ids(value);
+            std::string id;
+            while (std::getline(ids, id, ','))
+                opts.method_ids.push_back(std::atoi(id.c_str()));
+        }
+        else if (key == "frames") {
+            opts.frames_per_stream = std::atoi(value.c_str());
+        }
+        else if (key == "port_base") {
+            opts.port_base = std::atoi(value.c_str());
+        }
+        else if (key == "affinity") {
+            opts.affinity = value;
+        }
+        else if (key == "cores") {
+            opts.affinity_cores = std::atoi(value.c_str());
+        }
+        else if (key == "cache") {
+            opts.input_cache = value;
+        }
+        else if (key == "rotate") {
+            opts.rotate = std::atoi(value.c_str());
+        }
+        else if (key == "format") {
+            opts.output_format = value;
+            opts.extractor_args.push_back(argv[i]);
+        }
+        else {
+            opts.extractor_args.push_back(argv[i]);
+        }
+    }
+    return opts;
+}
+
+bool method_selected(const MethodInfo& m, const HarnessOptions& opts) {
+    if (opts.method_ids.empty())
+        return true;
+    for (int id : opts.method_ids)
+        if (id == method_id(m))
+            return true;
+    return false;
+}
+
+int read_topology_id(int cpu, const char* name) {
+    char path[128];
+    snprintf(path, sizeof(path), "/sys/devices/system/cpu/cpu%d/topology/%s", cpu, name);
+    std::ifstream file(path);
+    int id = -1;
+    if (!(file >> id))
+        return cpu; // no topology info, treat every CPU as its own core
+    return id;
+}
+
+// Logical CPUs the harness may run on, grouped by physical core (SMT siblings together)
+std::vector<std::vector<int>> physical_cores() {
+    cpu_set_t allowed;
+    CPU_ZERO(&allowed);
+    if (sched_getaffinity(0, sizeof(allowed), &allowed) != 0) {
+        perror("sched_getaffinity failed");
+        return {};
+    }
+
+    std::map<std::pair<int, int>, std::vector<int>> cores;
+    for (int cpu = 0; cpu < CPU_SETSIZE; ++cpu) {
+        if (CPU_ISSET(cpu, &allowed))
+            cores[{ read_topology_id(cpu, "physical_package_id"), read_topology_id(cpu, "core_id") }].push_back(cpu);
+    }
+
+    std::vector<std::vector<int>> result;
+    for (auto& core : cores)
+        result.push_back(core.second);
+    return result;
+}
+
+// CPUs stream i may run on:
+//   core   - one whole physical core (with its SMT siblings) per stream
+//   packed - one logical CPU per stream, filling both SMT siblings of a core before the next core
+//   spread - one logical CPU per stream, one per physical core before reusing SMT siblings
+//   cap    - every stream shares the first N physical cores (cores=N), like a cgroup cpuset
+// Streams wrap around when there are more streams than slots, which is the oversubscribed case.
+bool stream_cpu_set(const HarnessOptions& opts, const std::vector<std::vector<int>>& cores, int stream, cpu_set_t* set) {
+    if (opts.affinity == "none" || cores.empty())
+        return false;
+
+    CPU_ZERO(set);
+    if (opts.affinity == "core") {
+        for (int cpu : cores[stream % cores.size()])
+            CPU_SET(cpu, set);
+    }
+    else if (opts.affinity == "packed" || opts.affinity == "spread") {
+        std::vector<int> order;
+        size_t max_siblings = 0;
+        for (const auto& core : cores)
+            max_siblings = std::max(max_siblings, core.size());
+        if (opts.affinity == "packed") {
+            for (const auto& core : cores)
+                order.insert(order.end(), core.begin(), core.end());
+        }
+        else {
+            for (size_t t = 0; t < max_siblings; ++t)
+                for (const auto& core : cores)
+                    if (t < core.size())
+                        order.push_back(core[t]);
+        }
+        CPU_SET(order[stream % order.size()], set);
+    }
+    else if (opts.affinity == "cap") {
+        size_t n = (opts.affinity_cores > 0) ? std::min<size_t>(opts.affinity_cores, cores.size()) : cores.size();
+        for (size_t c = 0; c < n; ++c)
+            for (int cpu : cores[c])
+                CPU_SET(cpu, set);
+    }
+    else {
+        fprintf(stderr, "Unknown affinity policy '%s', leaving placement to the scheduler\n", opts.affinity.c_str());
+        return false;
+    }
+    return true;
+}
+
+// cold: drop the input's pages from the page cache, warm: read it through once,
+// so every method starts from the same cache state instead of the previous method's
+void prepare_input_cache(const std::string& video_file, const std::string& mode) {
+    if (mode == "asis")
+        return;
+    if (mode != "cold" && mode != "warm") {
+        fprintf(stderr, "Unknown cache mode '%s', leaving the page cache as is\n", mode.c_str());
+        return;
+    }
+
+    int fd = open(video_file.c_str(), O_RDONLY);
+    if (fd < 0) {
+        fprintf(stderr, "Cannot open '%s' to make it %s: %s\n", video_file.c_str(), mode.c_str(), strerror(errno));
+        return;
+    }
+
+    if (mode == "cold") {
+        int err = posix_fadvise(fd, 0, 0, POSIX_FADV_DONTNEED);
+        if (err != 0)
+            fprintf(stderr, "posix_fadvise(DONTNEED) failed: %s\n", strerror(err));
+    }
+    else {
+        posix_fadvise(fd, 0, 0, POSIX_FADV_WILLNEED);
+        std::vector<char> buf(1 << 20);
+        while (read(fd, buf.data(), buf.size()) > 0) {
         }
     }
+    close(fd);
 }
 
-BenchmarkResult run_benchmark_parallel(const MethodInfo& m, const std::string& video_file, int par_streams, int do_print, std::string& absolute_path, std::string& current_dir) {
+BenchmarkResult run_benchmark_parallel(const MethodInfo& m, const std::string& video_file, int par_streams, int do_print, std::string& absolute_path, std::string& current_dir, const HarnessOptions& opts) {
     BenchmarkResult r;
     r.name = m.name;
     r.supports_high_profile = m.supports_high_profile;
+    r.input_cache = opts.input_cache;
+    prepare_input_cache(video_file, opts.input_cache);
     printf("Starting %d parallel streams for method: %s\n", par_streams, m.name.c_str());
     double t_start = now_ms();
 
     std::vector<pid_t> pids(par_streams);
     std::vector<int> statuses(par_streams);
     std::vector<struct rusage> usage(par_streams);
+    std::vector<double> t_child_end(par_streams, 0.0);
+    std::vector<std::vector<int>> cores = physical_cores();
 
     for (int i = 0; i < par_streams; ++i) {
         pid_t pid = fork();
@@ -99,14 +401,28 @@ BenchmarkResult run_benchmark_parallel(const MethodInfo& m, const std::string& v
             exit(1);
         }
         else if (pid == 0) {
-            char csv_filename[256];
-            snprintf(csv_filename, sizeof(csv_filename), "%s/%s_%d.csv", absolute_path.c_str(), m.output_csv.c_str(), i);
+            cpu_set_t cpus;
+            if (stream_cpu_set(opts, cores, i, &cpus) && sched_setaffinity(0, sizeof(cpus), &cpus) != 0)
+                perror("sched_setaffinity failed");
+
+            std::string output = output_filename(absolute_path, m, i, opts);
+            char* csv_filename = const_cast<char*>(output.c_str());
 
             std::string exe_str = current_dir + m.exe;
             char* exe = const_cast<char*>(exe_str.c_str());
-            char* video_file_input = const_cast<char*>(video_file.c_str());
+            // Per-stream inputs, e.g. rtsp://127.0.0.1:{port}/live for the RTSP loopback benchmark
+            std::string input = video_file;
+            size_t placeholder = input.find("{port}");
+            if (placeholder != std::string::npos)
+                input.replace(placeholder, strlen("{port}"), std::to_string(opts.port_base + i));
+            char* video_file_input = const_cast<char*>(input.c_str());
             std::string print_to_file = std::to_string(do_print);
-            execl(exe, exe, video_file_input, print_to_file.c_str(), csv_filename, nullptr);
+
+            std::vector<char*> args = { exe, video_file_input, const_cast<char*>(print_to_file.c_str()), csv_filename };
+            for (const std::string& arg : opts.extractor_args)
+                args.push_back(const_cast<char*>(arg.c_str()));
+            args.push_back(nullptr);
+            execv(exe, args.data());
 
             fprintf(stderr, "Child %d: exec failed for command %s %s: %s\n", i, m.exe.c_str(), video_file.c_str(), strerror(errno));
             exit(127);
@@ -116,21 +432,34 @@ BenchmarkResult run_benchmark_parallel(const MethodInfo& m, const std::string& v
             printf("Forked child %d with pid %d\n", i, pid);
         }
     }
-    for (int i = 0; i < par_streams; ++i) {
-        if (wait4(pids[i], &statuses[i], 0, &usage[i]) == -1) {
+    // Reap children in completion order so each stream's own wall time is known
+    for (int reaped = 0; reaped < par_streams; ++reaped) {
+        int status = 0;
+        struct rusage ru;
+        pid_t pid = wait4(-1, &status, 0, &ru);
+        if (pid == -1) {
             perror("wait4 failed");
-            statuses[i] = -1;
+            break;
+        }
+
+        int i = 0;
+        while (i < par_streams && pids[i] != pid)
+            i++;
+        if (i == par_streams)
+            continue;
+
+        statuses[i] = status;
+        usage[i] = ru;
+        t_child_end[i] = now_ms();
+
+        if (WIFEXITED(statuses[i])) {
+            printf("Child %d (pid %d) exited with code %d\n", i, pids[i], WEXITSTATUS(statuses[i]));
+        }
+        else if (WIFSIGNALED(statuses[i])) {
+            printf("Child %d (pid %d) killed by signal %d\n", i, pids[i], WTERMSIG(statuses[i]));
         }
         else {
-            if (WIFEXITED(statuses[i])) {
-                printf("Child %d (pid %d) exited with code %d\n", i, pids[i], WEXITSTATUS(statuses[i]));
-            }
-            else if (WIFSIGNALED(statuses[i])) {
-                printf("Child %d (pid %d) killed by signal %d\n", i, pids[i], WTERMSIG(statuses[i]));
-            }
-            else {
-                printf("Child %d (pid %d) ended abnormally\n", i, pids[i]);
-            }
+            printf("Child %d (pid %d) ended abnormally\n", i, pids[i]);
         }
     }
     double t_end = now_ms();
@@ -145,16 +474,26 @@ BenchmarkResult run_benchmark_parallel(const MethodInfo& m, const std::string& v
 
         double u_sec = usage[i].ru_utime.tv_sec + usage[i].ru_utime.tv_usec / 1e6;
         total_user_cpu_sec += u_sec;
-        char csv_filename[256];
-        snprintf(csv_filename, sizeof(csv_filename), "%s/%s_%d.csv", absolute_path.c_str(), m.output_csv.c_str(), i);
+        // format=null and format=shm keep no output to count
+        if (opts.output_format != "csv" && opts.output_format != "zstd" && opts.output_format != "binary")
+            continue;
+        std::string output = output_filename(absolute_path, m, i, opts);
         int frames = 0, mvs = 0;
-        parse_csv(csv_filename, &frames, &mvs);
-        printf("Parsed file '%s': frames=%d, mvs=%d\n", csv_filename, frames, mvs);
+        parse_output(output, opts, &frames, &mvs);
+        printf("Parsed file '%s': frames=%d, mvs=%d\n", output.c_str(), frames, mvs);
         total_mvs += mvs;
     }
-    // Fixed frames per stream as requested
-    int fixed_frames_per_stream = 298;
+    // Fixed frames per stream as requested (frames=N overrides it for other inputs)
+    int fixed_frames_per_stream = opts.frames_per_stream;
     int total_frames = fixed_frames_per_stream * par_streams;
+
+    double slowest_stream_ms = 0;
+    for (int i = 0; i < par_streams; ++i) {
+        double elapsed = (t_child_end[i] > 0 ? t_child_end[i] : t_end) - t_start;
+        if (elapsed > slowest_stream_ms)
+            slowest_stream_ms = elapsed;
+    }
+    r.min_stream_fps = (slowest_stream_ms > 0) ? fixed_frames_per_stream * 1000.0 / slowest_stream_ms : 0;
     r.total_time_ms = t_end - t_start;
     r.frame_count = total_frames;
     r.total_motion_vectors = total_mvs;
@@ -170,22 +509,23 @@ void print_complete_results(const std::vector<BenchmarkResult>& r, int par_strea
     printf("                                   COMPLETE MOTION VECTOR EXTRACTION BENCHMARK\n");
     printf("                              Streams per Method: %d\n", par_streams);
     printf("==========================================================================================================\n\n");
-    printf("%-30s | %-12s | %-6s | %-10s | %-9s | %-12s | %-8s | %s\n",
-        "Method", "Time/Frame", "FPS", "CPU Usage", "Mem Δ KB", "Total MVs", "Frames", "High Profile");
-    printf("------------------------------------------------------------------------------------------------------------\n");
+    printf("%-30s | %-12s | %-6s | %-10s | %-9s | %-12s | %-8s | %-12s | %-14s | %-9s | %s\n",
+        "Method", "Time/Frame", "FPS", "CPU Usage", "Mem Δ KB", "Total MVs", "Frames", "High Profile", "Min Stream FPS", "Run Order", "Input Cache");
+    printf("-----------------------------------------------------------------------------------------------------------------------------\n");
 
     for (int i = 0; i < r.size(); i++) {
-        printf("%-30s | %10.2f ms | %6.1f | %8.1f%% | %9ld | %10d | %8d | %d\n",
+        printf("%-30s | %10.2f ms | %6.1f | %8.1f%% | %9ld | %10d | %8d | %12d | %14.1f | %9d | %s\n",
             r[i].name.c_str(), r[i].avg_time_per_frame_ms, r[i].throughput_fps,
             r[i].cpu_usage_percent, r[i].memory_peak_kb,
             r[i].total_motion_vectors, r[i].frame_count,
-            r[i].supports_high_profile);
+            r[i].supports_high_profile, r[i].min_stream_fps,
+            r[i].run_order, r[i].input_cache.c_str());
     }
 }
 
 int main(int argc, char** argv) {
-    if (argc < 2 || argc > 6) {
-        fprintf(stderr, "Usage: %s <video_file_or_rtsp_url> [streams]\n", argv[0]);
+    if (argc < 5) {
+        fprintf(stderr, "Usage: %s <video_file_or_rtsp_url> <streams> <results_dir> <project_dir> [do_print] [key=value ...]\n", argv[0]);
         return 1;
     }
     std::string video_file = argv[1];
@@ -199,18 +539,38 @@ int main(int argc, char** argv) {
     if (argc >= 6)
         do_print = std::atoi(argv[5]);
 
+    HarnessOptions opts = parse_harness_options(argc, argv, 6);
+
     if (par_streams < 1 || par_streams > 100) {
         std::cerr << "Streams must be between 1 and 100." << std::endl;
         return 1;
     }
     std::vector<BenchmarkResult> results;
     printf("Starting benchmarking on: %s\n", video_file.c_str());
-    printf("Streams per method: %d\n\n", par_streams);
+    printf("Streams per method: %d\n", par_streams);
+    printf("Input cache: %s\n", opts.input_cache.c_str());
+    printf("Affinity policy: %s", opts.affinity.c_str());
+    if (opts.affinity == "cap")
+        printf(" (%d cores)", opts.affinity_cores);
+    printf("\n");
+    for (const std::string& arg : opts.extractor_args)
+        printf("Extractor option: %s\n", arg.c_str());
+    printf("\n");
+    std::vector<int> order;
     for (int i = 0; i < methods.size(); ++i) {
+        if (method_selected(methods[i], opts))
+            order.push_back(i);
+    }
+    // Rotating the order keeps the same method from always running first
+    if (!order.empty())
+        std::rotate(order.begin(), order.begin() + opts.rotate % order.size(), order.end());
+
+    for (int i : order) {
         printf("Running: %s\n", methods[i].name.c_str());
-        results.push_back(run_benchmark_parallel(methods[i], video_file, par_streams, do_print, absolute_path, current_dir));
+        results.push_back(run_benchmark_parallel(methods[i], video_file, par_streams, do_print, absolute_path, current_dir, opts));
+        results.back().run_order = results.size();
         printf("Done: %d frames, %.2f ms/frame, %.1f FPS\n\n",
-            results[i].frame_count, results[i].avg_time_per_frame_ms, results[i].throughput_fps);
+            results.back().frame_count, results.back().avg_time_per_frame_ms, results.back().throughput_fps);
     }
     print_complete_results(results, par_streams);
     return 0;
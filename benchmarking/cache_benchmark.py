@@ -0,0 +1,80 @@
+import os
+import pandas as pd
+
+import benchmarking.benchmark_python as bp
+import benchmarking.methods as mt
+import benchmarking.slides as sld
+
+# Harness cache= modes: cold evicts the input with posix_fadvise(DONTNEED)
+# before each method, warm reads it through once
+CACHE_MODES = ["cold", "warm"]
+
+
+def create_cold_penalty_table(df, streams):
+    sub = df[df["streams"] == streams]
+    cold = sub[sub["input_cache"] == "cold"].set_index("method")["time_per_frame"]
+    warm = sub[sub["input_cache"] == "warm"].set_index("method")["time_per_frame"]
+    tbl = pd.DataFrame({"Cold (ms/frame)": cold, "Warm (ms/frame)": warm}).dropna()
+    tbl["Cold Penalty (%)"] = 100.0 * (tbl["Cold (ms/frame)"] / tbl["Warm (ms/frame)"] - 1)
+    return tbl.reset_index().rename(columns={"method": "Method"}).round(2)
+
+
+def run_cache_benchmark(
+    input_path,
+    max_streams,
+    exe,
+    project_absolute_path,
+    results_absolute_path,
+    slides_config,
+    plots_folder,
+    method_ids=None,
+):
+    """Run every stream count with a cold and with a warm input page cache.
+
+    The method order is rotated at every stream count, so the run order is not
+    tied to one method; it is kept in the "run_order" column.
+    """
+    method_ids = method_ids or mt.high_profile_method_ids()
+    stream_steps = bp.generate_stream_runs(max_streams)
+
+    all_results = []
+    for n, s in enumerate(stream_steps):
+        for mode in CACHE_MODES:
+            df, _ = bp.run_benchmark(
+                input_path,
+                s,
+                project_absolute_path,
+                results_absolute_path,
+                exe=exe,
+                harness_options={
+                    "methods": ",".join(str(m) for m in method_ids),
+                    "cache": mode,
+                    "rotate": n,
+                },
+            )
+            if df.empty:
+                print(f"Warning: No data returned for streams={s}, cache={mode}")
+                continue
+            all_results.append(df)
+
+    if not all_results:
+        print("No cache benchmark results collected!")
+        return pd.DataFrame()
+
+    df_cache = pd.concat(all_results, ignore_index=True)
+    csv_path = os.path.join(plots_folder, "cache_results.csv")
+    df_cache.to_csv(csv_path, index=False)
+    print(f"Saved cold/warm cache results: {csv_path}")
+
+    # One line per method and cache state on the scaling charts
+    df_plot = df_cache.copy()
+    df_plot["method"] = df_plot["method"] + " (" + df_plot["input_cache"] + ")"
+    sld.produce_cache_slides(
+        df_plot,
+        create_cold_penalty_table(df_cache, stream_steps[-1]),
+        stream_steps[-1],
+        slides_config,
+        "cache_slides.pptx",
+        plots_folder,
+    )
+    return df_cache
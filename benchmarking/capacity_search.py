@@ -0,0 +1,166 @@
+import os
+import pandas as pd
+
+import benchmarking.benchmark_python as bp
+import benchmarking.methods as mt
+import benchmarking.slides as sld
+import utils.ffprobe as ffprobe
+
+# benchmarking.cpp refuses more than 100 streams per method
+MAX_SEARCH_STREAMS = 100
+
+
+def search_max_streams(is_sustainable, limit=MAX_SEARCH_STREAMS):
+    """Largest stream count in [0, limit] for which is_sustainable holds.
+
+    Doubles the stream count until a probe fails, then binary searches between
+    the last passing and the first failing count. Assumes that once a count is
+    unsustainable every higher count is too.
+    """
+    if not is_sustainable(1):
+        return 0
+
+    good = 1
+    bad = None
+    while good < limit:
+        candidate = min(good * 2, limit)
+        if is_sustainable(candidate):
+            good = candidate
+        else:
+            bad = candidate
+            break
+
+    if bad is None:
+        return good
+
+    while bad - good > 1:
+        mid = (good + bad) // 2
+        if is_sustainable(mid):
+            good = mid
+        else:
+            bad = mid
+    return good
+
+
+def find_method_capacity(
+    input_path,
+    method_id,
+    source,
+    target_fps,
+    exe,
+    project_absolute_path,
+    results_absolute_path,
+    limit=MAX_SEARCH_STREAMS,
+):
+    probes = {}
+
+    def is_sustainable(streams):
+        df, _ = bp.run_benchmark(
+            input_path,
+            streams,
+            project_absolute_path,
+            results_absolute_path,
+            exe=exe,
+            harness_options={"methods": method_id, "frames": source["frames"]},
+        )
+        if df.empty:
+            print(f"Warning: No data returned for method {method_id}, streams={streams}")
+            return False
+
+        row = df.iloc[0]
+        probes[streams] = row
+        sustained = row["min_stream_fps"] >= target_fps
+        print(
+            f"  {row['method']}: {streams} streams -> slowest stream "
+            f"{row['min_stream_fps']:.1f} FPS ({'OK' if sustained else 'too slow'})"
+        )
+        return sustained
+
+    max_streams = search_max_streams(is_sustainable, limit)
+    trials = pd.DataFrame(list(probes.values()))
+    best = probes.get(max_streams)
+    return max_streams, best, trials
+
+
+def create_capacity_table(df_capacity):
+    tbl = df_capacity[
+        ["method", "max_streams", "min_stream_fps", "fps", "cpu", "memory"]
+    ].copy()
+    tbl.columns = [
+        "Method",
+        "Streams per Host",
+        "Slowest Stream FPS",
+        "Total FPS",
+        "CPU (%)",
+        "Mem Δ KB",
+    ]
+    return tbl.sort_values("Streams per Host", ascending=False)
+
+
+def run_capacity_search(
+    input_path,
+    exe,
+    project_absolute_path,
+    results_absolute_path,
+    slides_config,
+    plots_folder,
+    method_ids=None,
+    headroom=1.0,
+    limit=MAX_SEARCH_STREAMS,
+):
+    """Find, per method, the most streams that all still decode in real time.
+
+    A stream count is sustainable when the slowest stream decodes at least
+    headroom x the source frame rate read from the container.
+    """
+    source = ffprobe.probe_video_stream(input_path)
+    target_fps = source["fps"] * headroom
+    method_ids = method_ids or mt.high_profile_method_ids()
+    print(
+        f"Source: {source['fps']:.2f} FPS, {source['frames']} frames; "
+        f"real-time target per stream: {target_fps:.2f} FPS"
+    )
+
+    rows = []
+    all_trials = []
+    for method_id in method_ids:
+        print(f"Searching capacity of {mt.METHODS[method_id]['name']}...")
+        max_streams, best, trials = find_method_capacity(
+            input_path,
+            method_id,
+            source,
+            target_fps,
+            exe,
+            project_absolute_path,
+            results_absolute_path,
+            limit,
+        )
+        all_trials.append(trials)
+
+        row = {
+            "method": mt.METHODS[method_id]["name"],
+            "max_streams": max_streams,
+            "source_fps": source["fps"],
+            "target_fps": target_fps,
+        }
+        for col in ["min_stream_fps", "fps", "cpu", "memory"]:
+            row[col] = best[col] if best is not None else 0
+        rows.append(row)
+        print(f"{row['method']}: {max_streams} streams per host")
+
+    df_capacity = pd.DataFrame(rows)
+
+    trials_path = os.path.join(plots_folder, "capacity_trials.csv")
+    pd.concat(all_trials, ignore_index=True).to_csv(trials_path, index=False)
+    csv_path = os.path.join(plots_folder, "capacity_results.csv")
+    df_capacity.to_csv(csv_path, index=False)
+    print(f"Saved capacity results: {csv_path}")
+
+    sld.produce_capacity_slides(
+        create_capacity_table(df_capacity),
+        target_fps,
+        slides_config,
+        "capacity_search_slides.pptx",
+        plots_folder,
+    )
+    return df_capacity
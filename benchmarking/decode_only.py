@@ -0,0 +1,92 @@
+import os
+import subprocess
+import pandas as pd
+
+import benchmarking.benchmark_python as bp
+import benchmarking.methods as mt
+import benchmarking.slides as sld
+
+# Shared memory, so all streams map the same page-cache copy of the packets
+SHM_DIR = "/dev/shm"
+
+
+def build_packet_cache(input_path, builder_exe, cache_path):
+    """Demux the input once with build_packet_cache."""
+    subprocess.run([str(builder_exe), str(input_path), str(cache_path)], check=True)
+    return cache_path
+
+
+def create_demux_share_table(df, streams):
+    sub = df[df["streams"] == streams]
+    e2e = sub[sub["variant"] == "end-to-end"].set_index("method")["time_per_frame"]
+    dec = sub[sub["variant"] == "decode-only"].set_index("method")["time_per_frame"]
+    tbl = pd.DataFrame({"End-to-End (ms/frame)": e2e, "Decode-Only (ms/frame)": dec}).dropna()
+    tbl["Demux + I/O (ms/frame)"] = tbl["End-to-End (ms/frame)"] - tbl["Decode-Only (ms/frame)"]
+    tbl["Demux + I/O (%)"] = 100.0 * tbl["Demux + I/O (ms/frame)"] / tbl["End-to-End (ms/frame)"]
+    return tbl.reset_index().rename(columns={"method": "Method"}).round(2)
+
+
+def run_decode_only_benchmark(
+    input_path,
+    max_streams,
+    exe,
+    builder_exe,
+    project_absolute_path,
+    results_absolute_path,
+    slides_config,
+    plots_folder,
+    method_ids=None,
+):
+    """Run each stream count twice: end-to-end from the file, and decode-only
+    from a packet cache demuxed once per run (packet_cache=<file>)."""
+    method_ids = method_ids or mt.high_profile_method_ids()
+    stream_steps = bp.generate_stream_runs(max_streams)
+    cache_dir = SHM_DIR if os.path.isdir(SHM_DIR) else results_absolute_path
+    cache_path = os.path.join(cache_dir, f"mv_packet_cache_{os.getpid()}.bin")
+    build_packet_cache(input_path, builder_exe, cache_path)
+
+    variants = {"end-to-end": {}, "decode-only": {"packet_cache": cache_path}}
+    all_results = []
+    try:
+        for s in stream_steps:
+            for variant, extra in variants.items():
+                df, _ = bp.run_benchmark(
+                    input_path,
+                    s,
+                    project_absolute_path,
+                    results_absolute_path,
+                    exe=exe,
+                    harness_options={
+                        "methods": ",".join(str(m) for m in method_ids),
+                        **extra,
+                    },
+                )
+                if df.empty:
+                    print(f"Warning: No data returned for streams={s}, variant={variant}")
+                    continue
+                df["variant"] = variant
+                all_results.append(df)
+    finally:
+        os.remove(cache_path)
+
+    if not all_results:
+        print("No decode-only results collected!")
+        return pd.DataFrame()
+
+    df_variants = pd.concat(all_results, ignore_index=True)
+    csv_path = os.path.join(plots_folder, "decode_only_results.csv")
+    df_variants.to_csv(csv_path, index=False)
+    print(f"Saved decode-only results: {csv_path}")
+
+    # One line per method and variant on the scaling charts
+    df_plot = df_variants.copy()
+    df_plot["method"] = df_plot["method"] + " (" + df_plot["variant"] + ")"
+    sld.produce_decode_only_slides(
+        df_plot,
+        create_demux_share_table(df_variants, stream_steps[-1]),
+        stream_steps[-1],
+        slides_config,
+        "decode_only_slides.pptx",
+        plots_folder,
+    )
+    return df_variants
@@ -0,0 +1,203 @@
+import os
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+
+import benchmarking.slides as sld
+import utils.ffprobe as ffprobe
+import utils.mv_compare as mv_compare
+
+# Worker counts for the latency benchmark (capped at the host's CPU count)
+WORKER_SWEEP = [1, 2, 4, 8, 16]
+
+# More segments than workers so a slow GOP does not leave the other workers idle
+SEGMENTS_PER_WORKER = 4
+
+
+def split_segments(packets, n_segments):
+    """Group whole GOPs into about n_segments segments of similar packet count.
+
+    Each segment starts at a keyframe and ends right before the keyframe that
+    starts the next one; frame_offset is the index of its first packet, i.e.
+    the global number of its first frame. The first segment is read from the
+    start of the file without seeking (segment_start=-1).
+    """
+    keyframes = [i for i, p in enumerate(packets) if p["key"]]
+    if not keyframes or keyframes[0] != 0:
+        # Leading packets without a keyframe cannot be decoded on their own
+        keyframes = [0] + keyframes
+
+    target = len(packets) / max(1, n_segments)
+    starts = [keyframes[0]]
+    for k in keyframes[1:]:
+        if k - starts[-1] >= target:
+            starts.append(k)
+
+    segments = []
+    for n, start in enumerate(starts):
+        end = starts[n + 1] if n + 1 < len(starts) else len(packets)
+        segments.append(
+            {
+                "segment_start": packets[start]["dts"] if start > 0 else -1,
+                "segment_end": packets[end]["dts"] if end < len(packets) else -1,
+                "frame_offset": start,
+                "frames": end - start,
+            }
+        )
+    return segments
+
+
+def extract_segment(extractor, input_path, segment, output_csv):
+    cmd = [
+        str(extractor),
+        str(input_path),
+        "1",
+        str(output_csv),
+        f"segment_start={segment['segment_start']}",
+        f"segment_end={segment['segment_end']}",
+        f"frame_offset={segment['frame_offset']}",
+    ]
+    result = subprocess.run(
+        cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, encoding="utf-8"
+    )
+    if result.returncode != 0:
+        raise RuntimeError(
+            f"Segment at frame {segment['frame_offset']} failed: {result.stderr.strip()}"
+        )
+    return output_csv
+
+
+def merge_segment_outputs(segment_csvs, output_csv):
+    """Concatenate segment outputs (already globally numbered), keeping one header."""
+    with open(output_csv, "w") as out:
+        for n, path in enumerate(segment_csvs):
+            with open(path) as seg:
+                header = seg.readline()
+                if n == 0:
+                    out.write(header)
+                for line in seg:
+                    out.write(line)
+
+
+def extract_gop_parallel(
+    input_path,
+    output_csv,
+    extractor,
+    workers,
+    work_dir,
+    segments_per_worker=SEGMENTS_PER_WORKER,
+):
+    """Extract one video with extractor6 split into GOP-aligned segments run by
+    `workers` concurrent extractor processes. Returns the phase timings in seconds."""
+    work_dir = Path(work_dir)
+    work_dir.mkdir(parents=True, exist_ok=True)
+
+    t0 = time.perf_counter()
+    packets = ffprobe.probe_video_packets(input_path)
+    segments = split_segments(packets, workers * segments_per_worker)
+    t1 = time.perf_counter()
+
+    segment_csvs = [work_dir / f"segment_{n:04d}.csv" for n in range(len(segments))]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(
+            pool.map(
+                lambda args: extract_segment(extractor, input_path, *args),
+                zip(segments, segment_csvs),
+            )
+        )
+    t2 = time.perf_counter()
+
+    merge_segment_outputs(segment_csvs, output_csv)
+    for path in segment_csvs:
+        os.remove(path)
+    t3 = time.perf_counter()
+
+    return {
+        "segments": len(segments),
+        "frames": len(packets),
+        "index_s": t1 - t0,
+        "extract_s": t2 - t1,
+        "merge_s": t3 - t2,
+        "latency_s": t3 - t0,
+    }
+
+
+def create_latency_table(df_latency):
+    sub = df_latency[df_latency["method"] != "Serial extractor6"]
+    tbl = sub[
+        ["workers", "segments", "latency_s", "index_s", "merge_s", "speedup", "identical"]
+    ].copy()
+    tbl.columns = [
+        "Workers",
+        "Segments",
+        "Latency (s)",
+        "Index (s)",
+        "Merge (s)",
+        "Speedup",
+        "Identical to extractor6",
+    ]
+    return tbl.round(2)
+
+
+def run_gop_parallel_benchmark(
+    input_path,
+    extractor,
+    results_absolute_path,
+    slides_config,
+    plots_folder,
+    worker_counts=None,
+):
+    """Single-video latency of GOP-parallel extraction against worker count,
+    with every merged output checked against a serial extractor6 run."""
+    cpu_count = os.cpu_count() or 1
+    worker_counts = worker_counts or [w for w in WORKER_SWEEP if w <= cpu_count]
+    work_dir = Path(results_absolute_path) / "gop_parallel"
+    work_dir.mkdir(parents=True, exist_ok=True)
+
+    serial_csv = work_dir / "serial_output.csv"
+    t0 = time.perf_counter()
+    subprocess.run(
+        [str(extractor), str(input_path), "1", str(serial_csv)],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        check=True,
+    )
+    serial_s = time.perf_counter() - t0
+    print(f"Serial extractor6: {serial_s:.2f} s")
+
+    rows = []
+    for w in worker_counts:
+        merged_csv = work_dir / f"merged_{w}workers.csv"
+        timings = extract_gop_parallel(
+            input_path, merged_csv, extractor, w, work_dir / f"segments_{w}"
+        )
+        identical = mv_compare.compare_outputs(
+            serial_csv, merged_csv, work_dir / f"mv_compare_{w}workers.txt"
+        )
+        print(
+            f"{w} workers, {timings['segments']} segments: {timings['latency_s']:.2f} s "
+            f"({'identical' if identical else 'DIFFERS from'} serial output)"
+        )
+        rows.append(
+            {"method": "GOP-parallel extractor6", "workers": w, "identical": identical, **timings}
+        )
+        rows.append({"method": "Serial extractor6", "workers": w, "latency_s": serial_s})
+
+    df_latency = pd.DataFrame(rows)
+    df_latency["speedup"] = serial_s / df_latency["latency_s"]
+
+    csv_path = os.path.join(plots_folder, "gop_parallel_results.csv")
+    df_latency.to_csv(csv_path, index=False)
+    print(f"Saved GOP-parallel results: {csv_path}")
+
+    sld.produce_gop_parallel_slides(
+        df_latency,
+        create_latency_table(df_latency),
+        slides_config,
+        "gop_parallel_slides.pptx",
+        plots_folder,
+    )
+    return df_latency
@@ -0,0 +1,48 @@
+# Mirror of the `methods` table in benchmarking.cpp, keyed by extractor number
+# (the id used by the harness `methods=` option and in methodN_output_*.csv names)
+METHODS = {
+    0: {
+        "name": "Original FFmpeg MV extraction",
+        "exe": "extractors/executables/extractor0",
+        "high_profile": True,
+    },
+    1: {
+        "name": "Same Code Not Patched",
+        "exe": "extractors/executables/extractor1",
+        "high_profile": True,
+    },
+    2: {
+        "name": "Custom FFmpeg MV-Only - FFMPEG Patched",
+        "exe": "extractors/executables/extractor2",
+        "high_profile": True,
+    },
+    3: {
+        "name": "Custom H.264 Parser",
+        "exe": "extractors/executables/extractor3",
+        "high_profile": False,
+    },
+    4: {
+        "name": "LIVE555 Parser",
+        "exe": "extractors/executables/extractor4",
+        "high_profile": False,
+    },
+    6: {
+        "name": "Custom FFmpeg - Flush decoder",
+        "exe": "extractors/executables/extractor6",
+        "high_profile": True,
+    },
+    7: {
+        "name": "Custom FFmpeg",
+        "exe": "extractors/executables/extractor7",
+        "high_profile": True,
+    },
+}
+
+
+def high_profile_method_ids():
+    return [method_id for method_id, m in METHODS.items() if m["high_profile"]]
+
+
+def method_id_from_exe(exe_name):
+    """extractor6 (or a path to it) -> 6"""
+    return int(exe_name.rsplit("/", 1)[-1].replace("extractor", ""))
@@ -0,0 +1,119 @@
+import os
+import pandas as pd
+
+import benchmarking.benchmark_python as bp
+import benchmarking.methods as mt
+import benchmarking.slides as sld
+import utils.ffprobe as ffprobe
+
+# Lag growing faster than this (ms of lag per second of video) means the
+# streams keep falling further behind live instead of settling
+MAX_LAG_GROWTH_MS_PER_S = 50.0
+
+
+def summarize_lag(stats):
+    """Per-method lag of one run; the worst stream decides p95, max and growth."""
+    stats = stats.copy()
+    stats["method_id"] = stats["exe"].map(mt.method_id_from_exe)
+    return (
+        stats.groupby("method_id")
+        .agg(
+            mean_lag_ms=("mean_ms", "mean"),
+            p95_lag_ms=("p95_ms", "max"),
+            max_lag_ms=("max_ms", "max"),
+            final_lag_ms=("final_ms", "max"),
+            lag_growth_ms_per_s=("growth_ms_per_s", "max"),
+        )
+        .reset_index()
+    )
+
+
+def create_lag_limits_table(df_lag, max_growth):
+    rows = []
+    for method, sub in df_lag.groupby("method", sort=False):
+        bounded = sub[sub["lag_growth_ms_per_s"] <= max_growth]
+        unbounded = sub[sub["lag_growth_ms_per_s"] > max_growth]
+        rows.append(
+            [
+                method,
+                int(bounded["streams"].max()) if not bounded.empty else 0,
+                int(unbounded["streams"].min()) if not unbounded.empty else "-",
+                round(sub["mean_lag_ms"].min(), 1),
+            ]
+        )
+    return pd.DataFrame(
+        rows,
+        columns=[
+            "Method",
+            "Max Streams (Bounded Lag)",
+            "Unbounded From (Streams)",
+            "Best Mean Lag (ms)",
+        ],
+    )
+
+
+def run_paced_benchmark(
+    input_path,
+    max_streams,
+    exe,
+    project_absolute_path,
+    results_absolute_path,
+    slides_config,
+    plots_folder,
+    method_ids=None,
+    max_growth=MAX_LAG_GROWTH_MS_PER_S,
+):
+    """Feed every stream at the container's native packet timestamps and
+    measure how far behind real time the decoded frames come out."""
+    source = ffprobe.probe_video_stream(input_path)
+    method_ids = method_ids or mt.high_profile_method_ids()
+    stream_steps = bp.generate_stream_runs(max_streams)
+    print(
+        f"Paced input at {source['fps']:.2f} FPS ({source['duration']:.1f} s per run), "
+        f"streams to test: {stream_steps}"
+    )
+
+    all_results = []
+    for s in stream_steps:
+        df, output = bp.run_benchmark(
+            input_path,
+            s,
+            project_absolute_path,
+            results_absolute_path,
+            exe=exe,
+            options={"pace": 1},
+            harness_options={
+                "methods": ",".join(str(m) for m in method_ids),
+                "frames": source["frames"],
+            },
+        )
+        stats = bp.parse_stat_lines(output, "lag")
+        if stats.empty:
+            print(f"Warning: No lag statistics returned for streams={s}")
+            continue
+
+        summary = summarize_lag(stats)
+        summary["method"] = summary["method_id"].map(lambda m: mt.METHODS[m]["name"])
+        summary["streams"] = s
+        if not df.empty:
+            summary = summary.merge(df[["method", "cpu", "memory"]], on="method", how="left")
+        all_results.append(summary)
+
+    if not all_results:
+        print("No paced input results collected!")
+        return pd.DataFrame()
+
+    df_lag = pd.concat(all_results, ignore_index=True)
+    csv_path = os.path.join(plots_folder, "paced_results.csv")
+    df_lag.to_csv(csv_path, index=False)
+    print(f"Saved paced input results: {csv_path}")
+
+    sld.produce_paced_slides(
+        df_lag,
+        create_lag_limits_table(df_lag, max_growth),
+        max_growth,
+        slides_config,
+        "paced_input_slides.pptx",
+        plots_folder,
+    )
+    return df_lag
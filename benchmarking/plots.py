@@ -91,14 +91,22 @@ def pretty_table(df, filename, plots_folder, col_width=2.8, row_height=0.8):
 
 
 def plot_grouped_bar(
-    df, metric, title, ylabel, filename, plots_folder, palette="tab20"
+    df,
+    metric,
+    title,
+    ylabel,
+    filename,
+    plots_folder,
+    palette="tab20",
+    x="streams",
+    xlabel="Streams",
 ):
     plt.figure(figsize=(16, 9))
     sns.barplot(
-        data=df, x="streams", y=metric, hue="method", palette=palette, edgecolor="black"
+        data=df, x=x, y=metric, hue="method", palette=palette, edgecolor="black"
     )
     plt.title(title, fontsize=20, loc="left")
-    plt.xlabel("Streams", fontsize=14)
+    plt.xlabel(xlabel, fontsize=14)
     plt.ylabel(ylabel, fontsize=14)
     plt.legend(title="Method", loc="best", fontsize=12)
     plt.tight_layout()
@@ -125,11 +133,21 @@ def plot_metric(df, metric, title, ylabel, filename, plots_folder, palette="viri
     print(f"Saved plot: {save_path}")
 
 
-def plot_scaling(df, metric, title, ylabel, filename, plots_folder, legend_loc="best"):
+def plot_scaling(
+    df,
+    metric,
+    title,
+    ylabel,
+    filename,
+    plots_folder,
+    legend_loc="best",
+    x="streams",
+    xlabel="Streams",
+):
     plt.figure(figsize=(16, 9))
-    sns.lineplot(data=df, x="streams", y=metric, hue="method", marker="o")
+    sns.lineplot(data=df, x=x, y=metric, hue="method", marker="o")
     plt.title(title, fontsize=20, loc="left")
-    plt.xlabel("Streams", fontsize=14)
+    plt.xlabel(xlabel, fontsize=14)
     plt.ylabel(ylabel, fontsize=14)
     plt.legend(title="Method", loc=legend_loc, fontsize=12)
     plt.tight_layout()
@@ -137,3 +155,90 @@ def plot_scaling(df, metric, title, ylabel, filename, plots_folder, legend_loc="
     plt.savefig(save_path)
     plt.close()
     print(f"Saved plot: {save_path}")
+
+
+def thread_label(threads):
+    return "auto" if threads == 0 else str(threads)
+
+
+def plot_heatmap_grid(
+    df,
+    metric,
+    title,
+    cbar_label,
+    filename,
+    plots_folder,
+    cmap="viridis",
+    fmt=".1f",
+    row="threads",
+    row_label="Decoder Threads",
+):
+    """One <row> x streams heatmap per method, laid out on a single figure."""
+    methods = list(df["method"].unique())
+    n_cols = min(3, len(methods))
+    n_rows = -(-len(methods) // n_cols)
+    fig, axes = plt.subplots(n_rows, n_cols, figsize=(16, 9), squeeze=False)
+
+    for ax, method in zip(axes.flat, methods):
+        grid = df[df["method"] == method].pivot_table(
+            index=row, columns="streams", values=metric, aggfunc="mean"
+        )
+        if row == "threads":
+            # Explicit thread counts first, auto (0) last
+            grid = grid.reindex(sorted(grid.index, key=lambda t: (t == 0, t)))
+            grid.index = [thread_label(t) for t in grid.index]
+        else:
+            # Keep the order the rows were run in
+            grid = grid.reindex([r for r in df[row].unique() if r in grid.index])
+
+        sns.heatmap(
+            grid,
+            annot=True,
+            fmt=fmt,
+            cmap=cmap,
+            ax=ax,
+            cbar_kws={"label": cbar_label},
+        )
+        ax.set_title(method, fontsize=12)
+        ax.set_xlabel("Streams", fontsize=11)
+        ax.set_ylabel(row_label, fontsize=11)
+
+    for ax in list(axes.flat)[len(methods) :]:
+        ax.axis("off")
+
+    fig.suptitle(title, fontsize=20, x=0.01, ha="left")
+    fig.tight_layout()
+    save_path = os.path.join(plots_folder, filename)
+    fig.savefig(save_path)
+    plt.close(fig)
+    print(f"Saved heatmap: {save_path}")
+
+
+def plot_stacked_breakdown(
+    df, components, labels, title, ylabel, filename, plots_folder, x="sink", xlabel="Sink"
+):
+    """One stacked bar chart per method, splitting a cost into its components."""
+    methods = list(df["method"].unique())
+    n_cols = min(3, len(methods))
+    n_rows = -(-len(methods) // n_cols)
+    fig, axes = plt.subplots(n_rows, n_cols, figsize=(16, 9), squeeze=False, sharey=True)
+
+    for ax, method in zip(axes.flat, methods):
+        sub = df[df["method"] == method].set_index(x)[components]
+        sub.columns = labels
+        sub.plot(kind="bar", stacked=True, ax=ax, edgecolor="black", legend=False, rot=0)
+        ax.set_title(method, fontsize=12)
+        ax.set_xlabel(xlabel, fontsize=11)
+        ax.set_ylabel(ylabel, fontsize=11)
+
+    for ax in list(axes.flat)[len(methods) :]:
+        ax.axis("off")
+
+    handles, legend_labels = axes.flat[0].get_legend_handles_labels()
+    fig.legend(handles, legend_labels, loc="upper right", fontsize=12)
+    fig.suptitle(title, fontsize=20, x=0.01, ha="left")
+    fig.tight_layout(rect=(0, 0, 1, 0.95))
+    save_path = os.path.join(plots_folder, filename)
+    fig.savefig(save_path)
+    plt.close(fig)
+    print(f"Saved stacked chart: {save_path}")
@@ -0,0 +1,225 @@
+import os
+import subprocess
+import threading
+import time
+import pandas as pd
+
+import benchmarking.benchmark_python as bp
+import benchmarking.methods as mt
+import benchmarking.slides as sld
+import utils.ffprobe as ffprobe
+
+RTSP_PORT_BASE = 18554
+RTSP_URL_TEMPLATE = "rtsp://127.0.0.1:{port}/live"
+
+
+class RtspStandIn:
+    """Local RTSP source: one real-time ffmpeg publisher per stream.
+
+    Each extractor runs with rtsp_listen=1, i.e. as the RTSP server on
+    127.0.0.1:(port_base + stream), and the publisher pushes the video to it
+    with -re -c copy. Publishers retry until their extractor is listening.
+    """
+
+    def __init__(self, video_file, streams, port_base=RTSP_PORT_BASE, transport="udp"):
+        self.video_file = video_file
+        self.streams = streams
+        self.port_base = port_base
+        self.transport = transport
+        self.ffmpeg = ffprobe.find_tool("ffmpeg")
+        self._stop = threading.Event()
+        self._threads = []
+        # Guards _procs so stop() never misses a publisher started concurrently
+        self._lock = threading.Lock()
+        self._procs = {}
+
+    def publish_cmd(self, stream):
+        return [
+            self.ffmpeg,
+            "-hide_banner",
+            "-loglevel",
+            "error",
+            "-re",
+            "-i",
+            str(self.video_file),
+            "-map",
+            "0:v:0",
+            "-c",
+            "copy",
+            "-f",
+            "rtsp",
+            "-rtsp_transport",
+            self.transport,
+            RTSP_URL_TEMPLATE.format(port=self.port_base + stream),
+        ]
+
+    def _publish(self, stream, connect_timeout):
+        deadline = time.monotonic() + connect_timeout
+        while True:
+            with self._lock:
+                if self._stop.is_set():
+                    return
+                proc = subprocess.Popen(
+                    self.publish_cmd(stream),
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL,
+                )
+                self._procs[stream] = proc
+            if proc.wait() == 0:
+                return
+            # Connection refused until the extractor is listening
+            if time.monotonic() > deadline:
+                print(f"Warning: RTSP publisher for stream {stream} never connected")
+                return
+            time.sleep(0.2)
+
+    def start(self, connect_timeout=30):
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(
+                target=self._publish, args=(i, connect_timeout), daemon=True
+            )
+            for i in range(self.streams)
+        ]
+        for t in self._threads:
+            t.start()
+
+    def stop(self):
+        # Once _stop is set under the lock, no publisher can start after this
+        with self._lock:
+            self._stop.set()
+            procs = list(self._procs.values())
+            self._procs = {}
+        for proc in procs:
+            if proc.poll() is None:
+                proc.terminate()
+        for t in self._threads:
+            t.join(timeout=5)
+        for proc in procs:
+            if proc.poll() is None:
+                proc.kill()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def summarize_ingest(stats, df, streams, source):
+    stats = stats.copy()
+    stats["method_id"] = stats["exe"].map(mt.method_id_from_exe)
+    summary = (
+        stats.groupby("method_id")
+        .agg(
+            ingest_mbps=("mbps", "sum"),
+            mean_jitter_ms=("jitter_ms", "mean"),
+            max_jitter_ms=("jitter_ms", "max"),
+            packets=("packets", "sum"),
+        )
+        .reset_index()
+    )
+    summary["method"] = summary["method_id"].map(lambda m: mt.METHODS[m]["name"])
+    summary["streams"] = streams
+    summary["source"] = source
+    if not df.empty:
+        summary = summary.merge(
+            df[["method", "cpu", "memory", "mvs"]], on="method", how="left"
+        )
+    return summary
+
+
+def create_ingest_table(df_ingest, streams):
+    sub = df_ingest[df_ingest["streams"] == streams]
+    tbl = sub[
+        ["method", "source", "ingest_mbps", "mean_jitter_ms", "max_jitter_ms", "cpu", "packets"]
+    ].copy()
+    tbl.columns = [
+        "Method",
+        "Input",
+        "Ingest (Mbit/s)",
+        "Mean Jitter (ms)",
+        "Max Jitter (ms)",
+        "CPU (%)",
+        "Packets",
+    ]
+    return tbl.round(2)
+
+
+def run_rtsp_loopback(
+    input_path,
+    max_streams,
+    exe,
+    project_absolute_path,
+    results_absolute_path,
+    slides_config,
+    plots_folder,
+    method_ids=None,
+    port_base=RTSP_PORT_BASE,
+):
+    """Run each method on N RTSP loopback streams and on the same file paced
+    to real time, so network ingest can be compared with file ingest."""
+    source = ffprobe.probe_video_stream(input_path)
+    method_ids = method_ids or mt.high_profile_method_ids()
+    stream_steps = bp.generate_stream_runs(max_streams)
+    harness_options = {"frames": source["frames"], "port_base": port_base}
+
+    all_results = []
+    for s in stream_steps:
+        # File input paced to the same real-time rate the RTSP publishers use
+        df, output = bp.run_benchmark(
+            input_path,
+            s,
+            project_absolute_path,
+            results_absolute_path,
+            exe=exe,
+            options={"pace": 1, "ingest_stats": 1},
+            harness_options={
+                **harness_options,
+                "methods": ",".join(str(m) for m in method_ids),
+            },
+        )
+        stats = bp.parse_stat_lines(output, "ingest")
+        if not stats.empty:
+            all_results.append(summarize_ingest(stats, df, s, "file"))
+
+        # Publishers are restarted per method since the harness runs methods one by one
+        for method_id in method_ids:
+            with RtspStandIn(input_path, s, port_base):
+                df, output = bp.run_benchmark(
+                    RTSP_URL_TEMPLATE,
+                    s,
+                    project_absolute_path,
+                    results_absolute_path,
+                    exe=exe,
+                    options={"rtsp_listen": 1, "ingest_stats": 1},
+                    harness_options={**harness_options, "methods": method_id},
+                )
+            stats = bp.parse_stat_lines(output, "ingest")
+            if stats.empty:
+                print(f"Warning: No RTSP ingest data for method {method_id}, streams={s}")
+                continue
+            all_results.append(summarize_ingest(stats, df, s, "rtsp"))
+
+    if not all_results:
+        print("No RTSP loopback results collected!")
+        return pd.DataFrame()
+
+    df_ingest = pd.concat(all_results, ignore_index=True)
+    csv_path = os.path.join(plots_folder, "rtsp_loopback_results.csv")
+    df_ingest.to_csv(csv_path, index=False)
+    print(f"Saved RTSP loopback results: {csv_path}")
+
+    # One line per method and input kind on the scaling charts
+    df_plot = df_ingest.copy()
+    df_plot["method"] = df_plot["method"] + " (" + df_plot["source"] + ")"
+    sld.produce_rtsp_slides(
+        df_plot,
+        create_ingest_table(df_ingest, stream_steps[-1]),
+        stream_steps[-1],
+        slides_config,
+        "rtsp_loopback_slides.pptx",
+        plots_folder,
+    )
+    return df_ingest
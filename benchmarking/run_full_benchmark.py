@@ -6,9 +6,22 @@ import subprocess
 from datetime import datetime
 from pathlib import Path
 
+import benchmarking.affinity_sweep as affinity
 import benchmarking.benchmark_python as benchmarking
+import benchmarking.cache_benchmark as cache_benchmark
+import benchmarking.capacity_search as capacity
+import benchmarking.decode_only as decode_only
+import benchmarking.gop_parallel as gop_parallel
+import benchmarking.paced_benchmark as paced
+import benchmarking.shm_latency as shm_latency
+import benchmarking.sink_benchmark as sink_benchmark
+import benchmarking.subsampling as subsampling
+import benchmarking.writer_benchmark as writer_benchmark
+import benchmarking.rtsp_loopback as rtsp_loopback
 import utils.mv_compare as mv_compare
+import utils.results_warehouse as warehouse
 import utils.vtune_hotspots_plot as vtune
+import video_generation.motion_vector as mv
 
 
 class BenchmarkRunner:
@@ -22,12 +35,22 @@ class BenchmarkRunner:
         run_timestamp = datetime.now().strftime("%Y%m%d_%H%M")
         self.results_dir = self.results_base / run_timestamp
         self.results_dir.mkdir(exist_ok=True)
+        # Host and commits of the run, for the results warehouse
+        warehouse.record_environment(self.results_dir, self.current_dir, video=video_file, streams=streams)
 
         self.benchmarking_dir = self.current_dir / "benchmarking"
         self.benchmarking_dir_executables = self.benchmarking_dir / "executables"
         self.benchmark_exec = self.benchmarking_dir_executables / "benchmark_all_9"
 
         self.extractor_executables = self.current_dir / "extractors" / "executables"
+        # Every stream's output is kept, compressed in zstd frames of 30 video frames;
+        # the extractors only support format=zstd when the makefile found libzstd
+        self.zstd_flags = self.pkg_config("libzstd")
+        if self.zstd_flags is None:
+            print("libzstd not found by pkg-config: extraction outputs are written as plain CSV")
+            self.extract_options = "format=csv"
+        else:
+            self.extract_options = "format=zstd flush_frames=30"
 
         self.start_frame = 10
         self.end_frame = 100
@@ -62,6 +85,18 @@ class BenchmarkRunner:
             print(f"Error executing command: {e}")
             return False if not capture_output else None
 
+    @staticmethod
+    def pkg_config(package):
+        """Compiler flags of a package, or None when pkg-config does not find it
+        (the same test as the makefile's ZSTD_FLAGS)."""
+        try:
+            result = subprocess.run(
+                ["pkg-config", "--cflags", "--libs", package], capture_output=True, text=True
+            )
+        except OSError:
+            return None
+        return result.stdout.strip() if result.returncode == 0 else None
+
     def build(self):
         print("Building all extractors and tools...")
 
@@ -75,6 +110,10 @@ class BenchmarkRunner:
             pkg_config_cmd, shell=True, text=True
         ).strip()
 
+        # libzstd lets the harness count the vectors of format=zstd outputs
+        if self.zstd_flags is not None:
+            pkg_flags += f" -DHAVE_ZSTD {self.zstd_flags}"
+
         compile_cmd = (
             f"g++ -O2 -o {self.benchmark_exec} benchmarking.cpp {pkg_flags} -lm"
         )
@@ -93,15 +132,11 @@ class BenchmarkRunner:
 
         print("Running 9-method benchmark suite...")
 
-        cmd = f"{self.benchmark_exec} {self.video_file} {self.streams} {self.results_dir} {self.current_dir} 1 "
+        cmd = f"{self.benchmark_exec} {self.video_file} {self.streams} {self.results_dir} {self.current_dir} 1 {self.extract_options}"
 
         if not self.run_command(cmd, cwd=self.benchmarking_dir_executables):
             return
 
-        for csv_file in self.results_dir.glob("method*_output_*.csv"):
-            if not csv_file.name.endswith("_0.csv"):
-                csv_file.unlink()
-
         print("Benchmarks complete.")
 
     def plot(self):
@@ -125,10 +160,273 @@ class BenchmarkRunner:
         )
 
         print(f"Plotting complete. Plots and PPTX in {self.plots_dir}.")
+        self.ingest_results()
+
+    def thread_sweep(self):
+        if not self.video_file:
+            print("Thread sweep skipped: set VIDEO_FILE argument.")
+            return
+
+        self.plots_dir.mkdir(exist_ok=True)
+
+        print("Running decoder thread count x streams grid sweep...")
+
+        benchmarking.benchmark(
+            self.video_file,
+            self.streams,
+            str(self.benchmarking_dir_executables),
+            str(self.current_dir),
+            str(self.results_dir),
+            str(self.slides_config),
+            str(self.plots_dir),
+            str(self.benchmark_exec),
+            thread_counts=benchmarking.THREAD_SWEEP,
+        )
+
+        print(f"Thread sweep complete. Heatmaps and PPTX in {self.plots_dir}.")
+        self.ingest_results()
+
+    def ingest_results(self):
+        try:
+            with warehouse.ResultsWarehouse(self.results_base / "warehouse.sqlite") as db:
+                rows = db.ingest_run(self.results_dir)
+        except FileNotFoundError as error:
+            print(f"Results not added to the warehouse: {error}")
+            return
+        print(f"Added {rows} result rows to {self.results_base / 'warehouse.sqlite'}.")
+
+    def capacity_search(self):
+        if not self.video_file:
+            print("Capacity search skipped: set VIDEO_FILE argument.")
+            return
+
+        self.plots_dir.mkdir(exist_ok=True)
+
+        print("Searching the max sustainable streams per method...")
+
+        capacity.run_capacity_search(
+            self.video_file,
+            str(self.benchmark_exec),
+            str(self.current_dir),
+            str(self.results_dir),
+            str(self.slides_config),
+            str(self.plots_dir),
+        )
+
+        print(f"Capacity search complete. Streams per host table in {self.plots_dir}.")
+
+    def paced_benchmark(self):
+        if not self.video_file:
+            print("Paced input benchmark skipped: set VIDEO_FILE argument.")
+            return
+
+        self.plots_dir.mkdir(exist_ok=True)
+
+        print("Running paced (real-time) input benchmark...")
+
+        paced.run_paced_benchmark(
+            self.video_file,
+            self.streams,
+            str(self.benchmark_exec),
+            str(self.current_dir),
+            str(self.results_dir),
+            str(self.slides_config),
+            str(self.plots_dir),
+        )
+
+        print(f"Paced input benchmark complete. Lag charts in {self.plots_dir}.")
+
+    def rtsp_loopback(self):
+        if not self.video_file:
+            print("RTSP loopback benchmark skipped: set VIDEO_FILE argument.")
+            return
+
+        self.plots_dir.mkdir(exist_ok=True)
+
+        print("Running RTSP loopback benchmark (local publishers, file vs RTSP)...")
+
+        rtsp_loopback.run_rtsp_loopback(
+            self.video_file,
+            self.streams,
+            str(self.benchmark_exec),
+            str(self.current_dir),
+            str(self.results_dir),
+            str(self.slides_config),
+            str(self.plots_dir),
+        )
+
+        print(f"RTSP loopback benchmark complete. Ingest charts in {self.plots_dir}.")
+
+    def affinity_sweep(self):
+        if not self.video_file:
+            print("Affinity sweep skipped: set VIDEO_FILE argument.")
+            return
+
+        self.plots_dir.mkdir(exist_ok=True)
+
+        print("Running CPU affinity policy x streams sweep...")
+
+        affinity.run_affinity_sweep(
+            self.video_file,
+            self.streams,
+            str(self.benchmark_exec),
+            str(self.current_dir),
+            str(self.results_dir),
+            str(self.slides_config),
+            str(self.plots_dir),
+        )
+
+        print(f"Affinity sweep complete. Heatmaps in {self.plots_dir}.")
+
+    def gop_parallel(self):
+        if not self.video_file:
+            print("GOP-parallel benchmark skipped: set VIDEO_FILE argument.")
+            return
+
+        self.plots_dir.mkdir(exist_ok=True)
+
+        print("Running GOP-parallel single-video extraction benchmark...")
+
+        gop_parallel.run_gop_parallel_benchmark(
+            self.video_file,
+            self.extractor_executables / "extractor6",
+            str(self.results_dir),
+            str(self.slides_config),
+            str(self.plots_dir),
+        )
+
+        print(f"GOP-parallel benchmark complete. Latency charts in {self.plots_dir}.")
+
+    def decode_only(self):
+        if not self.video_file:
+            print("Decode-only benchmark skipped: set VIDEO_FILE argument.")
+            return
+
+        self.plots_dir.mkdir(exist_ok=True)
+
+        print("Running decode-only (packet cache) vs end-to-end benchmark...")
+
+        decode_only.run_decode_only_benchmark(
+            self.video_file,
+            self.streams,
+            str(self.benchmark_exec),
+            self.extractor_executables / "build_packet_cache",
+            str(self.current_dir),
+            str(self.results_dir),
+            str(self.slides_config),
+            str(self.plots_dir),
+        )
+
+        print(f"Decode-only benchmark complete. Charts in {self.plots_dir}.")
+
+    def cache_benchmark(self):
+        if not self.video_file:
+            print("Cold/warm cache benchmark skipped: set VIDEO_FILE argument.")
+            return
+
+        self.plots_dir.mkdir(exist_ok=True)
+
+        print("Running cold vs warm input cache benchmark...")
+
+        cache_benchmark.run_cache_benchmark(
+            self.video_file,
+            self.streams,
+            str(self.benchmark_exec),
+            str(self.current_dir),
+            str(self.results_dir),
+            str(self.slides_config),
+            str(self.plots_dir),
+        )
+
+        print(f"Cold/warm cache benchmark complete. Charts in {self.plots_dir}.")
+
+    def subsampling(self):
+        if not self.video_file:
+            print("Subsampling benchmark skipped: set VIDEO_FILE argument.")
+            return
+
+        self.plots_dir.mkdir(exist_ok=True)
+
+        print("Running frame subsampling / selective decode benchmark...")
+
+        subsampling.run_subsampling_benchmark(
+            self.video_file,
+            self.streams,
+            str(self.benchmark_exec),
+            str(self.current_dir),
+            str(self.results_dir),
+            str(self.slides_config),
+            str(self.plots_dir),
+        )
+
+        print(f"Subsampling benchmark complete. Charts in {self.plots_dir}.")
+
+    def writer_benchmark(self):
+        if not self.video_file:
+            print("Writer benchmark skipped: set VIDEO_FILE argument.")
+            return
+
+        self.plots_dir.mkdir(exist_ok=True)
+
+        print("Running synchronous vs asynchronous writer benchmark...")
+
+        writer_benchmark.run_writer_benchmark(
+            self.video_file,
+            self.streams,
+            str(self.benchmark_exec),
+            str(self.current_dir),
+            str(self.results_dir),
+            str(self.slides_config),
+            str(self.plots_dir),
+        )
+
+        print(f"Writer benchmark complete. Charts in {self.plots_dir}.")
+
+    def sink_benchmark(self):
+        if not self.video_file:
+            print("Output sink benchmark skipped: set VIDEO_FILE argument.")
+            return
+
+        self.plots_dir.mkdir(exist_ok=True)
+
+        print("Running writer overhead benchmark (none / null device / CSV / zstd / binary)...")
+
+        sink_benchmark.run_sink_benchmark(
+            self.video_file,
+            self.streams,
+            str(self.benchmark_exec),
+            str(self.current_dir),
+            str(self.results_dir),
+            str(self.slides_config),
+            str(self.plots_dir),
+        )
+
+        print(f"Output sink benchmark complete. Charts in {self.plots_dir}.")
+
+    def shm_latency(self):
+        if not self.video_file:
+            print("Shared-memory latency benchmark skipped: set VIDEO_FILE argument.")
+            return
+
+        self.plots_dir.mkdir(exist_ok=True)
+
+        print("Running shared-memory ring latency benchmark...")
+
+        shm_latency.run_shm_latency_benchmark(
+            self.video_file,
+            self.streams,
+            str(self.benchmark_exec),
+            str(self.current_dir),
+            str(self.results_dir),
+            str(self.slides_config),
+            str(self.plots_dir),
+        )
+
+        print(f"Shared-memory latency benchmark complete. Charts in {self.plots_dir}.")
 
     def generate_mv_comparison(self):
-        method0_csv = self.results_dir / "method0_output_0.csv"
-        method6_csv = self.results_dir / "method6_output_0.csv"
+        method0_csv = mv.motion_vector_file(self.results_dir, 0)
+        method6_csv = mv.motion_vector_file(self.results_dir, 6)
         mv_compare.compare(
             method0_csv,
             method6_csv,
@@ -185,6 +483,18 @@ def usage():
     print("    3 = Generate Plots and PowerPoint")
     print("    4 = Generate MV comparison")
     print("    5 = Profiler (VTune on FFmpeg hacked)")
+    print("    6 = Decoder thread sweep (threads x streams heatmaps)")
+    print("    7 = Capacity search (max real-time streams per method)")
+    print("    8 = Paced input benchmark (lag behind simulated live cameras)")
+    print("    9 = RTSP loopback benchmark (local RTSP streams vs file input)")
+    print("   10 = CPU affinity sweep (pinning policies x streams heatmaps)")
+    print("   11 = GOP-parallel extraction of one video (latency vs workers)")
+    print("   12 = Decode-only benchmark (demux-once packet cache vs end-to-end)")
+    print("   13 = Cold vs warm input cache benchmark")
+    print("   14 = Frame subsampling benchmark (throughput vs MV coverage)")
+    print("   15 = Writer benchmark (sync vs async motion vector writer)")
+    print("   16 = Output sink benchmark (writer overhead: none / null / CSV / zstd / binary)")
+    print("   17 = Shared-memory ring latency (decode to live consumer)")
     print("    0 = Run ALL steps")
     print()
 
@@ -210,6 +520,18 @@ if __name__ == "__main__":
     print("  3: Generate Plots and PowerPoint")
     print("  4: Generate MV comparison")
     print("  5: Profiler (VTune on FFmpeg hacked)")
+    print("  6: Decoder thread sweep (threads x streams heatmaps)")
+    print("  7: Capacity search (max real-time streams per method)")
+    print("  8: Paced input benchmark (lag behind simulated live cameras)")
+    print("  9: RTSP loopback benchmark (local RTSP streams vs file input)")
+    print(" 10: CPU affinity sweep (pinning policies x streams heatmaps)")
+    print(" 11: GOP-parallel extraction of one video (latency vs workers)")
+    print(" 12: Decode-only benchmark (demux-once packet cache vs end-to-end)")
+    print(" 13: Cold vs warm input cache benchmark")
+    print(" 14: Frame subsampling benchmark (throughput vs MV coverage)")
+    print(" 15: Writer benchmark (sync vs async motion vector writer)")
+    print(" 16: Output sink benchmark (writer overhead: none / null / CSV / zstd / binary)")
+    print(" 17: Shared-memory ring latency (decode to live consumer)")
     print("  0: Run ALL steps")
     print()
 
@@ -221,6 +543,18 @@ if __name__ == "__main__":
         "3": runner.plot,
         "4": runner.generate_mv_comparison,
         "5": runner.profiler,
+        "6": runner.thread_sweep,
+        "7": runner.capacity_search,
+        "8": runner.paced_benchmark,
+        "9": runner.rtsp_loopback,
+        "10": runner.affinity_sweep,
+        "11": runner.gop_parallel,
+        "12": runner.decode_only,
+        "13": runner.cache_benchmark,
+        "14": runner.subsampling,
+        "15": runner.writer_benchmark,
+        "16": runner.sink_benchmark,
+        "17": runner.shm_latency,
         "0": runner.run_all,
     }
 
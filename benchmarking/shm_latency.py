@@ -0,0 +1,192 @@
+import os
+import re
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+import benchmarking.benchmark_python as bp
+import benchmarking.methods as mt
+import benchmarking.slides as sld
+import utils.shm_ring as shm_ring
+
+# pace=1 delivers packets at their timestamps like a live camera; unpaced runs
+# decode as fast as possible, so a reader that falls behind loses frames
+LATENCY_MODES = {
+    "paced": {"pace": 1},
+    "unpaced": {},
+}
+
+RING_OPTIONS = {"format": "shm", "ring_slots": 16}
+
+
+class RingConsumer(threading.Thread):
+    """Polls every expected ring from one thread, like a single analytics
+    process fed by many cameras, and records decode-to-consumer latency."""
+
+    def __init__(self, names, interval=0.0002):
+        super().__init__(daemon=True)
+        self.names = list(names)
+        self.interval = interval
+        self.stop = threading.Event()
+        self.latencies = {name: [] for name in self.names}
+        self.dropped = {name: 0 for name in self.names}
+
+    def run(self):
+        waiting = list(self.names)
+        rings = {}
+        while waiting or rings:
+            for name in list(waiting):
+                if os.path.exists(shm_ring.shm_path(name)):
+                    try:
+                        rings[name] = shm_ring.MotionVectorRing(name)
+                        waiting.remove(name)
+                    except ValueError:
+                        pass  # still being initialized
+
+            received = 0
+            for name, ring in list(rings.items()):
+                closed = ring.closed
+                for frame in ring.poll():
+                    # Touch the vectors through the zero-copy view, as a consumer would
+                    np.abs(frame.mvs["motion_x"]).sum()
+                    self.latencies[name].append(frame.latency_ms)
+                    received += 1
+                if closed and ring.next_seq >= ring.published:
+                    self.dropped[name] = ring.dropped
+                    ring.close()
+                    shm_ring.unlink(name)
+                    del rings[name]
+
+            if self.stop.is_set() and not received:
+                # The harness is done; rings that never appeared will not
+                for ring in rings.values():
+                    ring.close()
+                break
+            if not received:
+                time.sleep(self.interval)
+
+
+def ring_names(method_ids, streams):
+    """Ring of each method and stream, as named by the harness for format=shm."""
+    return [f"/method{m}_output_{i}" for m in method_ids for i in range(streams)]
+
+
+def summarize_latency(consumer):
+    rows = []
+    by_method = {}
+    for name, values in consumer.latencies.items():
+        method_id = int(re.match(r"/method(\d+)_output_", name).group(1))
+        entry = by_method.setdefault(method_id, {"latencies": [], "dropped": 0})
+        entry["latencies"].extend(values)
+        entry["dropped"] += consumer.dropped[name]
+
+    for method_id, entry in by_method.items():
+        lat = np.array(entry["latencies"])
+        received = len(lat)
+        total = received + entry["dropped"]
+        rows.append(
+            {
+                "method": mt.METHODS[method_id]["name"],
+                "frames_received": received,
+                "frames_dropped": entry["dropped"],
+                "dropped_pct": 100.0 * entry["dropped"] / total if total else 0.0,
+                "latency_mean_ms": lat.mean() if received else np.nan,
+                "latency_p50_ms": np.percentile(lat, 50) if received else np.nan,
+                "latency_p95_ms": np.percentile(lat, 95) if received else np.nan,
+                "latency_p99_ms": np.percentile(lat, 99) if received else np.nan,
+                "latency_max_ms": lat.max() if received else np.nan,
+            }
+        )
+    return pd.DataFrame(rows)
+
+
+def create_latency_table(df_latency):
+    tbl = df_latency[
+        [
+            "method",
+            "mode",
+            "fps",
+            "latency_p50_ms",
+            "latency_p95_ms",
+            "latency_p99_ms",
+            "dropped_pct",
+        ]
+    ].copy()
+    tbl.columns = [
+        "Method",
+        "Mode",
+        "FPS",
+        "p50 Latency (ms)",
+        "p95 Latency (ms)",
+        "p99 Latency (ms)",
+        "Frames Dropped (%)",
+    ]
+    return tbl.round(3)
+
+
+def run_shm_latency_benchmark(
+    input_path,
+    streams,
+    exe,
+    project_absolute_path,
+    results_absolute_path,
+    slides_config,
+    plots_folder,
+    method_ids=None,
+):
+    """Publish motion vectors to shared-memory rings and measure how long a
+    frame takes from the decoder to a Python consumer polling the rings."""
+    method_ids = method_ids or mt.high_profile_method_ids()
+    names = ring_names(method_ids, streams)
+
+    all_results = []
+    for mode, options in LATENCY_MODES.items():
+        for name in names:
+            shm_ring.unlink(name)
+
+        consumer = RingConsumer(names)
+        consumer.start()
+        df, _ = bp.run_benchmark(
+            input_path,
+            streams,
+            project_absolute_path,
+            results_absolute_path,
+            exe=exe,
+            do_print=1,
+            options={**options, **RING_OPTIONS},
+            harness_options={"methods": ",".join(str(m) for m in method_ids)},
+        )
+        consumer.stop.set()
+        consumer.join()
+        for name in names:
+            shm_ring.unlink(name)
+
+        if df.empty:
+            print(f"Warning: No data returned for mode '{mode}'")
+            continue
+        latency = summarize_latency(consumer)
+        if not latency.empty:
+            df = df.merge(latency, on="method", how="left")
+        df["mode"] = mode
+        all_results.append(df)
+
+    if not all_results:
+        print("No shared-memory latency results collected!")
+        return pd.DataFrame()
+
+    df_latency = pd.concat(all_results, ignore_index=True)
+    csv_path = os.path.join(plots_folder, "shm_latency_results.csv")
+    df_latency.to_csv(csv_path, index=False)
+    print(f"Saved shared-memory latency results: {csv_path}")
+
+    sld.produce_shm_latency_slides(
+        df_latency,
+        create_latency_table(df_latency),
+        streams,
+        slides_config,
+        "shm_latency_slides.pptx",
+        plots_folder,
+    )
+    return df_latency
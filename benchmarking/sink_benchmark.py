@@ -0,0 +1,143 @@
+import os
+import pandas as pd
+
+import benchmarking.benchmark_python as bp
+import benchmarking.methods as mt
+import benchmarking.slides as sld
+
+# Each sink as (do_print, extractor options), see OutputFormat in extractors/writer.h.
+# "none" skips the writer entirely and is the decode-only baseline.
+SINKS = {
+    "none": (0, {}),
+    "null-device": (1, {"format": "null"}),
+    "csv": (1, {"format": "csv"}),
+    "compressed": (1, {"format": "zstd"}),
+    "binary": (1, {"format": "binary"}),
+}
+
+# Sinks that format CSV text before writing it
+CSV_SINKS = ["null-device", "csv", "compressed"]
+
+
+def summarize_output(stats):
+    """Per-method MVs written and bytes on disk, from the STAT writer lines of one run."""
+    stats = stats.copy()
+    stats["method_id"] = stats["exe"].map(mt.method_id_from_exe)
+
+    def size(row):
+        if row["format"] == "null" or not os.path.exists(row["output"]):
+            return 0
+        return os.path.getsize(row["output"])
+
+    stats["bytes"] = stats.apply(size, axis=1)
+    summary = (
+        stats.groupby("method_id")
+        .agg(mvs_written=("mvs", "sum"), output_bytes=("bytes", "sum"))
+        .reset_index()
+    )
+    summary["method"] = summary["method_id"].map(lambda m: mt.METHODS[m]["name"])
+    return summary.drop(columns="method_id")
+
+
+def add_breakdown(df_sinks):
+    """Split time per frame into decode, CSV formatting and encoding + I/O.
+
+    decode is the run without output, CSV formatting is what the null device
+    adds on top of it, and whatever a sink costs beyond that is encoding + I/O.
+    Run-to-run noise can make a difference negative; those are clipped at 0.
+    """
+    df = df_sinks.copy()
+    t = df.pivot_table(index="method", columns="sink", values="time_per_frame")
+    decode = t["none"]
+    formatting = (t["null-device"] - decode).clip(lower=0)
+
+    def component(row):
+        d = decode[row["method"]]
+        f = formatting[row["method"]] if row["sink"] in CSV_SINKS else 0.0
+        io = 0.0 if row["sink"] in ("none", "null-device") else row["time_per_frame"] - d - f
+        return pd.Series({"decode_ms": d, "format_ms": f, "io_ms": max(io, 0.0)})
+
+    df[["decode_ms", "format_ms", "io_ms"]] = df.apply(component, axis=1)
+    df["overhead_pct"] = 100.0 * (df["time_per_frame"] / df["decode_ms"] - 1)
+    return df
+
+
+def create_sink_table(df_sinks):
+    tbl = df_sinks[
+        ["method", "sink", "time_per_frame", "fps", "overhead_pct", "bytes_per_mv"]
+    ].copy()
+    tbl.columns = [
+        "Method",
+        "Sink",
+        "Time/frame (ms)",
+        "FPS",
+        "Overhead vs No Output (%)",
+        "Bytes/MV",
+    ]
+    return tbl.round(2)
+
+
+def run_sink_benchmark(
+    input_path,
+    streams,
+    exe,
+    project_absolute_path,
+    results_absolute_path,
+    slides_config,
+    plots_folder,
+    method_ids=None,
+):
+    """Run the same streams once per output sink and attribute the writer's
+    cost to CSV formatting and to encoding + I/O."""
+    method_ids = method_ids or mt.high_profile_method_ids()
+
+    all_results = []
+    for n, (sink, (do_print, options)) in enumerate(SINKS.items()):
+        df, output = bp.run_benchmark(
+            input_path,
+            streams,
+            project_absolute_path,
+            results_absolute_path,
+            exe=exe,
+            do_print=do_print,
+            options=options,
+            harness_options={
+                "methods": ",".join(str(m) for m in method_ids),
+                "rotate": n,
+            },
+        )
+        if df.empty:
+            print(f"Warning: No data returned for sink '{sink}'")
+            continue
+        stats = bp.parse_stat_lines(output, "writer")
+        if not stats.empty:
+            df = df.merge(summarize_output(stats), on="method", how="left")
+        df["sink"] = sink
+        all_results.append(df)
+
+    if not all_results:
+        print("No sink benchmark results collected!")
+        return pd.DataFrame()
+
+    df_sinks = pd.concat(all_results, ignore_index=True)
+    if "none" not in df_sinks["sink"].values or "null-device" not in df_sinks["sink"].values:
+        print("Sink benchmark needs both the 'none' and 'null-device' runs for the breakdown!")
+        return df_sinks
+
+    df_sinks = add_breakdown(df_sinks)
+    mvs = df_sinks["mvs_written"].where(df_sinks["mvs_written"] > 0)
+    df_sinks["bytes_per_mv"] = (df_sinks["output_bytes"] / mvs).fillna(0)
+
+    csv_path = os.path.join(plots_folder, "sink_results.csv")
+    df_sinks.to_csv(csv_path, index=False)
+    print(f"Saved writer overhead results: {csv_path}")
+
+    sld.produce_sink_slides(
+        df_sinks,
+        create_sink_table(df_sinks),
+        streams,
+        slides_config,
+        "sink_slides.pptx",
+        plots_folder,
+    )
+    return df_sinks
@@ -131,6 +131,8 @@ def add_scaling_charts(slides, df_hp, plots_folder, config_list):
             cfg["ylabel"],
             cfg["filename"],
             plots_folder,
+            x=cfg.get("x", "streams"),
+            xlabel=cfg.get("xlabel", "Streams"),
         )
         slides.append(
             {
@@ -150,6 +152,8 @@ def add_grouped_bar_charts(slides, df_hp, plots_folder, config_list):
             cfg["ylabel"],
             cfg["filename"],
             plots_folder,
+            x=cfg.get("x", "streams"),
+            xlabel=cfg.get("xlabel", "Streams"),
         )
         slides.append(
             {
@@ -249,7 +253,240 @@ def add_per_stream_metric_charts(
             )
 
 
-def produce_slides(df_hp, slides_config_path, file_name, plots_folder):
+def add_heatmap_charts(slides, df_grid, plots_folder, config_list):
+    """Add <row> x streams heatmaps (decoder threads unless the config sets "row")."""
+    for cfg in config_list:
+        plts.plot_heatmap_grid(
+            df_grid,
+            cfg["metric"],
+            cfg["title"],
+            cfg["cbar_label"],
+            cfg["filename"],
+            plots_folder,
+            cfg["colormap"],
+            row=cfg.get("row", "threads"),
+            row_label=cfg.get("row_label", "Decoder Threads"),
+        )
+        slides.append(
+            {
+                "title": cfg["title"],
+                "subtitle": cfg["subtitle"],
+                "filename": cfg["filename"],
+            }
+        )
+
+
+def add_stacked_breakdown_charts(slides, df, plots_folder, config_list):
+    """Add per-method stacked bars; "components" and "labels" name the stacked columns."""
+    for cfg in config_list:
+        plts.plot_stacked_breakdown(
+            df,
+            cfg["components"],
+            cfg["labels"],
+            cfg["title"],
+            cfg["ylabel"],
+            cfg["filename"],
+            plots_folder,
+            x=cfg.get("x", "sink"),
+            xlabel=cfg.get("xlabel", "Sink"),
+        )
+        slides.append(
+            {
+                "title": cfg["title"],
+                "subtitle": cfg["subtitle"],
+                "filename": cfg["filename"],
+            }
+        )
+
+
+def add_table_slide(slides, tbl, plots_folder, config_list, **subtitle_args):
+    if not config_list:
+        return
+
+    config = config_list[0]
+
+    # used for confluence
+    plts.pretty_table(tbl, config["filename"], plots_folder)
+
+    plts.save_highlighted_table_as_png(
+        tbl, os.path.join(plots_folder, config["highlighted_filename"])
+    )
+
+    slides.append(
+        {
+            "title": config["title"],
+            "subtitle": config["subtitle"].format(**subtitle_args),
+            "filename": config["highlighted_filename"],
+        }
+    )
+
+
+def produce_capacity_slides(tbl, target_fps, slides_config_path, file_name, plots_folder):
+    config = load_benchmark_config(slides_config_path)
+    if not config.get("capacity_search"):
+        print("Aborting capacity slide generation due to missing or invalid config.")
+        return
+
+    slides = []
+    add_table_slide(
+        slides, tbl, plots_folder, config["capacity_search"], target_fps=target_fps
+    )
+    save_to_ppt(slides, file_name, plots_folder)
+
+
+def produce_paced_slides(
+    df_lag, tbl_limits, max_growth, slides_config_path, file_name, plots_folder
+):
+    config = load_benchmark_config(slides_config_path)
+    if not config.get("paced_limits"):
+        print("Aborting paced input slide generation due to missing or invalid config.")
+        return
+
+    slides = []
+    add_table_slide(
+        slides, tbl_limits, plots_folder, config["paced_limits"], max_growth=max_growth
+    )
+    add_scaling_charts(slides, df_lag, plots_folder, config.get("paced_metrics", []))
+    save_to_ppt(slides, file_name, plots_folder)
+
+
+def produce_affinity_slides(df_affinity, slides_config_path, file_name, plots_folder):
+    config = load_benchmark_config(slides_config_path)
+    if not config.get("affinity_heatmap_metrics"):
+        print("Aborting affinity slide generation due to missing or invalid config.")
+        return
+
+    slides = []
+    add_heatmap_charts(
+        slides, df_affinity, plots_folder, config["affinity_heatmap_metrics"]
+    )
+    save_to_ppt(slides, file_name, plots_folder)
+
+
+def produce_gop_parallel_slides(
+    df_latency, tbl_latency, slides_config_path, file_name, plots_folder
+):
+    config = load_benchmark_config(slides_config_path)
+    if not config.get("gop_parallel_table"):
+        print("Aborting GOP-parallel slide generation due to missing or invalid config.")
+        return
+
+    slides = []
+    add_table_slide(slides, tbl_latency, plots_folder, config["gop_parallel_table"])
+    add_scaling_charts(
+        slides, df_latency, plots_folder, config.get("gop_parallel_metrics", [])
+    )
+    save_to_ppt(slides, file_name, plots_folder)
+
+
+def produce_writer_slides(
+    df_plot, tbl_writer, streams, slides_config_path, file_name, plots_folder
+):
+    config = load_benchmark_config(slides_config_path)
+    if not config.get("writer_table"):
+        print("Aborting writer slide generation due to missing or invalid config.")
+        return
+
+    slides = []
+    add_table_slide(slides, tbl_writer, plots_folder, config["writer_table"], streams=streams)
+    add_scaling_charts(slides, df_plot, plots_folder, config.get("writer_metrics", []))
+    save_to_ppt(slides, file_name, plots_folder)
+
+
+def produce_sink_slides(
+    df_sinks, tbl_sinks, streams, slides_config_path, file_name, plots_folder
+):
+    config = load_benchmark_config(slides_config_path)
+    if not config.get("sink_table"):
+        print("Aborting writer overhead slide generation due to missing or invalid config.")
+        return
+
+    slides = []
+    add_table_slide(slides, tbl_sinks, plots_folder, config["sink_table"], streams=streams)
+    add_stacked_breakdown_charts(
+        slides, df_sinks, plots_folder, config.get("sink_breakdown", [])
+    )
+    add_grouped_bar_charts(slides, df_sinks, plots_folder, config.get("sink_metrics", []))
+    save_to_ppt(slides, file_name, plots_folder)
+
+
+def produce_shm_latency_slides(
+    df_latency, tbl_latency, streams, slides_config_path, file_name, plots_folder
+):
+    config = load_benchmark_config(slides_config_path)
+    if not config.get("shm_latency_table"):
+        print("Aborting shared-memory latency slide generation due to missing or invalid config.")
+        return
+
+    slides = []
+    add_table_slide(
+        slides, tbl_latency, plots_folder, config["shm_latency_table"], streams=streams
+    )
+    add_grouped_bar_charts(
+        slides, df_latency, plots_folder, config.get("shm_latency_metrics", [])
+    )
+    save_to_ppt(slides, file_name, plots_folder)
+
+
+def produce_subsampling_slides(
+    df_modes, tbl_modes, streams, slides_config_path, file_name, plots_folder
+):
+    config = load_benchmark_config(slides_config_path)
+    if not config.get("subsampling_table"):
+        print("Aborting subsampling slide generation due to missing or invalid config.")
+        return
+
+    slides = []
+    add_table_slide(slides, tbl_modes, plots_folder, config["subsampling_table"], streams=streams)
+    add_grouped_bar_charts(
+        slides, df_modes, plots_folder, config.get("subsampling_metrics", [])
+    )
+    save_to_ppt(slides, file_name, plots_folder)
+
+
+def produce_cache_slides(
+    df_plot, tbl_penalty, streams, slides_config_path, file_name, plots_folder
+):
+    config = load_benchmark_config(slides_config_path)
+    if not config.get("cache_table"):
+        print("Aborting cold/warm cache slide generation due to missing or invalid config.")
+        return
+
+    slides = []
+    add_table_slide(slides, tbl_penalty, plots_folder, config["cache_table"], streams=streams)
+    add_scaling_charts(slides, df_plot, plots_folder, config.get("cache_metrics", []))
+    save_to_ppt(slides, file_name, plots_folder)
+
+
+def produce_decode_only_slides(
+    df_plot, tbl_share, streams, slides_config_path, file_name, plots_folder
+):
+    config = load_benchmark_config(slides_config_path)
+    if not config.get("decode_only_table"):
+        print("Aborting decode-only slide generation due to missing or invalid config.")
+        return
+
+    slides = []
+    add_table_slide(slides, tbl_share, plots_folder, config["decode_only_table"], streams=streams)
+    add_scaling_charts(slides, df_plot, plots_folder, config.get("decode_only_metrics", []))
+    save_to_ppt(slides, file_name, plots_folder)
+
+
+def produce_rtsp_slides(
+    df_plot, tbl_ingest, streams, slides_config_path, file_name, plots_folder
+):
+    config = load_benchmark_config(slides_config_path)
+    if not config.get("rtsp_table"):
+        print("Aborting RTSP loopback slide generation due to missing or invalid config.")
+        return
+
+    slides = []
+    add_table_slide(slides, tbl_ingest, plots_folder, config["rtsp_table"], streams=streams)
+    add_scaling_charts(slides, df_plot, plots_folder, config.get("rtsp_metrics", []))
+    save_to_ppt(slides, file_name, plots_folder)
+
+
+def produce_slides(df_hp, slides_config_path, file_name, plots_folder, df_grid=None):
     config = load_benchmark_config(slides_config_path)
     if not config:
         print("Aborting slide generation due to missing or invalid config.")
@@ -284,4 +521,13 @@ def produce_slides(df_hp, slides_config_path, file_name, plots_folder):
         slides, df_hp, streams_order, plots_folder, config.get("per_stream_metrics", [])
     )
 
+    # 7. Decoder thread sweep heatmaps
+    if df_grid is not None:
+        add_section_header(
+            slides, "Decoder Threads", "Decoder Thread Count x Streams Grid Sweep"
+        )
+        add_heatmap_charts(
+            slides, df_grid, plots_folder, config.get("heatmap_metrics", [])
+        )
+
     save_to_ppt(slides, file_name, plots_folder)
@@ -0,0 +1,139 @@
+import os
+import pandas as pd
+
+import benchmarking.benchmark_python as bp
+import benchmarking.methods as mt
+import benchmarking.slides as sld
+import utils.ffprobe as ffprobe
+
+
+def subsampling_modes(duration):
+    """Extractor options of each mode; "full" is the baseline the others are compared to."""
+    return {
+        "full": {},
+        "every 2nd": {"every": 2},
+        "every 5th": {"every": 5},
+        "reference only": {"skip_frame": "nonref"},
+        "no B-frames": {"skip_frame": "bidir"},
+        "time window": {"start_s": round(duration * 0.25, 3), "end_s": round(duration * 0.5, 3)},
+    }
+
+
+def read_coverage(results_absolute_path, method_id):
+    """Frames with motion vectors and MV count in the first stream's output."""
+    csv_path = os.path.join(results_absolute_path, f"method{method_id}_output_0.csv")
+    try:
+        frames = pd.read_csv(csv_path, usecols=["frame"])["frame"]
+    except (FileNotFoundError, pd.errors.EmptyDataError):
+        return set(), 0
+    return set(frames.unique()), len(frames)
+
+
+def create_subsampling_table(df_modes):
+    tbl = df_modes[df_modes["mode"] != "full"][
+        ["method", "mode", "fps", "fps_gain_pct", "frame_coverage_pct", "mv_coverage_pct"]
+    ].copy()
+    tbl.columns = [
+        "Method",
+        "Mode",
+        "FPS",
+        "FPS Gain (%)",
+        "Frames Kept (%)",
+        "MVs Kept (%)",
+    ]
+    return tbl.round(1)
+
+
+def run_subsampling_benchmark(
+    input_path,
+    streams,
+    exe,
+    project_absolute_path,
+    results_absolute_path,
+    slides_config,
+    plots_folder,
+    method_ids=None,
+):
+    """Compare each subsampling mode with full extraction: throughput gained
+    and share of the full extraction's motion vectors still written."""
+    source = ffprobe.probe_video_stream(input_path)
+    method_ids = method_ids or mt.high_profile_method_ids()
+    modes = subsampling_modes(source["duration"])
+
+    rows = []
+    baseline = {}
+    for mode, options in modes.items():
+        df, _ = bp.run_benchmark(
+            input_path,
+            streams,
+            project_absolute_path,
+            results_absolute_path,
+            exe=exe,
+            do_print=1,
+            options=options,
+            harness_options={
+                "methods": ",".join(str(m) for m in method_ids),
+                "frames": source["frames"],
+            },
+        )
+        if df.empty:
+            print(f"Warning: No data returned for mode '{mode}'")
+            continue
+
+        for method_id in method_ids:
+            name = mt.METHODS[method_id]["name"]
+            row = df[df["method"] == name]
+            if row.empty:
+                continue
+            frames, mvs = read_coverage(results_absolute_path, method_id)
+            if mode == "full":
+                baseline[name] = {"fps": row["fps"].iloc[0], "frames": frames, "mvs": mvs}
+            rows.append(
+                {
+                    "method": name,
+                    "mode": mode,
+                    "streams": streams,
+                    "fps": row["fps"].iloc[0],
+                    "time_per_frame": row["time_per_frame"].iloc[0],
+                    "cpu": row["cpu"].iloc[0],
+                    "frames_with_mvs": frames,
+                    "mvs_written": mvs,
+                }
+            )
+
+    if not rows:
+        print("No subsampling results collected!")
+        return pd.DataFrame()
+
+    df_modes = pd.DataFrame(rows)
+    df_modes = df_modes[df_modes["method"].isin(baseline)].copy()
+
+    def gain(r):
+        return 100.0 * (r["fps"] / baseline[r["method"]]["fps"] - 1)
+
+    def frame_coverage(r):
+        full = baseline[r["method"]]["frames"]
+        return 100.0 * len(full & r["frames_with_mvs"]) / len(full) if full else 0.0
+
+    def mv_coverage(r):
+        full = baseline[r["method"]]["mvs"]
+        return 100.0 * r["mvs_written"] / full if full else 0.0
+
+    df_modes["fps_gain_pct"] = df_modes.apply(gain, axis=1)
+    df_modes["frame_coverage_pct"] = df_modes.apply(frame_coverage, axis=1)
+    df_modes["mv_coverage_pct"] = df_modes.apply(mv_coverage, axis=1)
+    df_modes["frames_with_mvs"] = df_modes["frames_with_mvs"].map(len)
+
+    csv_path = os.path.join(plots_folder, "subsampling_results.csv")
+    df_modes.to_csv(csv_path, index=False)
+    print(f"Saved subsampling results: {csv_path}")
+
+    sld.produce_subsampling_slides(
+        df_modes[df_modes["mode"] != "full"],
+        create_subsampling_table(df_modes),
+        streams,
+        slides_config,
+        "subsampling_slides.pptx",
+        plots_folder,
+    )
+    return df_modes
@@ -0,0 +1,108 @@
+import os
+import pandas as pd
+
+import benchmarking.benchmark_python as bp
+import benchmarking.methods as mt
+import benchmarking.slides as sld
+
+# Extractor options of each writer mode, see WriterOptions in extractors/writer.h
+WRITER_MODES = {
+    "sync": {"async_writer": 0},
+    "async": {"async_writer": 1, "writer_queue": 8},
+}
+
+
+def summarize_writer(stats):
+    """Per-method writer stats of one run; the worst stream decides the stall and queue peak."""
+    stats = stats.copy()
+    stats["method_id"] = stats["exe"].map(mt.method_id_from_exe)
+    summary = (
+        stats.groupby("method_id")
+        .agg(
+            mean_write_ms=("mean_write_ms", "mean"),
+            max_write_ms=("max_write_ms", "max"),
+            queue_hwm=("queue_hwm", "max"),
+        )
+        .reset_index()
+    )
+    summary["method"] = summary["method_id"].map(lambda m: mt.METHODS[m]["name"])
+    return summary.drop(columns="method_id")
+
+
+def create_writer_table(df_writer, streams):
+    sub = df_writer[df_writer["streams"] == streams]
+    tbl = sub[
+        ["method", "writer", "time_per_frame", "min_stream_fps", "max_write_ms", "queue_hwm"]
+    ].copy()
+    tbl.columns = [
+        "Method",
+        "Writer",
+        "Time/frame (ms)",
+        "Min Stream FPS",
+        "Max Write Stall (ms)",
+        "Queue High-Water",
+    ]
+    return tbl.round(2)
+
+
+def run_writer_benchmark(
+    input_path,
+    max_streams,
+    exe,
+    project_absolute_path,
+    results_absolute_path,
+    slides_config,
+    plots_folder,
+    method_ids=None,
+):
+    """Run every stream count with CSV output written on the decode thread
+    (sync) and from pooled buffers on a background thread (async)."""
+    method_ids = method_ids or mt.high_profile_method_ids()
+    stream_steps = bp.generate_stream_runs(max_streams)
+
+    all_results = []
+    for n, s in enumerate(stream_steps):
+        for mode, options in WRITER_MODES.items():
+            df, output = bp.run_benchmark(
+                input_path,
+                s,
+                project_absolute_path,
+                results_absolute_path,
+                exe=exe,
+                do_print=1,
+                options=options,
+                harness_options={
+                    "methods": ",".join(str(m) for m in method_ids),
+                    "rotate": n,
+                },
+            )
+            if df.empty:
+                print(f"Warning: No data returned for streams={s}, writer={mode}")
+                continue
+            stats = bp.parse_stat_lines(output, "writer")
+            if not stats.empty:
+                df = df.merge(summarize_writer(stats), on="method", how="left")
+            df["writer"] = mode
+            all_results.append(df)
+
+    if not all_results:
+        print("No writer benchmark results collected!")
+        return pd.DataFrame()
+
+    df_writer = pd.concat(all_results, ignore_index=True)
+    csv_path = os.path.join(plots_folder, "writer_results.csv")
+    df_writer.to_csv(csv_path, index=False)
+    print(f"Saved writer benchmark results: {csv_path}")
+
+    # One line per method and writer mode on the scaling charts
+    df_plot = df_writer.copy()
+    df_plot["method"] = df_plot["method"] + " (" + df_plot["writer"] + ")"
+    sld.produce_writer_slides(
+        df_plot,
+        create_writer_table(df_writer, stream_steps[-1]),
+        stream_steps[-1],
+        slides_config,
+        "writer_slides.pptx",
+        plots_folder,
+    )
+    return df_writer
@@ -0,0 +1,12 @@
+#include <stdio.h>
+#include "packet_cache.h"
+
+// Demuxes the video stream of <input> once into a packet cache that the
+// extractors read with packet_cache=<cache_file> (decode-only benchmarks).
+int main(int argc, char** argv) {
+    if (argc < 3) {
+        fprintf(stderr, "Usage: %s <input> <cache_file>\n", argv[0]);
+        return -1;
+    }
+    return PacketCache::Build(argv[1], argv[2]) ? 0 : 1;
+}
@@ -1,5 +1,9 @@
 #include <stdio.h>
 #include "writer.h"
+#include "options.h"
+#include "pacing.h"
+#include "packet_cache.h"
+#include "frame_selection.h"
 
 #include <inttypes.h>
 
@@ -21,7 +25,7 @@ int main(int argc, char** argv) {
     std::string file_name = "";
 
     if (argc < 2) {
-        fprintf(stderr, "Usage: %s <input>\n", argv[0]);
+        fprintf(stderr, "Usage: %s <input> [do_print] [output_file] [key=value ...]\n", argv[0]);
         return -1;
     }
     if (argc >= 3)
@@ -29,14 +33,29 @@ int main(int argc, char** argv) {
     if (argc >= 4)
         file_name = argv[3];
 
+    ExtractorOptions extractor_opts = ParseExtractorOptions(argc, argv, 4);
+
     avformat_network_init();
 
-    if (avformat_open_input(&fmt_ctx, argv[1], NULL, NULL) < 0) {
+    AVDictionary* input_opts = NULL;
+    if (extractor_opts.rtsp_listen)
+        av_dict_set(&input_opts, "rtsp_flags", "listen", 0);
+
+    // packet_cache=<file> replaces the demuxer with packets demuxed once per run
+    PacketCache packet_cache;
+    if (!extractor_opts.packet_cache.empty()) {
+        if (!packet_cache.Open(extractor_opts.packet_cache, &fmt_ctx)) {
+            fprintf(stderr, "Could not open packet cache.\n");
+            return -1;
+        }
+    }
+    else if (avformat_open_input(&fmt_ctx, argv[1], NULL, &input_opts) < 0) {
         fprintf(stderr, "Could not open input file.\n");
         return -1;
     }
+    av_dict_free(&input_opts);
 
-    if (avformat_find_stream_info(fmt_ctx, NULL) < 0) {
+    if (!packet_cache.IsOpen() && avformat_find_stream_info(fmt_ctx, NULL) < 0) {
         fprintf(stderr, "Could not find stream info.\n");
         return -1;
     }
@@ -79,8 +98,7 @@ int main(int argc, char** argv) {
 
     //region flag setting
     AVDictionary* opts = NULL;
-    dec_ctx->thread_count = 0; // 0 lets ffmpeg decide based on CPU cores
-    // dec_ctx->thread_count = 1; // set in c version
+    dec_ctx->thread_count = extractor_opts.thread_count; // 0 lets ffmpeg decide based on CPU cores
     dec_ctx->export_side_data |= AV_CODEC_EXPORT_DATA_MVS;
     av_opt_set_int(dec_ctx, "motion_vectors_only", 1, 0); // CUSTOM PATCHED FLAG
     //endregion
@@ -98,9 +116,28 @@ int main(int argc, char** argv) {
         return -1;
     }
 
+    Pacer pacer;
+    if (extractor_opts.pace)
+        pacer.Start(video_stream);
+    IngestStats ingest;
+    if (extractor_opts.ingest_stats)
+        ingest.Start(video_stream);
+
+    if (extractor_opts.segment_start >= 0) {
+        if (av_seek_frame(fmt_ctx, video_stream_index, extractor_opts.segment_start, AVSEEK_FLAG_BACKWARD) < 0) {
+            fprintf(stderr, "Could not seek to segment start %" PRId64 ".\n", extractor_opts.segment_start);
+            return -1;
+        }
+    }
+    frame_num = extractor_opts.frame_offset;
+
+    FrameSelector selector;
+    if (!selector.Start(fmt_ctx, video_stream_index, dec_ctx, extractor_opts))
+        return -1;
+
     MotionVectorWriter writer;
     if (do_print) {
-        if (!writer.Open(file_name)) {
+        if (!writer.Open(file_name, extractor_opts.writer)) {
             fprintf(stderr, "Failed to open output file\n");
             return 1;
         }
@@ -109,8 +146,27 @@ int main(int argc, char** argv) {
     // for debugging purposes
     fprintf(stderr, "FFmpeg version: %s\n", av_version_info());
 
-    while (av_read_frame(fmt_ctx, pkt) >= 0) {
+    while (packet_cache.ReadPacket(fmt_ctx, pkt) >= 0) {
         if (pkt->stream_index == video_stream_index) {
+            // Segment mode: the next segment's keyframe ends this one
+            if (extractor_opts.segment_end >= 0 && (pkt->flags & AV_PKT_FLAG_KEY) && pkt->dts >= extractor_opts.segment_end) {
+                av_packet_unref(pkt);
+                break;
+            }
+            if (extractor_opts.segment_start >= 0 && pkt->dts < extractor_opts.segment_start) {
+                av_packet_unref(pkt);
+                continue;
+            }
+
+            if (!selector.OnPacket(dec_ctx, pkt)) {
+                av_packet_unref(pkt);
+                break;
+            }
+            if (extractor_opts.pace)
+                pacer.WaitForPacket(pkt);
+            if (extractor_opts.ingest_stats)
+                ingest.OnPacket(pkt);
+
             int ret = avcodec_send_packet(dec_ctx, pkt);
             if (ret < 0) {
                 fprintf(stderr, "Error sending packet for decoding: %d\n", ret);
@@ -126,13 +182,23 @@ int main(int argc, char** argv) {
                     break;
                 }
 
+                if (extractor_opts.pace)
+                    pacer.OnFrame(frame);
+
+                int out_num = selector.FrameNumber(frame, frame_num);
+                if (out_num < 0) {
+                    av_frame_unref(frame);
+                    frame_num++;
+                    continue;
+                }
+
                 AVFrameSideData* sd = av_frame_get_side_data(frame, AV_FRAME_DATA_MOTION_VECTORS);
                 if (do_print) {
                     if (sd && sd->data && sd->size > 0) {
-                        writer.Write(frame_num, (const AVMotionVector*)sd->data, 6, sd->size);
+                        writer.Write(out_num, (const AVMotionVector*)sd->data, 6, sd->size);
                     }
                     else {
-                        fprintf(stderr, "frame %d: no motion vectors\n", frame_num);
+                        fprintf(stderr, "frame %d: no motion vectors\n", out_num);
                     }
                 }
 
@@ -146,15 +212,34 @@ int main(int argc, char** argv) {
     // Flush decoder
     avcodec_send_packet(dec_ctx, NULL);
     while (avcodec_receive_frame(dec_ctx, frame) == 0) {
+        if (extractor_opts.pace)
+            pacer.OnFrame(frame);
+
+        int out_num = selector.FrameNumber(frame, frame_num);
+        if (out_num < 0) {
+            av_frame_unref(frame);
+            frame_num++;
+            continue;
+        }
+
         AVFrameSideData* sd = av_frame_get_side_data(frame, AV_FRAME_DATA_MOTION_VECTORS);
         if (sd) {
             if (do_print)
-                writer.Write(frame_num, (const AVMotionVector*)sd->data, 7, sd->size);
+                writer.Write(out_num, (const AVMotionVector*)sd->data, 6, sd->size);
         }
         av_frame_unref(frame);
         frame_num++;
     }
 
+    if (extractor_opts.pace)
+        pacer.PrintStats(argv[0], file_name);
+    if (extractor_opts.ingest_stats)
+        ingest.PrintStats(argv[0], file_name);
+    selector.PrintStats(argv[0], file_name);
+    // Drains the async writer's queue before the stats are printed
+    writer.Close();
+    writer.PrintStats(argv[0], file_name);
+
     avcodec_free_context(&dec_ctx);
     avformat_close_input(&fmt_ctx);
     av_frame_free(&frame);
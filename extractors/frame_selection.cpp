@@ -0,0 +1,119 @@
+#include "frame_selection.h"
+#include <stdio.h>
+#include <string.h>
+#include <math.h>
+
+static const char* base_name(const char* path) {
+    const char* slash = strrchr(path, '/');
+    return slash ? slash + 1 : path;
+}
+
+static bool parse_discard(std::string const& name, enum AVDiscard* discard) {
+    if (name == "none")
+        *discard = AVDISCARD_NONE;
+    else if (name == "default")
+        *discard = AVDISCARD_DEFAULT;
+    else if (name == "nonref")
+        *discard = AVDISCARD_NONREF;
+    else if (name == "bidir")
+        *discard = AVDISCARD_BIDIR;
+    else if (name == "nonintra")
+        *discard = AVDISCARD_NONINTRA;
+    else if (name == "nonkey")
+        *discard = AVDISCARD_NONKEY;
+    else
+        return false;
+    return true;
+}
+
+bool FrameSelector::Start(AVFormatContext* fmt_ctx, int stream_index, AVCodecContext* dec_ctx, const ExtractorOptions& opts) {
+    active = opts.every > 1 || !opts.skip_frame.empty() || opts.start_s >= 0 || opts.end_s >= 0;
+    if (!active)
+        return true;
+
+    AVStream* stream = fmt_ctx->streams[stream_index];
+    every = opts.every;
+    time_base = stream->time_base;
+    frame_rate = stream->avg_frame_rate.num > 0 ? stream->avg_frame_rate : stream->r_frame_rate;
+    origin = stream->start_time;
+    decoded = 0;
+    written = 0;
+
+    if (frame_rate.num <= 0 || frame_rate.den <= 0) {
+        fprintf(stderr, "Unknown frame rate, frame subsampling needs a constant frame rate stream.\n");
+        return false;
+    }
+
+    if (!opts.skip_frame.empty() && !parse_discard(opts.skip_frame, &base_discard)) {
+        fprintf(stderr, "Unknown skip_frame level '%s'\n", opts.skip_frame.c_str());
+        return false;
+    }
+    dec_ctx->skip_frame = base_discard;
+
+    double fps = av_q2d(frame_rate);
+    first_index = opts.start_s >= 0 ? (int64_t)ceil(opts.start_s * fps) : -1;
+    last_index = opts.end_s >= 0 ? (int64_t)floor(opts.end_s * fps) : -1;
+    if (opts.end_s >= 0)
+        end_ts = (origin != AV_NOPTS_VALUE ? origin : 0) + (int64_t)(opts.end_s / av_q2d(time_base));
+
+    if (opts.start_s > 0 && origin != AV_NOPTS_VALUE) {
+        int64_t start_ts = origin + (int64_t)(opts.start_s / av_q2d(time_base));
+        // Packet caches cannot seek; frames before the window are then decoded and dropped
+        if (av_seek_frame(fmt_ctx, stream_index, start_ts, AVSEEK_FLAG_BACKWARD) < 0)
+            fprintf(stderr, "Could not seek to %.3f s, decoding from the start.\n", opts.start_s);
+    }
+    return true;
+}
+
+int64_t FrameSelector::Index(int64_t ts) const {
+    if (ts == AV_NOPTS_VALUE || origin == AV_NOPTS_VALUE)
+        return -1;
+    return llround((ts - origin) * av_q2d(time_base) * av_q2d(frame_rate));
+}
+
+bool FrameSelector::Selected(int64_t index) const {
+    if (index < 0)
+        return false;
+    if (first_index >= 0 && index < first_index)
+        return false;
+    if (last_index >= 0 && index > last_index)
+        return false;
+    return index % every == 0;
+}
+
+bool FrameSelector::OnPacket(AVCodecContext* dec_ctx, const AVPacket* pkt) {
+    if (!active)
+        return true;
+    if (origin == AV_NOPTS_VALUE)
+        origin = pkt->pts != AV_NOPTS_VALUE ? pkt->pts : pkt->dts;
+
+    // dts <= pts, so every frame inside the window has been read once dts passes its end
+    if (end_ts != AV_NOPTS_VALUE && pkt->dts != AV_NOPTS_VALUE && pkt->dts > end_ts)
+        return false;
+
+    // Unselected frames are only decoded when something references them
+    int64_t index = Index(pkt->pts);
+    bool needed = index < 0 || Selected(index);
+    dec_ctx->skip_frame = (!needed && base_discard < AVDISCARD_NONREF) ? AVDISCARD_NONREF : base_discard;
+    return true;
+}
+
+int FrameSelector::FrameNumber(const AVFrame* frame, int decoded_index) {
+    if (!active)
+        return decoded_index;
+
+    decoded++;
+    int64_t index = Index(frame->best_effort_timestamp);
+    if (!Selected(index))
+        return -1;
+    written++;
+    return (int)index;
+}
+
+void FrameSelector::PrintStats(const char* exe, std::string const& output) const {
+    if (!active)
+        return;
+    printf("STAT select exe=%s output=%s decoded=%lld written=%lld\n",
+        base_name(exe), output.c_str(), decoded, written);
+    fflush(stdout);
+}
@@ -0,0 +1,43 @@
+#pragma once
+
+#include <stdint.h>
+#include <string>
+#include "options.h"
+extern "C" {
+#include <libavformat/avformat.h>
+#include <libavcodec/avcodec.h>
+}
+
+// Frame subsampling for extractors that only need part of the motion:
+// every Nth frame, a decoder skip_frame level, and/or a [start_s, end_s] window.
+// Frames are numbered from their timestamps (constant frame rate assumed) so the
+// written frame numbers line up with a full extraction of the same input.
+// Frames that nothing references are dropped before decoding via skip_frame.
+class FrameSelector {
+public:
+    // Sets the base discard level and seeks to the window start; call after avcodec_open2
+    bool Start(AVFormatContext* fmt_ctx, int stream_index, AVCodecContext* dec_ctx, const ExtractorOptions& opts);
+    bool Active() const {
+        return active;
+    }
+    // Picks the discard level for this packet; false once the packet is past the window
+    bool OnPacket(AVCodecContext* dec_ctx, const AVPacket* pkt);
+    // Output frame number, decoded_index when inactive, -1 when the frame is not selected
+    int FrameNumber(const AVFrame* frame, int decoded_index);
+    void PrintStats(const char* exe, std::string const& output) const;
+private:
+    int64_t Index(int64_t ts) const;
+    bool Selected(int64_t index) const;
+
+    bool active = false;
+    int every = 1;
+    enum AVDiscard base_discard = AVDISCARD_DEFAULT;
+    AVRational time_base = { 1, 1 };
+    AVRational frame_rate = { 0, 1 };
+    int64_t origin = AV_NOPTS_VALUE;
+    int64_t first_index = -1; // window start as a frame index, -1 = unbounded
+    int64_t last_index = -1;  // window end as a frame index, -1 = unbounded
+    int64_t end_ts = AV_NOPTS_VALUE;
+    long long decoded = 0;
+    long long written = 0;
+};
@@ -0,0 +1,104 @@
+#include "options.h"
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+
+ExtractorOptions ParseExtractorOptions(int argc, char** argv, int first) {
+    ExtractorOptions opts;
+
+    for (int i = first; i < argc; i++) {
+        const char* eq = strchr(argv[i], '=');
+        if (!eq) {
+            fprintf(stderr, "Ignoring malformed option '%s' (expected key=value)\n", argv[i]);
+            continue;
+        }
+
+        std::string key(argv[i], eq - argv[i]);
+        const char* value = eq + 1;
+
+        if (key == "threads") {
+            opts.thread_count = atoi(value);
+            if (opts.thread_count < 0) {
+                fprintf(stderr, "Invalid thread count %d, using auto\n", opts.thread_count);
+                opts.thread_count = 0;
+            }
+        }
+        else if (key == "pace") {
+            opts.pace = atoi(value) != 0;
+        }
+        else if (key == "rtsp_listen") {
+            opts.rtsp_listen = atoi(value) != 0;
+        }
+        else if (key == "ingest_stats") {
+            opts.ingest_stats = atoi(value) != 0;
+        }
+        else if (key == "segment_start") {
+            opts.segment_start = strtoll(value, NULL, 10);
+        }
+        else if (key == "segment_end") {
+            opts.segment_end = strtoll(value, NULL, 10);
+        }
+        else if (key == "frame_offset") {
+            opts.frame_offset = atoi(value);
+        }
+        else if (key == "packet_cache") {
+            opts.packet_cache = value;
+        }
+        else if (key == "every") {
+            opts.every = atoi(value);
+            if (opts.every < 1) {
+                fprintf(stderr, "Invalid frame step %d, writing every frame\n", opts.every);
+                opts.every = 1;
+            }
+        }
+        else if (key == "skip_frame") {
+            opts.skip_frame = value;
+        }
+        else if (key == "start_s") {
+            opts.start_s = atof(value);
+        }
+        else if (key == "end_s") {
+            opts.end_s = atof(value);
+        }
+        else if (key == "async_writer") {
+            opts.writer.async = atoi(value) != 0;
+        }
+        else if (key == "writer_queue") {
+            opts.writer.queue_depth = atoi(value);
+            if (opts.writer.queue_depth < 1) {
+                fprintf(stderr, "Invalid writer queue depth %d, using 1\n", opts.writer.queue_depth);
+                opts.writer.queue_depth = 1;
+            }
+        }
+        else if (key == "format") {
+            if (!ParseOutputFormat(value, &opts.writer.format))
+                fprintf(stderr, "Unknown output format '%s', writing CSV\n", value);
+        }
+        else if (key == "flush_frames") {
+            opts.writer.flush_frames = atoi(value);
+            if (opts.writer.flush_frames < 0) {
+                fprintf(stderr, "Invalid flush interval %d, flushing only at the end\n", opts.writer.flush_frames);
+                opts.writer.flush_frames = 0;
+            }
+        }
+        else if (key == "ring_slots") {
+            opts.writer.ring_slots = atoi(value);
+            if (opts.writer.ring_slots < 1) {
+                fprintf(stderr, "Invalid ring size %d, using 1 slot\n", opts.writer.ring_slots);
+                opts.writer.ring_slots = 1;
+            }
+        }
+        else if (key == "ring_slot_mvs") {
+            opts.writer.ring_slot_mvs = atoi(value);
+            if (opts.writer.ring_slot_mvs < 1) {
+                fprintf(stderr, "Invalid ring slot size %d, using 8192 vectors\n", opts.writer.ring_slot_mvs);
+                opts.writer.ring_slot_mvs = 8192;
+            }
+        }
+        else {
+            fprintf(stderr, "Ignoring unknown option '%s'\n", key.c_str());
+        }
+    }
+
+    return opts;
+}
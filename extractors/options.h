@@ -0,0 +1,33 @@
+#pragma once
+
+#include <stdint.h>
+#include <string>
+#include "writer.h"
+
+// Optional extractor settings passed after the positional arguments
+// (<input> [do_print] [output_file]) as key=value pairs, e.g. "threads=2".
+struct ExtractorOptions {
+    int thread_count = 0; // 0 lets ffmpeg decide based on CPU cores
+    bool pace = false;    // deliver packets at their container timestamps (simulated live feed)
+    bool rtsp_listen = false;  // act as the RTSP server and wait for a client to push the stream
+    bool ingest_stats = false; // report received bytes, throughput and packet jitter
+
+    // GOP segment (extractor6 only): decode from the keyframe at segment_start up to,
+    // not including, the keyframe at segment_end (dts in stream time base, -1 = open end)
+    // and number the output frames from frame_offset
+    int64_t segment_start = -1;
+    int64_t segment_end = -1;
+    int frame_offset = 0;
+
+    std::string packet_cache; // read pre-demuxed packets from this cache file (decode-only benchmark)
+
+    // Frame subsampling, see FrameSelector
+    int every = 1;          // write every Nth frame, drop the others at the decoder when unreferenced
+    std::string skip_frame; // decoder discard level: nonref, bidir, nonintra, nonkey
+    double start_s = -1;    // time window in seconds from the stream start, -1 = unbounded
+    double end_s = -1;
+
+    WriterOptions writer; // async_writer=1, writer_queue=N, format=, flush_frames=N, ring_slots=N, ring_slot_mvs=N
+};
+
+ExtractorOptions ParseExtractorOptions(int argc, char** argv, int first);
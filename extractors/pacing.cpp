@@ -0,0 +1,138 @@
+#include "pacing.h"
+#include <stdio.h>
+#include <string.h>
+#include <time.h>
+#include <algorithm>
+
+static double monotonic_ms() {
+    struct timespec ts;
+    clock_gettime(CLOCK_MONOTONIC, &ts);
+    return ts.tv_sec * 1000.0 + ts.tv_nsec / 1e6;
+}
+
+static const char* base_name(const char* path) {
+    const char* slash = strrchr(path, '/');
+    return slash ? slash + 1 : path;
+}
+
+void Pacer::Start(const AVStream* stream) {
+    time_base = stream->time_base;
+    first_ts = AV_NOPTS_VALUE;
+    first_frame_ts = AV_NOPTS_VALUE;
+    media_s.clear();
+    lag_ms.clear();
+}
+
+double Pacer::DueMs(int64_t ts, int64_t origin) const {
+    return start_ms + (ts - origin) * av_q2d(time_base) * 1000.0;
+}
+
+void Pacer::WaitForPacket(const AVPacket* pkt) {
+    // Packets are fed in decode order, so schedule them by dts
+    int64_t ts = pkt->dts != AV_NOPTS_VALUE ? pkt->dts : pkt->pts;
+    if (ts == AV_NOPTS_VALUE)
+        return;
+
+    if (first_ts == AV_NOPTS_VALUE) {
+        first_ts = ts;
+        start_ms = monotonic_ms();
+        return;
+    }
+
+    double wait_ms = DueMs(ts, first_ts) - monotonic_ms();
+    if (wait_ms > 0) {
+        struct timespec delay;
+        delay.tv_sec = (time_t)(wait_ms / 1000.0);
+        delay.tv_nsec = (long)((wait_ms - delay.tv_sec * 1000.0) * 1e6);
+        nanosleep(&delay, NULL);
+    }
+}
+
+void Pacer::OnFrame(const AVFrame* frame) {
+    int64_t ts = frame->best_effort_timestamp;
+    if (ts == AV_NOPTS_VALUE || first_ts == AV_NOPTS_VALUE)
+        return;
+
+    // Frames are timed by pts and packets by dts; with B-frames the two differ
+    // by the reorder delay, so frame lag is measured on the pts timeline, the
+    // first frame being due when the first packet was delivered
+    if (first_frame_ts == AV_NOPTS_VALUE)
+        first_frame_ts = ts;
+
+    media_s.push_back((ts - first_frame_ts) * av_q2d(time_base));
+    lag_ms.push_back(monotonic_ms() - DueMs(ts, first_frame_ts));
+}
+
+void Pacer::PrintStats(const char* exe, std::string const& output) const {
+    size_t n = lag_ms.size();
+    if (n == 0)
+        return;
+
+    double sum = 0, max_lag = lag_ms[0];
+    for (double lag : lag_ms) {
+        sum += lag;
+        max_lag = std::max(max_lag, lag);
+    }
+    double mean = sum / n;
+
+    std::vector<double> sorted = lag_ms;
+    std::sort(sorted.begin(), sorted.end());
+    double p95 = sorted[(size_t)(0.95 * (n - 1))];
+
+    // Least-squares slope of lag over media time: ~0 when the stream keeps up,
+    // positive when lag keeps growing (the decoder falls further behind live)
+    double mean_t = 0;
+    for (double t : media_s)
+        mean_t += t;
+    mean_t /= n;
+    double cov = 0, var = 0;
+    for (size_t i = 0; i < n; i++) {
+        cov += (media_s[i] - mean_t) * (lag_ms[i] - mean);
+        var += (media_s[i] - mean_t) * (media_s[i] - mean_t);
+    }
+    double growth = var > 0 ? cov / var : 0;
+
+    // Single printf + fflush so lines from parallel streams do not interleave
+    printf("STAT lag exe=%s output=%s frames=%zu mean_ms=%.2f p95_ms=%.2f max_ms=%.2f final_ms=%.2f growth_ms_per_s=%.3f\n",
+        base_name(exe), output.c_str(), n, mean, p95, max_lag, lag_ms[n - 1], growth);
+    fflush(stdout);
+}
+
+void IngestStats::Start(const AVStream* stream) {
+    time_base = stream->time_base;
+    bytes = 0;
+    packets = 0;
+    jitter_ms = 0;
+}
+
+void IngestStats::OnPacket(const AVPacket* pkt) {
+    double arrival = monotonic_ms();
+    int64_t ts = pkt->dts != AV_NOPTS_VALUE ? pkt->dts : pkt->pts;
+    double transit = (ts != AV_NOPTS_VALUE) ? arrival - ts * av_q2d(time_base) * 1000.0 : 0;
+
+    if (packets == 0) {
+        first_arrival_ms = arrival;
+    }
+    else if (ts != AV_NOPTS_VALUE) {
+        // J += (|D| - J) / 16, D being the change in transit time between packets
+        double d = transit - last_transit_ms;
+        jitter_ms += ((d < 0 ? -d : d) - jitter_ms) / 16.0;
+    }
+
+    last_transit_ms = transit;
+    last_arrival_ms = arrival;
+    bytes += pkt->size;
+    packets++;
+}
+
+void IngestStats::PrintStats(const char* exe, std::string const& output) const {
+    if (packets == 0)
+        return;
+
+    double duration_s = (last_arrival_ms - first_arrival_ms) / 1000.0;
+    double mbps = duration_s > 0 ? bytes * 8.0 / duration_s / 1e6 : 0;
+
+    printf("STAT ingest exe=%s output=%s packets=%lld bytes=%lld duration_s=%.3f mbps=%.3f jitter_ms=%.3f\n",
+        base_name(exe), output.c_str(), (long long)packets, (long long)bytes, duration_s, mbps, jitter_ms);
+    fflush(stdout);
+}
@@ -0,0 +1,43 @@
+#pragma once
+
+#include <string>
+#include <vector>
+extern "C" {
+#include <libavformat/avformat.h>
+#include <libavcodec/avcodec.h>
+}
+
+// Delivers packets at their container timestamps, like a live camera feed,
+// and measures how far behind real time each decoded frame comes out.
+class Pacer {
+public:
+    void Start(const AVStream* stream);
+    void WaitForPacket(const AVPacket* pkt);
+    void OnFrame(const AVFrame* frame);
+    void PrintStats(const char* exe, std::string const& output) const;
+private:
+    double DueMs(int64_t ts, int64_t origin) const;
+    AVRational time_base = { 1, 1 };
+    int64_t first_ts = AV_NOPTS_VALUE;       // dts of the first packet, origin of packet scheduling
+    int64_t first_frame_ts = AV_NOPTS_VALUE; // pts of the first frame, origin of frame lag
+    double start_ms = 0;
+    std::vector<double> media_s; // frame timestamp relative to the first frame
+    std::vector<double> lag_ms;  // decode completion time minus the frame's live due time
+};
+
+// Ingest accounting for network-style inputs: bytes received and the
+// RFC 3550 interarrival jitter of video packets against their timestamps.
+class IngestStats {
+public:
+    void Start(const AVStream* stream);
+    void OnPacket(const AVPacket* pkt);
+    void PrintStats(const char* exe, std::string const& output) const;
+private:
+    AVRational time_base = { 1, 1 };
+    int64_t bytes = 0;
+    int64_t packets = 0;
+    double first_arrival_ms = 0;
+    double last_arrival_ms = 0;
+    double last_transit_ms = 0;
+    double jitter_ms = 0;
+};
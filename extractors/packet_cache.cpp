@@ -0,0 +1,181 @@
+#include "packet_cache.h"
+#include <stdio.h>
+#include <string.h>
+#include <fcntl.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include <unistd.h>
+#include <vector>
+extern "C" {
+#include <libavutil/mem.h>
+}
+
+static const char kPacketCacheMagic[8] = { 'M', 'V', 'P', 'K', 'T', 'C', '1', '\0' };
+
+bool PacketCache::Build(const char* input, std::string const& path) {
+    AVFormatContext* fmt_ctx = NULL;
+    if (avformat_open_input(&fmt_ctx, input, NULL, NULL) < 0) {
+        fprintf(stderr, "Could not open input file %s\n", input);
+        return false;
+    }
+    if (avformat_find_stream_info(fmt_ctx, NULL) < 0) {
+        fprintf(stderr, "Could not find stream info.\n");
+        avformat_close_input(&fmt_ctx);
+        return false;
+    }
+    int video_stream_index = av_find_best_stream(fmt_ctx, AVMEDIA_TYPE_VIDEO, -1, -1, NULL, 0);
+    if (video_stream_index < 0) {
+        fprintf(stderr, "Could not find video stream\n");
+        avformat_close_input(&fmt_ctx);
+        return false;
+    }
+    AVStream* stream = fmt_ctx->streams[video_stream_index];
+    const AVCodecParameters* par = stream->codecpar;
+
+    FILE* out = fopen(path.c_str(), "wb");
+    if (!out) {
+        fprintf(stderr, "Failed to open file: %s\n", path.c_str());
+        avformat_close_input(&fmt_ctx);
+        return false;
+    }
+
+    PacketCacheHeader hdr;
+    memset(&hdr, 0, sizeof(hdr));
+    memcpy(hdr.magic, kPacketCacheMagic, sizeof(hdr.magic));
+    hdr.codec_type = par->codec_type;
+    hdr.codec_id = par->codec_id;
+    hdr.codec_tag = par->codec_tag;
+    hdr.width = par->width;
+    hdr.height = par->height;
+    hdr.format = par->format;
+    hdr.profile = par->profile;
+    hdr.level = par->level;
+    hdr.time_base = stream->time_base;
+    hdr.avg_frame_rate = stream->avg_frame_rate;
+    hdr.extradata_size = par->extradata_size;
+
+    // Header is rewritten with the final counts once all packets are in
+    fwrite(&hdr, sizeof(hdr), 1, out);
+    if (par->extradata_size > 0)
+        fwrite(par->extradata, 1, par->extradata_size, out);
+
+    std::vector<PacketCacheEntry> index;
+    const uint8_t padding[AV_INPUT_BUFFER_PADDING_SIZE] = { 0 };
+    int64_t offset = sizeof(hdr) + par->extradata_size;
+    AVPacket* pkt = av_packet_alloc();
+    while (av_read_frame(fmt_ctx, pkt) >= 0) {
+        if (pkt->stream_index == video_stream_index) {
+            PacketCacheEntry e;
+            e.offset = offset;
+            e.pts = pkt->pts;
+            e.dts = pkt->dts;
+            e.duration = pkt->duration;
+            e.size = pkt->size;
+            e.flags = pkt->flags;
+            index.push_back(e);
+
+            fwrite(pkt->data, 1, pkt->size, out);
+            fwrite(padding, 1, sizeof(padding), out);
+            offset += pkt->size + sizeof(padding);
+        }
+        av_packet_unref(pkt);
+    }
+    av_packet_free(&pkt);
+
+    hdr.packet_count = index.size();
+    hdr.index_offset = offset;
+    fwrite(index.data(), sizeof(PacketCacheEntry), index.size(), out);
+    fseek(out, 0, SEEK_SET);
+    fwrite(&hdr, sizeof(hdr), 1, out);
+
+    bool ok = !ferror(out);
+    fclose(out);
+    avformat_close_input(&fmt_ctx);
+    printf("Packet cache %s: %lld packets, %lld bytes\n", path.c_str(), (long long)hdr.packet_count,
+        (long long)(offset + index.size() * sizeof(PacketCacheEntry)));
+    return ok;
+}
+
+bool PacketCache::Open(std::string const& path, AVFormatContext** fmt_ctx) {
+    int fd = open(path.c_str(), O_RDONLY);
+    if (fd < 0) {
+        fprintf(stderr, "Failed to open file: %s\n", path.c_str());
+        return false;
+    }
+    struct stat st;
+    if (fstat(fd, &st) != 0 || st.st_size < (off_t)sizeof(PacketCacheHeader)) {
+        fprintf(stderr, "Invalid packet cache: %s\n", path.c_str());
+        close(fd);
+        return false;
+    }
+    void* addr = mmap(NULL, st.st_size, PROT_READ, MAP_SHARED, fd, 0);
+    close(fd);
+    if (addr == MAP_FAILED) {
+        perror("mmap failed");
+        return false;
+    }
+    map = (const uint8_t*)addr;
+    map_size = st.st_size;
+    header = (const PacketCacheHeader*)map;
+
+    if (memcmp(header->magic, kPacketCacheMagic, sizeof(header->magic)) != 0 ||
+        header->index_offset + header->packet_count * (int64_t)sizeof(PacketCacheEntry) > (int64_t)map_size) {
+        fprintf(stderr, "Invalid packet cache: %s\n", path.c_str());
+        Close();
+        return false;
+    }
+    entries = (const PacketCacheEntry*)(map + header->index_offset);
+    next = 0;
+
+    *fmt_ctx = avformat_alloc_context();
+    AVStream* stream = *fmt_ctx ? avformat_new_stream(*fmt_ctx, NULL) : NULL;
+    if (!stream) {
+        fprintf(stderr, "Could not allocate stream for packet cache.\n");
+        Close();
+        return false;
+    }
+    AVCodecParameters* par = stream->codecpar;
+    par->codec_type = (enum AVMediaType)header->codec_type;
+    par->codec_id = (enum AVCodecID)header->codec_id;
+    par->codec_tag = header->codec_tag;
+    par->width = header->width;
+    par->height = header->height;
+    par->format = header->format;
+    par->profile = header->profile;
+    par->level = header->level;
+    if (header->extradata_size > 0) {
+        par->extradata = (uint8_t*)av_mallocz(header->extradata_size + AV_INPUT_BUFFER_PADDING_SIZE);
+        memcpy(par->extradata, map + sizeof(PacketCacheHeader), header->extradata_size);
+        par->extradata_size = header->extradata_size;
+    }
+    stream->time_base = header->time_base;
+    stream->avg_frame_rate = header->avg_frame_rate;
+    stream->r_frame_rate = header->avg_frame_rate;
+    return true;
+}
+
+int PacketCache::ReadPacket(AVFormatContext* fmt_ctx, AVPacket* pkt) {
+    if (!IsOpen())
+        return av_read_frame(fmt_ctx, pkt);
+    if (next >= header->packet_count)
+        return AVERROR_EOF;
+
+    const PacketCacheEntry& e = entries[next++];
+    pkt->data = const_cast<uint8_t*>(map + e.offset);
+    pkt->size = e.size;
+    pkt->pts = e.pts;
+    pkt->dts = e.dts;
+    pkt->duration = e.duration;
+    pkt->flags = e.flags;
+    pkt->stream_index = 0;
+    return 0;
+}
+
+void PacketCache::Close() {
+    if (map) {
+        munmap(const_cast<uint8_t*>(map), map_size);
+        map = nullptr;
+        header = nullptr;
+        entries = nullptr;
+    }
+}
@@ -0,0 +1,65 @@
+#pragma once
+
+#include <stdint.h>
+#include <string>
+extern "C" {
+#include <libavformat/avformat.h>
+#include <libavcodec/avcodec.h>
+}
+
+// Pre-demuxed video packets of one input, written once by build_packet_cache
+// and memory-mapped read-only by every extractor (keep it in /dev/shm to share
+// one copy of the packets between all streams of a run).
+//
+// Layout: PacketCacheHeader, extradata, packet data (each packet followed by
+// AV_INPUT_BUFFER_PADDING_SIZE zero bytes), then packet_count PacketCacheEntry.
+struct PacketCacheHeader {
+    char magic[8];
+    int32_t codec_type;
+    int32_t codec_id;
+    uint32_t codec_tag;
+    int32_t width;
+    int32_t height;
+    int32_t format;
+    int32_t profile;
+    int32_t level;
+    AVRational time_base;
+    AVRational avg_frame_rate;
+    int64_t extradata_size;
+    int64_t packet_count;
+    int64_t index_offset;
+};
+
+struct PacketCacheEntry {
+    int64_t offset;
+    int64_t pts;
+    int64_t dts;
+    int64_t duration;
+    int32_t size;
+    int32_t flags;
+};
+
+class PacketCache {
+public:
+    ~PacketCache() {
+        Close();
+    }
+    static bool Build(const char* input, std::string const& path);
+
+    // Maps the cache and creates a demuxer-less *fmt_ctx with one video stream
+    // (index 0) carrying the cached codec parameters and time base.
+    bool Open(std::string const& path, AVFormatContext** fmt_ctx);
+    bool IsOpen() const {
+        return map != nullptr;
+    }
+    // Next cached packet when the cache is open, av_read_frame() otherwise.
+    // Cached packets point into the mapping (not refcounted).
+    int ReadPacket(AVFormatContext* fmt_ctx, AVPacket* pkt);
+    void Close();
+private:
+    const uint8_t* map = nullptr;
+    size_t map_size = 0;
+    const PacketCacheHeader* header = nullptr;
+    const PacketCacheEntry* entries = nullptr;
+    int64_t next = 0;
+};
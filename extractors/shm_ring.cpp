@@ -0,0 +1,113 @@
+#include "shm_ring.h"
+#include <fcntl.h>
+#include <stdio.h>
+#include <string.h>
+#include <sys/mman.h>
+#include <time.h>
+#include <unistd.h>
+
+static_assert(sizeof(ShmRingHeader) == 64, "ShmRingHeader layout is read by utils/shm_ring.py");
+static_assert(sizeof(ShmRingSlot) == 64, "ShmRingSlot layout is read by utils/shm_ring.py");
+
+static int64_t monotonic_ns() {
+    struct timespec ts;
+    clock_gettime(CLOCK_MONOTONIC, &ts);
+    return ts.tv_sec * 1000000000LL + ts.tv_nsec;
+}
+
+bool ShmRing::Open(std::string const& shm_name, int slot_count, int slot_capacity) {
+    if (slot_count < 1 || slot_capacity < 1) {
+        fprintf(stderr, "Invalid ring size: %d slots of %d vectors\n", slot_count, slot_capacity);
+        return false;
+    }
+
+    // A fresh object every run, so a reader never attaches to a previous run's ring
+    shm_unlink(shm_name.c_str());
+    int fd = shm_open(shm_name.c_str(), O_CREAT | O_EXCL | O_RDWR, 0600);
+    if (fd < 0) {
+        perror("shm_open failed");
+        return false;
+    }
+
+    uint64_t slot_bytes = sizeof(ShmRingSlot) + (uint64_t)slot_capacity * sizeof(AVMotionVector);
+    slot_bytes = (slot_bytes + 63) & ~uint64_t(63);
+    size_t size = sizeof(ShmRingHeader) + slot_bytes * slot_count;
+    if (ftruncate(fd, size) != 0) {
+        perror("ftruncate failed");
+        close(fd);
+        shm_unlink(shm_name.c_str());
+        return false;
+    }
+
+    void* addr = mmap(NULL, size, PROT_READ | PROT_WRITE, MAP_SHARED, fd, 0);
+    close(fd);
+    if (addr == MAP_FAILED) {
+        perror("mmap failed");
+        shm_unlink(shm_name.c_str());
+        return false;
+    }
+
+    name = shm_name;
+    map = (uint8_t*)addr;
+    map_size = size;
+    next_seq = 0;
+    truncated_frames = 0;
+
+    // ftruncate zero-fills, so every slot starts at seq 0 (empty)
+    header = (ShmRingHeader*)map;
+    header->slot_count = slot_count;
+    header->slot_capacity = slot_capacity;
+    header->mv_size = sizeof(AVMotionVector);
+    header->header_size = sizeof(ShmRingHeader);
+    header->slot_bytes = slot_bytes;
+    header->writer_pid = getpid();
+    std::atomic_thread_fence(std::memory_order_release);
+    memcpy(header->magic, "MVRING1", 8);
+    return true;
+}
+
+void ShmRing::Publish(int frame_num, int method_id, const AVMotionVector* mvs, size_t count,
+    int64_t decoded_ns) {
+
+    if (!header)
+        return;
+
+    uint64_t seq = next_seq++;
+    ShmRingSlot* slot = (ShmRingSlot*)(map + sizeof(ShmRingHeader)
+        + (seq % header->slot_count) * header->slot_bytes);
+
+    size_t stored = count < header->slot_capacity ? count : header->slot_capacity;
+    if (stored < count)
+        truncated_frames++;
+
+    slot->seq.store(2 * seq + 1, std::memory_order_relaxed);
+    std::atomic_thread_fence(std::memory_order_release);
+
+    slot->frame_num = frame_num;
+    slot->method_id = method_id;
+    slot->count = stored;
+    slot->truncated = count - stored;
+    slot->decoded_ns = decoded_ns;
+    memcpy((uint8_t*)slot + sizeof(ShmRingSlot), mvs, stored * sizeof(AVMotionVector));
+    slot->published_ns = monotonic_ns();
+
+    slot->seq.store(2 * seq + 2, std::memory_order_release);
+    header->published.store(seq + 1, std::memory_order_release);
+}
+
+void ShmRing::Close() {
+    if (!map)
+        return;
+    // The object stays until the consumer unlinks it, so late readers can drain it
+    header->closed.store(1, std::memory_order_release);
+    munmap(map, map_size);
+    map = nullptr;
+    header = nullptr;
+}
+
+void ShmRing::PrintStats(const char* exe) const {
+    const char* slash = strrchr(exe, '/');
+    printf("STAT ring exe=%s name=%s frames=%llu truncated_frames=%lld\n",
+        slash ? slash + 1 : exe, name.c_str(), (unsigned long long)next_seq, truncated_frames);
+    fflush(stdout);
+}
@@ -0,0 +1,60 @@
+#pragma once
+
+#include <atomic>
+#include <stdint.h>
+#include <string>
+extern "C" {
+#include <libavutil/motion_vector.h>
+}
+
+// POSIX shared-memory ring of per-frame AVMotionVector arrays for live
+// consumers (utils/shm_ring.py). The writer never waits: slot seq % slot_count
+// is overwritten when the reader falls more than slot_count frames behind.
+//
+// Layout: ShmRingHeader, then slot_count slots of ShmRingSlot followed by
+// slot_capacity AVMotionVector. Each slot is a seqlock: its seq is 2*n+1 while
+// frame n is being copied in and 2*n+2 once it is complete, so a reader
+// re-checks seq after using the data to detect that it was overwritten.
+struct ShmRingHeader {
+    char magic[8]; // "MVRING1", written last so readers never see a half-built ring
+    uint32_t slot_count;
+    uint32_t slot_capacity; // motion vectors per slot, larger frames are truncated
+    uint32_t mv_size;       // sizeof(AVMotionVector)
+    uint32_t header_size;
+    uint64_t slot_bytes;    // slot header plus vector array
+    std::atomic<uint64_t> published; // frames completed so far
+    std::atomic<uint32_t> closed;    // set by Close(), nothing more will be published
+    int32_t writer_pid;
+    char reserved[16];
+};
+
+struct ShmRingSlot {
+    std::atomic<uint64_t> seq;
+    int32_t frame_num;
+    int32_t method_id;
+    uint32_t count;
+    uint32_t truncated;  // vectors dropped because the frame exceeded slot_capacity
+    int64_t decoded_ns;  // CLOCK_MONOTONIC when the decoder handed out the frame
+    int64_t published_ns; // CLOCK_MONOTONIC when the slot was complete
+    char reserved[24];
+};
+
+class ShmRing {
+public:
+    ~ShmRing() {
+        Close();
+    }
+    // name is a POSIX shm name ("/method0_output_0"); an existing ring is replaced
+    bool Open(std::string const& name, int slot_count, int slot_capacity);
+    void Publish(int frame_num, int method_id, const AVMotionVector* mvs, size_t count,
+        int64_t decoded_ns);
+    void Close();
+    void PrintStats(const char* exe) const;
+private:
+    std::string name;
+    uint8_t* map = nullptr;
+    size_t map_size = 0;
+    ShmRingHeader* header = nullptr;
+    uint64_t next_seq = 0;
+    long long truncated_frames = 0;
+};
@@ -1,25 +1,123 @@
 #include "writer.h"
 #include <stdio.h>
+#include <string.h>
+#include <time.h>
 
 #include <stdlib.h>
 
-bool MotionVectorWriter::Open(std::string const& filename) {
-    file.open(filename);
-    if (!file.is_open()) {
-        fprintf(stderr, "Failed to open file: %s\n", filename.c_str());
+static double monotonic_ms() {
+    struct timespec ts;
+    clock_gettime(CLOCK_MONOTONIC, &ts);
+    return ts.tv_sec * 1000.0 + ts.tv_nsec / 1e6;
+}
+
+static int64_t monotonic_ns() {
+    struct timespec ts;
+    clock_gettime(CLOCK_MONOTONIC, &ts);
+    return ts.tv_sec * 1000000000LL + ts.tv_nsec;
+}
+
+static const char* base_name(const char* path) {
+    const char* slash = strrchr(path, '/');
+    return slash ? slash + 1 : path;
+}
+
+static const char kCsvHeader[] =
+    "frame,method_id,source,w,h,src_x,src_y,dst_x,dst_y,flags,motion_x,"
+    "motion_y,motion_scale\n";
+
+bool ParseOutputFormat(std::string const& name, OutputFormat* format) {
+    if (name == "csv")
+        *format = OutputFormat::Csv;
+    else if (name == "null")
+        *format = OutputFormat::Null;
+    else if (name == "zstd")
+        *format = OutputFormat::Zstd;
+    else if (name == "binary")
+        *format = OutputFormat::Binary;
+    else if (name == "shm")
+        *format = OutputFormat::Shm;
+    else
         return false;
+    return true;
+}
+
+static const char* format_name(OutputFormat format) {
+    switch (format) {
+    case OutputFormat::Null: return "null";
+    case OutputFormat::Zstd: return "zstd";
+    case OutputFormat::Binary: return "binary";
+    case OutputFormat::Shm: return "shm";
+    default: return "csv";
     }
+}
 
-    file << "frame,method_id,source,w,h,src_x,src_y,dst_x,dst_y,flags,motion_x,"
-        "motion_y,motion_scale\n";
+bool MotionVectorWriter::Open(std::string const& filename, WriterOptions const& opts) {
+    options = opts;
+#ifndef HAVE_ZSTD
+    if (options.format == OutputFormat::Zstd) {
+        fprintf(stderr, "format=zstd requested but the extractor was built without zstd\n");
+        return false;
+    }
+#endif
+
+    if (options.format == OutputFormat::Shm) {
+        if (!ring.Open(filename, options.ring_slots, options.ring_slot_mvs))
+            return false;
+    }
+    else if (!OpenFile(filename)) {
+        return false;
+    }
     frame_num = 0; // Reset frame number
+    rows_written = 0;
+
+    if (options.async) {
+        if (options.queue_depth < 1)
+            options.queue_depth = 1;
+        pool.clear();
+        free_batches.clear();
+        for (int i = 0; i < options.queue_depth; i++) {
+            pool.emplace_back(new Batch());
+            free_batches.push_back(pool.back().get());
+        }
+        stopping = false;
+        worker = std::thread(&MotionVectorWriter::Run, this);
+    }
+    return true;
+}
+
+bool MotionVectorWriter::OpenFile(std::string const& filename) {
+    bool binary = options.format == OutputFormat::Zstd || options.format == OutputFormat::Binary;
+    std::string path = options.format == OutputFormat::Null ? "/dev/null" : filename;
+    file.open(path, binary ? std::ios::out | std::ios::binary : std::ios::out);
+    if (!file.is_open()) {
+        fprintf(stderr, "Failed to open file: %s\n", path.c_str());
+        return false;
+    }
+
+    if (options.format == OutputFormat::Binary) {
+        file.write("MVB1", 4);
+    }
+#ifdef HAVE_ZSTD
+    else if (options.format == OutputFormat::Zstd) {
+        zstd = ZSTD_createCCtx();
+        ZSTD_CCtx_setParameter(zstd, ZSTD_c_compressionLevel, 3);
+        compressed.resize(ZSTD_CStreamOutSize());
+        frames_in_block = 0;
+        text.str("");
+        text << kCsvHeader;
+    }
+#endif
+    else {
+        file << kCsvHeader;
+    }
     return true;
 }
 
 int MotionVectorWriter::Write(int frame_num, const AVMotionVector* mvs,
     int method_id, size_t size) {
 
-    if (!file.is_open()) {
+    if (!file.is_open() && options.format != OutputFormat::Shm) {
         fprintf(stderr, "File not open for writing\n");
         return -1;
     }
@@ -35,13 +133,81 @@ int MotionVectorWriter::Write(int frame_num, const AVMotionVector* mvs,
         return -1;
     }
 
-    // Write the motion vector data in CSV format
-    if (frame_num < 0) {
-        fprintf(stderr, "Invalid frame number: %d\n", frame_num);
-        return -1;
+    double start = monotonic_ms();
+    int64_t decoded_ns = monotonic_ns();
+    size_t count = size / sizeof(AVMotionVector);
+
+    if (!options.async) {
+        WriteRows(frame_num, mvs, method_id, count, decoded_ns);
+    }
+    else {
+        // Blocks only when all pooled buffers are queued, i.e. the disk is behind
+        Batch* batch;
+        {
+            std::unique_lock<std::mutex> lock(mutex);
+            batch_free.wait(lock, [this] { return !free_batches.empty(); });
+            batch = free_batches.back();
+            free_batches.pop_back();
+        }
+
+        batch->frame_num = frame_num;
+        batch->method_id = method_id;
+        batch->decoded_ns = decoded_ns;
+        batch->mvs.assign(mvs, mvs + count);
+
+        {
+            std::lock_guard<std::mutex> lock(mutex);
+            queue.push_back(batch);
+            if (queue.size() > queue_high_water)
+                queue_high_water = queue.size();
+        }
+        queue_ready.notify_one();
     }
 
-    for (int i = 0; i < size / sizeof(AVMotionVector); i++) {
+    double elapsed = monotonic_ms() - start;
+    write_ms += elapsed;
+    if (elapsed > max_write_ms)
+        max_write_ms = elapsed;
+    frames_written++;
+    return 0;
+}
+
+void MotionVectorWriter::WriteRows(int frame_num, const AVMotionVector* mvs,
+    int method_id, size_t count, int64_t decoded_ns) {
+
+    switch (options.format) {
+    case OutputFormat::Shm:
+        ring.Publish(frame_num, method_id, mvs, count, decoded_ns);
+        rows_written += count;
+        break;
+    case OutputFormat::Binary:
+        WriteBinaryRows(frame_num, mvs, method_id, count);
+        break;
+    case OutputFormat::Zstd:
+        WriteCsvRows(text, frame_num, mvs, method_id, count);
+        // Completed zstd frames are independently decodable, so a reader can
+        // follow the file while it grows and a killed run loses at most one block
+        frames_in_block++;
+        if (options.flush_frames > 0 && frames_in_block >= options.flush_frames) {
+            Compress(text.str(), true);
+            file.flush();
+            frames_in_block = 0;
+        }
+        else {
+            Compress(text.str(), false);
+        }
+        text.str("");
+        break;
+    default:
+        WriteCsvRows(file, frame_num, mvs, method_id, count);
+        break;
+    }
+}
+
+void MotionVectorWriter::WriteCsvRows(std::ostream& out, int frame_num,
+    const AVMotionVector* mvs, int method_id, size_t count) {
+
+    for (size_t i = 0; i < count; i++) {
         const AVMotionVector* mv = &mvs[i];
 
         if (mv->w <= 0 || mv->h <= 0) {
@@ -49,18 +215,130 @@ int MotionVectorWriter::Write(int frame_num, const AVMotionVector* mvs,
                 mv->h);
             continue;
         }
-        file << frame_num << "," << method_id << "," << mv->source << ","
+        out << frame_num << "," << method_id << "," << mv->source << ","
             << int(mv->w) << "," << int(mv->h) << "," << mv->src_x << ","
             << mv->src_y << "," << mv->dst_x << "," << mv->dst_y << "," << "0x"
             << std::hex << mv->flags << "," << std::dec << mv->motion_x << ","
             << mv->motion_y << "," << mv->motion_scale << "\n";
+        rows_written++;
     }
+}
 
-    return 0;
+void MotionVectorWriter::WriteBinaryRows(int frame_num, const AVMotionVector* mvs,
+    int method_id, size_t count) {
+
+    std::vector<MotionVectorRecord> records;
+    records.reserve(count);
+    for (size_t i = 0; i < count; i++) {
+        const AVMotionVector* mv = &mvs[i];
+
+        if (mv->w <= 0 || mv->h <= 0) {
+            fprintf(stderr, "Invalid motion vector dimensions: %d x %d\n", mv->w,
+                mv->h);
+            continue;
+        }
+        MotionVectorRecord r;
+        r.frame = frame_num;
+        r.method_id = method_id;
+        r.source = mv->source;
+        r.w = mv->w;
+        r.h = mv->h;
+        r.src_x = mv->src_x;
+        r.src_y = mv->src_y;
+        r.dst_x = mv->dst_x;
+        r.dst_y = mv->dst_y;
+        r.flags = mv->flags;
+        r.motion_x = mv->motion_x;
+        r.motion_y = mv->motion_y;
+        r.motion_scale = mv->motion_scale;
+        records.push_back(r);
+    }
+    file.write(reinterpret_cast<const char*>(records.data()),
+        records.size() * sizeof(MotionVectorRecord));
+    rows_written += records.size();
+}
+
+// Feeds CSV text to the zstd stream; end=true closes the current zstd frame
+void MotionVectorWriter::Compress(std::string const& data, bool end) {
+#ifdef HAVE_ZSTD
+    ZSTD_inBuffer in = { data.data(), data.size(), 0 };
+    ZSTD_EndDirective mode = end ? ZSTD_e_end : ZSTD_e_continue;
+    for (;;) {
+        ZSTD_outBuffer out = { compressed.data(), compressed.size(), 0 };
+        size_t remaining = ZSTD_compressStream2(zstd, &out, &in, mode);
+        if (ZSTD_isError(remaining)) {
+            fprintf(stderr, "zstd compression failed: %s\n", ZSTD_getErrorName(remaining));
+            return;
+        }
+        file.write(compressed.data(), out.pos);
+        // continue: done once all input is consumed; end: once nothing is left to flush
+        if (end ? remaining == 0 : in.pos == in.size)
+            break;
+    }
+#else
+    (void)data;
+    (void)end;
+#endif
+}
+
+void MotionVectorWriter::Run() {
+    for (;;) {
+        Batch* batch;
+        {
+            std::unique_lock<std::mutex> lock(mutex);
+            queue_ready.wait(lock, [this] { return !queue.empty() || stopping; });
+            if (queue.empty())
+                return; // stopping and drained
+            batch = queue.front();
+            queue.pop_front();
+        }
+
+        WriteRows(batch->frame_num, batch->mvs.data(), batch->method_id, batch->mvs.size(),
+            batch->decoded_ns);
+
+        {
+            std::lock_guard<std::mutex> lock(mutex);
+            free_batches.push_back(batch);
+        }
+        batch_free.notify_one();
+    }
 }
 
 void MotionVectorWriter::Close() {
+    if (worker.joinable()) {
+        {
+            std::lock_guard<std::mutex> lock(mutex);
+            stopping = true;
+        }
+        queue_ready.notify_one();
+        worker.join();
+    }
+#ifdef HAVE_ZSTD
+    if (zstd) {
+        if (file.is_open()) {
+            Compress(text.str(), true);
+            text.str("");
+        }
+        ZSTD_freeCCtx(zstd);
+        zstd = nullptr;
+    }
+#endif
     if (file.is_open()) {
         file.close();
     }
-}
\ No newline at end of file
+    ring.Close();
+}
+
+void MotionVectorWriter::PrintStats(const char* exe, std::string const& output) const {
+    if (frames_written == 0)
+        return;
+
+    printf("STAT writer exe=%s output=%s mode=%s format=%s frames=%lld mvs=%lld write_ms=%.3f mean_write_ms=%.4f max_write_ms=%.3f queue_depth=%d queue_hwm=%zu\n",
+        base_name(exe), output.c_str(), options.async ? "async" : "sync",
+        format_name(options.format), frames_written, rows_written,
+        write_ms, write_ms / frames_written, max_write_ms,
+        options.async ? options.queue_depth : 0, queue_high_water);
+    if (options.format == OutputFormat::Shm)
+        ring.PrintStats(exe);
+    fflush(stdout);
+}
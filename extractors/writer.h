@@ -3,21 +3,115 @@
 #include <stdio.h>
 #include <string>
 #include <fstream>
+#include <vector>
+#include <deque>
+#include <memory>
+#include <thread>
+#include <mutex>
+#include <condition_variable>
+#include <sstream>
+#include <stdint.h>
+#include "shm_ring.h"
+#ifdef HAVE_ZSTD
+#include <zstd.h>
+#endif
 extern "C" {
-#include <libavutil/motion_vector.h>    
+#include <libavutil/motion_vector.h>
 #include <libavformat/avformat.h>
 #include <libavcodec/avcodec.h>
 }
 
+// Output sinks, chosen with format=csv|null|zstd|binary|shm:
+//   csv    - text rows (the default)
+//   null   - the same text rows written to /dev/null (formatting cost without disk I/O)
+//   zstd   - the CSV text as zstd frames of flush_frames video frames each
+//            (needs a build with HAVE_ZSTD)
+//   binary - "MVB1" followed by packed MotionVectorRecord rows
+//   shm    - raw AVMotionVector arrays published into a shared-memory ring
+//            (the output name is the shm name, see shm_ring.h)
+enum class OutputFormat { Csv, Null, Zstd, Binary, Shm };
+
+bool ParseOutputFormat(std::string const& name, OutputFormat* format);
+
+// Output settings, filled from the extractor's key=value options
+struct WriterOptions {
+    bool async = false;  // serialize on a background thread instead of the decode thread
+    int queue_depth = 8; // pooled frame buffers in flight before Write() blocks
+    OutputFormat format = OutputFormat::Csv;
+    int flush_frames = 30; // zstd: end a zstd frame and flush the file every N video frames, 0 = only at Close()
+    int ring_slots = 64;       // shm: frames kept before the oldest is overwritten
+    int ring_slot_mvs = 8192;  // shm: vectors per slot (a 1080p frame of 16x16 blocks is 8160)
+};
+
+// One row of the binary format, the CSV columns in order without padding
+#pragma pack(push, 1)
+struct MotionVectorRecord {
+    int32_t frame;
+    int32_t method_id;
+    int32_t source;
+    uint8_t w;
+    uint8_t h;
+    int16_t src_x;
+    int16_t src_y;
+    int16_t dst_x;
+    int16_t dst_y;
+    uint64_t flags;
+    int32_t motion_x;
+    int32_t motion_y;
+    uint16_t motion_scale;
+};
+#pragma pack(pop)
+
 class MotionVectorWriter {
 public:
     ~MotionVectorWriter() {
         Close();
     }
-    bool Open(std::string const& filename);
+    bool Open(std::string const& filename, WriterOptions const& options = WriterOptions());
     int Write(int frame_num, const AVMotionVector* mv, int method_id, size_t size);
     void Close();
+    // Time Write() held the decode thread and, in async mode, the queue high-water mark
+    void PrintStats(const char* exe, std::string const& output) const;
 private:
+    // One frame's side data copied off the decoder, reused through the pool
+    struct Batch {
+        int frame_num = 0;
+        int method_id = 0;
+        int64_t decoded_ns = 0;
+        std::vector<AVMotionVector> mvs;
+    };
+
+    bool OpenFile(std::string const& filename);
+    void WriteRows(int frame_num, const AVMotionVector* mvs, int method_id, size_t count,
+        int64_t decoded_ns);
+    void WriteCsvRows(std::ostream& out, int frame_num, const AVMotionVector* mvs, int method_id, size_t count);
+    void WriteBinaryRows(int frame_num, const AVMotionVector* mvs, int method_id, size_t count);
+    void Compress(std::string const& text, bool end);
+    void Run();
+
     std::ofstream file;
-    int frame_num = 0; // Current frame number   
-};
\ No newline at end of file
+    ShmRing ring;
+    std::ostringstream text; // CSV rows waiting to be compressed
+    std::vector<char> compressed;
+    int frames_in_block = 0; // video frames in the open zstd frame
+#ifdef HAVE_ZSTD
+    ZSTD_CCtx* zstd = nullptr;
+#endif
+    int frame_num = 0; // Current frame number
+    WriterOptions options;
+
+    std::vector<std::unique_ptr<Batch>> pool;
+    std::vector<Batch*> free_batches;
+    std::deque<Batch*> queue;
+    std::mutex mutex;
+    std::condition_variable queue_ready;
+    std::condition_variable batch_free;
+    std::thread worker;
+    bool stopping = false;
+
+    long long frames_written = 0;
+    long long rows_written = 0;
+    size_t queue_high_water = 0;
+    double write_ms = 0;     // total time spent inside Write()
+    double max_write_ms = 0; // longest single Write(), the decode-thread stall
+};
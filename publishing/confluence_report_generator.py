@@ -7,6 +7,8 @@ from bs4 import BeautifulSoup
 import re
 from jinja2 import Template
 
+import utils.regression_gate as regression_gate
+
 
 class ConfluenceReportGenerator:
     def __init__(
@@ -113,6 +115,13 @@ class ConfluenceReportGenerator:
             prefix=prefix,
         )
 
+    def __get_regression_verdict__(self, results_dir):
+        # Left by utils.regression_gate when the run was compared with a baseline
+        verdict = regression_gate.load_verdict(results_dir) if results_dir else None
+        if verdict is None or verdict.empty:
+            return None
+        return regression_gate.verdict_table(verdict)
+
     def __embed_images__(self, images):
         image_list = []
         for title, fname in images:
@@ -255,6 +264,7 @@ class ConfluenceReportGenerator:
             calltree_non_interactive=calltree_non_interactive,
             plots_images=plots_images,
             detail_tables=detail_tables,
+            regression=self.__get_regression_verdict__(os.path.dirname(plots_dir)),
         )
 
     def __get_main_dashboard_body__(
@@ -296,6 +306,7 @@ class ConfluenceReportGenerator:
                 "detail_table": f"{prefix}detail_table_1streams_highlighted.png",
                 "cpu_chart": f"{prefix}grouped_barchart_cpu.png",
                 "memory_chart": f"{prefix}grouped_barchart_memory.png",
+                "regression": self.__get_regression_verdict__(results_dir),
                 "report_title": (
                     self.generate_report_title(
                         os.path.basename(results_dir.rstrip("/"))
@@ -371,14 +382,22 @@ class ConfluenceReportGenerator:
                 "Grouped Memory Usage Comparison (All Streams)",
                 "grouped_barchart_memory.png",
             ),
+            ("Streams per Host", "streams_per_host.png"),
+        ]
+        # Optional modes (e.g. capacity search) only leave their plots behind when run
+        plots_img = [
+            (title, fname)
+            for title, fname in plots_img
+            if os.path.isfile(os.path.join(plots_dir, fname))
         ]
+        vtune_img = [("VTune Hotspots (Top 30)", "vtune_hotspots.png")]
 
         file_list = self.__get_detailed_report_files__(results_dir, plots_img)
         for fpath, fname in file_list:
             self.confluence.attach_file(filename=fpath, page_id=page_id, name=fname)
 
         body = self.__generate_detailed_report_body__(
-            plots_dir, page_id, git_commit_url=git_commit_url
+            vtune_img, plots_img, plots_dir, page_id, git_commit_url=git_commit_url
         )
 
         print(
@@ -1,11 +1,14 @@
 import subprocess
-import os
 import sys
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Tuple
 from datetime import datetime
 
+import pandas as pd
+
 import publishing.publish_to_confluence as ptc
+import utils.regression_gate as regression_gate
+import utils.results_warehouse as warehouse
 from benchmarking.run_full_benchmark import BenchmarkRunner
 
 
@@ -15,26 +18,19 @@ class BenchmarkPublisher:
         self.results_path = self.project_root / "results"
         self.repo_path = self.project_root / "ffmpeg"
 
-        # How and where can we retrieve this?
-        self.first_results_dir = (
-            "/media/loab/f53f31e5-20d9-427c-b719-3e150951a7ec/published/20250922_133754"
-        )
+        # Run the report compares against and its commit URL; None looks up the
+        # oldest run on this host in the results warehouse (see reference_run)
+        self.first_results_dir = None
+        self.first_git_commit = None
 
-        self.first_git_commit = "https://github.com/ablouise/ffmpeg-8.0-ourversion/commit/6faaff56c675b77dc783afc89a1dfb113c07bcf9"
+        # Run the regression gate compares against; None is the previous run on
+        # this host in the results warehouse (see utils/regression_gate.py)
+        self.regression_baseline_dir = None
 
         self.video = self.project_root / "videos" / "bigbunny.mp4"
         # self.video = self.project_root / "videos" / "vid_h264.mp4"
         self.streams = 15
 
-    def __get_last_dir__(self, path):
-        items = os.listdir(path)
-        dirs = []
-        for d in items:
-            if os.path.isdir(path / d):
-                dirs.append(path / d)
-        dirs = sorted(dirs)
-        return dirs[-1]
-
     def run_command(self, cmd, env=None, cwd=None, capture_output=False, shell=False, track_failure=True):
         if not shell:
             cmd = cmd.split()
@@ -61,7 +57,8 @@ class BenchmarkPublisher:
         benchmarker.run_all()
 
         print("DEBUG: Benchmark script finished.")
-        return self.__get_last_dir__(self.results_path)
+        # The runner has added this run to results/warehouse.sqlite
+        return str(benchmarker.results_dir)
 
     def publish_git(self) -> str:
         print(f"Committing and pushing all changes to git in {self.repo_path}...")
@@ -76,6 +73,9 @@ class BenchmarkPublisher:
             f"git -C {self.repo_path} rev-parse HEAD", capture_output=True
         )
 
+        return self.commit_url(commit_hash)
+
+    def commit_url(self, commit_hash: str) -> str:
         remote_url = self.run_command(
             f"git -C {self.repo_path} config --get remote.origin.url",
             capture_output=True,
@@ -86,13 +86,42 @@ class BenchmarkPublisher:
 
         return f"{remote_url}/commit/{commit_hash}"
 
+    def reference_run(self, latest_dir: str) -> Tuple[Optional[str], Optional[str]]:
+        """Results folder and commit URL the report compares latest_dir with:
+        first_results_dir/first_git_commit when set, else the oldest other run
+        on this host in the results warehouse. (None, None) when there is none."""
+        if self.first_results_dir:
+            return self.first_results_dir, self.first_git_commit
+
+        latest_run = Path(latest_dir).name
+        with warehouse.ResultsWarehouse(self.project_root / warehouse.DEFAULT_DB) as db:
+            runs = db.runs()
+        # Same host as the latest run, like the regression gate's baseline
+        host = runs.loc[runs["run_id"] == latest_run, "host"]
+        if len(host) and not pd.isna(host.iloc[0]):
+            runs = runs[runs["host"] == host.iloc[0]]
+        runs = runs[runs["run_id"] != latest_run]
+        if runs.empty:
+            return None, None
+
+        first = runs.iloc[0]
+        if self.first_git_commit:
+            commit = self.first_git_commit
+        elif not pd.isna(first["ffmpeg_commit"]):
+            commit = self.commit_url(first["ffmpeg_commit"])
+        else:
+            commit = f"{first['run_id']} (ffmpeg commit not recorded)"
+        return first["results_dir"], commit
+
     def publish_confluence(
         self,
         first_dir: str,
         latest_dir: str,
         git_commit_run1: str,
         git_commit_run2: str,
-    ):
+    ) -> bool:
+        """Publish the report; False when it could not be published or the
+        regression gate found a regression (the report is published anyway)."""
         print("Publishing report to Confluence...")
         print(f"  First results directory: {first_dir}")
         print(f"  Latest results directory: {latest_dir}")
@@ -106,15 +135,17 @@ class BenchmarkPublisher:
             print(
                 "Usage: publish_confluence <first_results_dir> <latest_results_dir> <git_commit_run1> <git_commit_run2>"
             )
-            return
+            return False
 
         if not Path(first_dir).is_dir():
             print(f"Error: First results directory '{first_dir}' does not exist.")
-            return
+            return False
 
         if not Path(latest_dir).is_dir():
             print(f"Error: Latest results directory '{latest_dir}' does not exist.")
-            return
+            return False
+
+        passed = self.check_regressions(latest_dir, self.regression_baseline_dir)
 
         ptc.publish_to_confluence(
             first_dir, latest_dir, git_commit_run1, git_commit_run2, self.project_root
@@ -131,17 +162,46 @@ class BenchmarkPublisher:
             self.run_command(f"cp -r {latest_dir} {published_dir}")
             print(f"Published results copied to: {published_dir}")
 
-    def run_all(self):
+        return passed
+
+    def check_regressions(self, latest_dir, baseline_dir=None) -> bool:
+        # The verdict is saved in the latest run's plots, where the reports pick it up.
+        # Without baseline_dir, the gate compares with the previous run on this host,
+        # whose noise history it also uses.
+        try:
+            verdict = regression_gate.run_gate(latest_dir, baseline_dir)
+        except FileNotFoundError as error:
+            print(f"Regression gate skipped: {error}")
+            return True
+        if verdict is None:
+            return True
+
+        baseline_run = verdict["baseline_run"].iloc[0]
+        regressions = verdict[verdict["status"] == "regression"]
+        if regressions.empty:
+            print(f"Regression gate: no regressions against {baseline_run}.")
+            return True
+        print(f"Regression gate: {len(regressions)} regressions against {baseline_run}:")
+        print(regressions.drop(columns="baseline_run").round(2).to_string(index=False))
+        return False
+
+    def run_all(self) -> bool:
         print("Running full benchmark and publishing results...")
         latest_results_dir = self.run_benchmark()
         print(f"Latest results directory: {latest_results_dir}")
 
         latest_git_commit = self.publish_git()
 
-        self.publish_confluence(
-            self.first_results_dir,
+        first_results_dir, first_git_commit = self.reference_run(latest_results_dir)
+        if first_results_dir is None:
+            print("Confluence report skipped: no earlier run on this host in the results warehouse to compare with.")
+            return True
+        print(f"Reference results directory: {first_results_dir}")
+
+        return self.publish_confluence(
+            first_results_dir,
             latest_results_dir,
-            self.first_git_commit,
+            first_git_commit,
             latest_git_commit,
         )
 
@@ -159,10 +219,14 @@ class BenchmarkPublisher:
         choices = input("Choice(s): ").strip().split()
         return choices
 
-    def run_interactive(self, choices: Optional[list] = None):
+    def run_interactive(self, choices: Optional[list] = None) -> bool:
+        """Run the chosen steps; False when publishing failed or the
+        regression gate found a regression."""
         if choices is None:
             choices = self.show_menu()
 
+        passed = True
+
         for step in choices:
             if step == "1":
                 self.run_benchmark()
@@ -172,7 +236,7 @@ class BenchmarkPublisher:
 
             elif step == "3":
                 if len(sys.argv) >= 6:
-                    self.publish_confluence(
+                    passed &= self.publish_confluence(
                         sys.argv[2], sys.argv[3], sys.argv[4], sys.argv[5]
                     )
                 else:
@@ -185,7 +249,7 @@ class BenchmarkPublisher:
                     git_commit_run1 = input("Enter the Git commit URL for RUN 1: ")
                     git_commit_run2 = input("Enter the Git commit URL for RUN 2: ")
 
-                    self.publish_confluence(
+                    passed &= self.publish_confluence(
                         first_results_dir,
                         latest_results_dir,
                         git_commit_run1,
@@ -193,18 +257,23 @@ class BenchmarkPublisher:
                     )
 
             elif step == "0":
-                self.run_all()
+                passed &= self.run_all()
                 break
 
             else:
                 print(f"Invalid step: {step}")
 
+        return passed
+
 
 if __name__ == "__main__":
     publisher = BenchmarkPublisher()
 
     if len(sys.argv) > 1:
         choices = sys.argv[1].split()
-        publisher.run_interactive(choices)
+        passed = publisher.run_interactive(choices)
     else:
-        publisher.run_interactive()
+        passed = publisher.run_interactive()
+
+    # Non-zero exit when the regression gate failed, for make and CI
+    sys.exit(0 if passed else 1)
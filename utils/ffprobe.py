@@ -0,0 +1,113 @@
+import json
+import shutil
+import subprocess
+from fractions import Fraction
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# Install prefix of the patched build (see CUSTOM_PREFIX in the makefile)
+FFMPEG_BIN_DIR = Path(__file__).resolve().parent.parent / "ffmpeg" / "FFmpeg-8.0-custom" / "bin"
+
+
+def find_tool(name: str) -> str:
+    """Return the project's own ffmpeg/ffprobe build, falling back to PATH."""
+    local = FFMPEG_BIN_DIR / name
+    if local.is_file():
+        return str(local)
+
+    found = shutil.which(name)
+    if not found:
+        raise FileNotFoundError(
+            f"{name} not found in {FFMPEG_BIN_DIR} or PATH (run make setup_ffmpeg)"
+        )
+    return found
+
+
+def _parse_rate(rate: Optional[str]) -> float:
+    if not rate or rate in ("0/0", "N/A"):
+        return 0.0
+    return float(Fraction(rate))
+
+
+def probe_video_stream(input_file: str) -> Dict:
+    """Frame rate, frame count, duration and size of the first video stream."""
+    result = subprocess.run(
+        [
+            find_tool("ffprobe"),
+            "-v",
+            "error",
+            "-select_streams",
+            "v:0",
+            "-show_entries",
+            "stream=avg_frame_rate,r_frame_rate,nb_frames,duration,width,height",
+            "-of",
+            "json",
+            str(input_file),
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    streams = json.loads(result.stdout).get("streams", [])
+    if not streams:
+        raise ValueError(f"No video stream found in {input_file}")
+    stream = streams[0]
+
+    fps = _parse_rate(stream.get("avg_frame_rate")) or _parse_rate(
+        stream.get("r_frame_rate")
+    )
+    duration = float(stream.get("duration", 0) or 0)
+    nb_frames = stream.get("nb_frames")
+    frames = int(nb_frames) if nb_frames and nb_frames.isdigit() else round(
+        duration * fps
+    )
+
+    return {
+        "fps": fps,
+        "frames": frames,
+        "duration": duration,
+        "width": int(stream.get("width", 0)),
+        "height": int(stream.get("height", 0)),
+    }
+
+
+def frame_size(settings: Dict[str, str]) -> Optional[Tuple[int, int, float]]:
+    """Width, height and frame rate from the video=<file> (probed) or
+    size=<W>x<H> (frame rate 0) setting of a command line; None, after
+    printing how to give them, when neither is set."""
+    if "video" in settings:
+        video = probe_video_stream(settings["video"])
+        return video["width"], video["height"], video["fps"]
+    if "size" in settings:
+        width, height = (int(v) for v in settings["size"].lower().split("x"))
+        return width, height, 0.0
+    print("Give the frame size with video=<file> or size=<W>x<H>")
+    return None
+
+
+
+def probe_video_packets(input_file: str) -> List[Dict]:
+    """dts and keyframe flag of every packet of the first video stream, in decode order."""
+    result = subprocess.run(
+        [
+            find_tool("ffprobe"),
+            "-v",
+            "error",
+            "-select_streams",
+            "v:0",
+            "-show_entries",
+            "packet=dts,flags",
+            "-of",
+            "json",
+            str(input_file),
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    packets = json.loads(result.stdout).get("packets", [])
+    return [
+        {"dts": int(p["dts"]), "key": "K" in p.get("flags", "")}
+        for p in packets
+        if p.get("dts") not in (None, "N/A")
+    ]
@@ -0,0 +1,353 @@
+"""Global (camera) motion estimation from motion vectors, without decoding pixels.
+
+    python -m utils.global_motion <mv_file> [video=<file> | size=<W>x<H>] [model=similarity]
+        [iterations=5] [foreground=2.0] [batch=64] [out=<csv>] [vectors=<csv>] [bench=0]
+
+Fits a translation, similarity (pan + zoom + rotation) or affine model to the
+16x16 block motion of every frame (see utils/motion_tensor.py) with
+iteratively reweighted least squares, so moving objects do not pull the fit.
+All frames of a batch are solved at once: the normal equations of every frame
+are built with one matrix product and solved as a stack of small systems.
+
+out= saves the per-frame parameters (frame, tx, ty, zoom, rotation_deg,
+inlier_ratio, residual_px, foreground_ratio). vectors= saves the
+camera-compensated vectors of the moving blocks in the extractor's CSV format,
+so the renderers in video_generation/ can draw the foreground motion alone.
+bench=1 times every model on the same frames and reports frames per second.
+"""
+
+import sys
+import time
+from typing import Iterable, Iterator, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+import utils.ffprobe as ffprobe
+import utils.motion_tensor as mt
+import video_generation.motion_vector as mv
+
+MODELS = ("translation", "similarity", "affine")
+TUKEY_C = 4.685  # biweight cut-off in robust standard deviations
+MIN_SIGMA_PX = 0.5  # vectors are quarter-pel; below this the noise floor is rounding
+
+
+def _masked_median(values: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """Row medians over the masked entries (lower median; 0 for empty rows).
+    One sort of the whole array instead of a median per row."""
+    ordered = np.sort(np.where(mask, values, np.inf), axis=1)
+    middle = np.maximum(mask.sum(axis=1) - 1, 0) // 2
+    median = np.take_along_axis(ordered, middle[:, None], axis=1)[:, 0]
+    return np.where(np.isfinite(median), median, 0.0)
+
+
+def _basis(model: str, u: np.ndarray, v: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Design rows so that motion = (gx @ params, gy @ params) at the
+    normalised positions (u, v)."""
+    one, zero = np.ones_like(u), np.zeros_like(u)
+    if model == "translation":
+        gx = [one, zero]
+        gy = [zero, one]
+    elif model == "similarity":
+        # dx = tx + a*u - b*v, dy = ty + b*u + a*v
+        gx = [one, zero, u, -v]
+        gy = [zero, one, v, u]
+    elif model == "affine":
+        gx = [one, zero, u, v, zero, zero]
+        gy = [zero, one, zero, zero, u, v]
+    else:
+        raise ValueError(f"Unknown model '{model}', expected one of {MODELS}")
+    return np.stack(gx, axis=-1), np.stack(gy, axis=-1)
+
+
+class GlobalMotionEstimator:
+    """Robust per-frame camera motion for batches of block motion.
+
+    estimate() takes a (frames, rows, cols, 2) block motion array in pixels and
+    a bool (frames, rows, cols) array of the blocks that had vectors, as
+    returned by mt.block_motion or mt.iter_block_motion with coverage=True, and
+    returns (frames, k) parameters. Positions are normalised to the frame
+    centre and half the longer side, so the parameters are well conditioned
+    and the translation is the motion at the centre in pixels.
+    """
+
+    def __init__(
+        self,
+        width: int,
+        height: int,
+        model: str = "similarity",
+        iterations: int = 5,
+        foreground_px: float = 2.0,
+    ):
+        self.width, self.height = width, height
+        self.model = model
+        self.iterations = iterations
+        self.foreground_px = foreground_px
+
+        self.rows = -(-height // mt.BLOCK)
+        self.cols = -(-width // mt.BLOCK)
+        self.centre = np.array([width / 2.0, height / 2.0])
+        self.scale = max(width, height) / 2.0
+        xs = np.arange(self.cols) * mt.BLOCK + mt.BLOCK / 2.0
+        ys = np.arange(self.rows) * mt.BLOCK + mt.BLOCK / 2.0
+        x, y = np.meshgrid(xs, ys)
+        self.gx, self.gy = self._design(x.ravel(), y.ravel())
+        k = self.gx.shape[1]
+        self.k = k
+        # Per-block contribution to the normal matrix, flattened to (cells, k*k)
+        self.outer = (self.gx[:, :, None] * self.gx[:, None, :] + self.gy[:, :, None] * self.gy[:, None, :]).reshape(
+            -1, k * k
+        )
+
+    def _design(self, x: np.ndarray, y: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        u = (np.asarray(x, dtype=np.float64) - self.centre[0]) / self.scale
+        v = (np.asarray(y, dtype=np.float64) - self.centre[1]) / self.scale
+        return _basis(self.model, u, v)
+
+    def _solve(self, weights: np.ndarray, dx: np.ndarray, dy: np.ndarray) -> np.ndarray:
+        k = self.k
+        normal = (weights @ self.outer).reshape(-1, k, k)
+        rhs = (weights * dx) @ self.gx + (weights * dy) @ self.gy
+        # A small ridge keeps frames with few or collinear blocks solvable
+        ridge = 1e-6 * np.maximum(np.trace(normal, axis1=1, axis2=2), 1.0)
+        normal += ridge[:, None, None] * np.eye(k)
+        return np.linalg.solve(normal, rhs[..., None])[..., 0]
+
+    def _residual(self, params: np.ndarray, dx: np.ndarray, dy: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        return dx - params @ self.gx.T, dy - params @ self.gy.T
+
+    def estimate(self, motion: np.ndarray, covered: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Parameters, residual motion (frames, cells, 2) and inlier weights (frames, cells)."""
+        frames = len(motion)
+        flat = motion.reshape(frames, -1, 2).astype(np.float64)
+        dx, dy = flat[..., 0], flat[..., 1]
+        covered = covered.reshape(frames, -1)
+        weights = covered.astype(np.float64)
+
+        # Start from the median block motion, which already ignores a minority
+        # of moving objects, then refine with Tukey-weighted least squares
+        params = np.zeros((frames, self.k))
+        params[:, 0] = _masked_median(dx, covered)
+        params[:, 1] = _masked_median(dy, covered)
+        rx, ry = self._residual(params, dx, dy)
+        for _ in range(self.iterations):
+            squared = rx * rx + ry * ry
+            sigma = 1.4826 * np.sqrt(_masked_median(squared, covered))
+            cutoff = TUKEY_C * np.maximum(sigma, MIN_SIGMA_PX)
+            ratio = np.minimum(squared / (cutoff * cutoff)[:, None], 1.0)
+            weights = covered * (1.0 - ratio) ** 2
+            params = self._solve(weights, dx, dy)
+            rx, ry = self._residual(params, dx, dy)
+
+        residual = np.stack([rx, ry], axis=-1) * covered[..., None]
+        return params, residual, weights
+
+    def predict(self, params: np.ndarray, x: np.ndarray, y: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Camera motion at pixel positions x, y under one frame's parameters."""
+        gx, gy = self._design(x, y)
+        return gx @ params, gy @ params
+
+    def describe(self, params: np.ndarray) -> pd.DataFrame:
+        """Translation, zoom and rotation of (frames, k) parameters."""
+        tx, ty = params[:, 0], params[:, 1]
+        if self.model == "translation":
+            zoom, rotation = np.ones(len(params)), np.zeros(len(params))
+        else:
+            if self.model == "similarity":
+                a = params[:, 2:4] / self.scale
+                linear = np.stack([1 + a[:, 0], -a[:, 1], a[:, 1], 1 + a[:, 0]], axis=-1)
+            else:
+                a = params[:, 2:6] / self.scale
+                linear = a + np.array([1.0, 0.0, 0.0, 1.0])
+            det = linear[:, 0] * linear[:, 3] - linear[:, 1] * linear[:, 2]
+            zoom = np.sqrt(np.abs(det))
+            rotation = np.degrees(np.arctan2(linear[:, 2] - linear[:, 1], linear[:, 0] + linear[:, 3]))
+        return pd.DataFrame({"tx": tx, "ty": ty, "zoom": zoom, "rotation_deg": rotation})
+
+    def summary(
+        self, frame_numbers: np.ndarray, params: np.ndarray, residual: np.ndarray, weights: np.ndarray, covered: np.ndarray
+    ) -> Tuple[pd.DataFrame, np.ndarray]:
+        """Per-frame table of an estimate() and the foreground (frames, cells)
+        mask of covered blocks moving at least foreground_px against the camera."""
+        covered = covered.reshape(len(params), -1)
+        distance = np.hypot(residual[..., 0], residual[..., 1])
+        foreground = covered & (distance >= self.foreground_px)
+
+        n_covered = np.maximum(covered.sum(axis=1), 1)
+        inliers = weights > 0
+        with np.errstate(invalid="ignore", divide="ignore"):
+            residual_px = np.sqrt((distance * distance * inliers).sum(axis=1) / inliers.sum(axis=1))
+        table = self.describe(params)
+        table.insert(0, "frame", frame_numbers)
+        table["inlier_ratio"] = inliers.sum(axis=1) / n_covered
+        table["residual_px"] = np.nan_to_num(residual_px)
+        table["foreground_ratio"] = foreground.sum(axis=1) / n_covered
+        return table, foreground
+
+    def process(
+        self, frame_numbers: np.ndarray, motion: np.ndarray, covered: np.ndarray
+    ) -> Tuple[pd.DataFrame, np.ndarray, np.ndarray]:
+        """Per-frame parameters table, float32 (frames, rows, cols, 2) residual
+        motion in pixels (0 where a block had no vectors) and the bool
+        (frames, rows, cols) foreground mask."""
+        shape = motion.shape[:3]
+        params, residual, weights = self.estimate(motion, covered)
+        table, foreground = self.summary(frame_numbers, params, residual, weights, covered)
+        return table, residual.astype(np.float32).reshape(*shape, 2), foreground.reshape(shape)
+
+
+def compensate(
+    batches: Iterable[Tuple[np.ndarray, np.ndarray, np.ndarray]],
+    estimator: GlobalMotionEstimator,
+    tables: Optional[list] = None,
+) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """Turn (frame numbers, block motion, coverage) batches into (frame numbers,
+    residual motion) batches, e.g. for MotionAnalyzer. The per-frame
+    parameters of each batch are appended to tables when given."""
+    for frame_numbers, motion, covered in batches:
+        table, residual, _ = estimator.process(frame_numbers, motion, covered)
+        if tables is not None:
+            tables.append(table)
+        yield frame_numbers, residual
+
+
+def _batched(frames: Iterable, size: int) -> Iterator[list]:
+    batch = []
+    for item in frames:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def foreground_frames(
+    frames: Iterable[Tuple[int, pd.DataFrame]],
+    estimator: GlobalMotionEstimator,
+    batch_frames: int = 64,
+    tables: Optional[list] = None,
+) -> Iterator[Tuple[int, pd.DataFrame]]:
+    """Camera-compensated vectors of (frame, rows) pairs such as
+    mv.iter_motion_vector_frames yields.
+
+    Each vector keeps its destination block; its source (and motion_x/y) is
+    moved so that it shows the motion left after removing the camera motion,
+    and vectors left with less than foreground_px of motion are dropped. The
+    output is again (frame, rows) pairs, which the video_generation renderers
+    draw like any other output.
+    """
+    for batch in _batched(frames, batch_frames):
+        frame_numbers, motion, covered = mt.block_motion(batch, estimator.width, estimator.height, coverage=True)
+        params, residual, weights = estimator.estimate(motion, covered)
+        if tables is not None:
+            tables.append(estimator.summary(frame_numbers, params, residual, weights, covered)[0])
+
+        for (frame_num, rows), frame_params in zip(batch, params):
+            if rows.empty:
+                yield frame_num, rows
+                continue
+            dst_x = rows["dst_x"].to_numpy(dtype=np.float64)
+            dst_y = rows["dst_y"].to_numpy(dtype=np.float64)
+            cam_x, cam_y = estimator.predict(frame_params, dst_x + rows["w"] / 2.0, dst_y + rows["h"] / 2.0)
+
+            # Block motion is content motion (dst - src for past references,
+            # src - dst for future ones); flip the camera motion to match each vector
+            direction = np.where(rows["source"].to_numpy() > 0, -1.0, 1.0)
+            res_x = dst_x - rows["src_x"].to_numpy() - direction * cam_x
+            res_y = dst_y - rows["src_y"].to_numpy() - direction * cam_y
+            keep = np.hypot(res_x, res_y) >= estimator.foreground_px
+
+            out = rows[keep].copy()
+            out["src_x"] = np.round(dst_x[keep] - res_x[keep]).astype(rows["src_x"].dtype)
+            out["src_y"] = np.round(dst_y[keep] - res_y[keep]).astype(rows["src_y"].dtype)
+            scale = np.maximum(out["motion_scale"].to_numpy(), 1)
+            out["motion_x"] = np.round(-res_x[keep] * scale).astype(rows["motion_x"].dtype)
+            out["motion_y"] = np.round(-res_y[keep] * scale).astype(rows["motion_y"].dtype)
+            yield frame_num, mv.add_magnitude(out)
+
+
+def benchmark(batches: list, width: int, height: int, iterations: int = 5) -> pd.DataFrame:
+    """Estimation throughput of every model on already loaded batches."""
+    frames = sum(len(frame_numbers) for frame_numbers, _, _ in batches)
+    rows = []
+    for model in MODELS:
+        estimator = GlobalMotionEstimator(width, height, model, iterations)
+        start = time.perf_counter()
+        for frame_numbers, motion, covered in batches:
+            estimator.process(frame_numbers, motion, covered)
+        elapsed = time.perf_counter() - start
+        rows.append(
+            {
+                "model": model,
+                "frames": frames,
+                "fps": frames / elapsed if elapsed else 0.0,
+                "ms_per_frame": 1000.0 * elapsed / frames if frames else 0.0,
+            }
+        )
+    return pd.DataFrame(rows)
+
+
+def main(argv):
+    if len(argv) < 2:
+        print(__doc__)
+        return 1
+
+    path = argv[1]
+    settings = dict(arg.split("=", 1) for arg in argv[2:] if "=" in arg)
+    size = ffprobe.frame_size(settings)
+    if size is None:
+        return 1
+    width, height, _ = size
+
+    iterations = int(settings.get("iterations", 5))
+    estimator = GlobalMotionEstimator(
+        width,
+        height,
+        settings.get("model", "similarity"),
+        iterations,
+        float(settings.get("foreground", 2.0)),
+    )
+    batch = int(settings.get("batch", 64))
+
+    if "vectors" in settings:
+        tables = []
+        start = time.perf_counter()
+        header = True
+        for _, rows in foreground_frames(mv.iter_motion_vector_frames(path), estimator, batch, tables):
+            rows.drop(columns="magnitude", errors="ignore").to_csv(
+                settings["vectors"], mode="w" if header else "a", header=header, index=False
+            )
+            header = False
+        elapsed = time.perf_counter() - start
+        table = pd.concat(tables, ignore_index=True) if tables else pd.DataFrame()
+        print(f"Saved foreground vectors: {settings['vectors']}")
+    else:
+        start = time.perf_counter()
+        batches = list(mt.iter_block_motion(path, width, height, coverage=True))
+        loaded = time.perf_counter()
+        tables = [estimator.process(*batch)[0] for batch in batches]
+        elapsed = time.perf_counter() - start
+        table = pd.concat(tables, ignore_index=True) if tables else pd.DataFrame()
+        estimation = time.perf_counter() - loaded
+        if len(table) and estimation:
+            print(f"Estimation alone ({estimator.model}): {len(table) / estimation:.0f} fps")
+        if settings.get("bench", "0") != "0":
+            print(benchmark(batches, width, height, iterations).round(2).to_string(index=False))
+
+    frames = len(table)
+    print(f"{frames} frames in {elapsed:.2f}s ({frames / elapsed if elapsed else 0:.0f} fps end to end)")
+    if frames:
+        print(
+            f"Mean |t| {np.hypot(table['tx'], table['ty']).mean():.2f} px, zoom "
+            f"{table['zoom'].min():.4f}-{table['zoom'].max():.4f}, mean inliers "
+            f"{table['inlier_ratio'].mean():.1%}"
+        )
+    if "out" in settings:
+        table.to_csv(settings["out"], index=False)
+        print(f"Saved per-frame global motion: {settings['out']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
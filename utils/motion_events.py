@@ -0,0 +1,300 @@
+"""Motion activity and event detection on extracted motion vectors, without decoding pixels.
+
+    python -m utils.motion_events <mv_file> [video=<file> | size=<W>x<H>] [roi=name:x,y,w,h ...]
+        [fps=25] [start=0.05] [stop=0.02] [on=3] [off=15] [active=1.0] [follow=0] [out=<csv>]
+        [camera=translation|similarity|affine]
+
+Per frame and region of interest (ROI) it computes the motion energy (mean
+squared block motion, px^2), the active-block ratio (share of 16x16 blocks
+moving at least `active` px) and the dominant direction. A region's motion
+starts once its ratio stays at or above `start` for `on` frames, and stops once
+it stays below `stop` for `off` frames. Frames are processed in batches of
+whole arrays (see utils/motion_tensor.py for the block grid). With camera= the
+camera motion is estimated and removed first (utils/global_motion.py), so a
+panning or zooming camera does not count as activity.
+"""
+
+import sys
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+import cv2
+import numpy as np
+import pandas as pd
+
+import utils.ffprobe as ffprobe
+import utils.global_motion as gm
+import utils.motion_tensor as mt
+import video_generation.motion_vector as mv
+
+DIRECTION_BINS = 8  # 45 degree sectors, 0 = right, 90 = down (image coordinates)
+
+# An ROI is a rectangle (x, y, w, h) or a polygon [(x, y), ...] in pixels
+Roi = Union[Tuple[int, int, int, int], Sequence[Tuple[int, int]]]
+
+
+class RoiState:
+    """Debounce state of one region across batches."""
+
+    def __init__(self):
+        self.active = False
+        self.run = 0  # consecutive frames past the threshold that would flip the state
+        self.run_start = -1  # frame number where that run began
+        self.started_frame = -1
+        self.peak_energy = 0.0
+        self.last_frame = -1
+
+
+class MotionAnalyzer:
+    """Turns batches of block motion into per-region metrics and motion events.
+
+    process() takes frame numbers and a (frames, rows, cols, 2) block motion
+    array in pixels, as produced by mt.block_motion or mt.iter_block_motion, and
+    returns the batch's metrics and the events it completed. State carries over
+    between calls, so a stream can be fed in batches of any size. Frames that
+    are missing (e.g. I-frames, which carry no vectors) leave the state as is.
+    """
+
+    def __init__(
+        self,
+        width: int,
+        height: int,
+        rois: Optional[Dict[str, Roi]] = None,
+        fps: float = 25.0,
+        active_px: float = 1.0,
+        start_ratio: float = 0.05,
+        stop_ratio: float = 0.02,
+        start_frames: int = 3,
+        stop_frames: int = 15,
+    ):
+        self.fps = fps
+        self.active_px = active_px
+        self.start_ratio = start_ratio
+        self.stop_ratio = stop_ratio
+        self.start_frames = start_frames
+        self.stop_frames = stop_frames
+
+        self.rows = -(-height // mt.BLOCK)
+        self.cols = -(-width // mt.BLOCK)
+        rois = rois or {"frame": (0, 0, width, height)}
+        self.names = list(rois)
+        self.masks = np.stack([self._roi_mask(roi) for roi in rois.values()]).astype(np.float32)
+        self.block_counts = np.maximum(self.masks.sum(axis=(1, 2)), 1.0)
+        self.states = {name: RoiState() for name in self.names}
+
+    def _roi_mask(self, roi: Roi) -> np.ndarray:
+        """Blocks whose centre lies inside the ROI."""
+        # Block (r, c) has its centre at pixel (c * 16 + 8, r * 16 + 8)
+        mask = np.zeros((self.rows, self.cols), dtype=np.uint8)
+        half = mt.BLOCK / 2
+        if len(roi) == 4 and np.isscalar(roi[0]):
+            x, y, w, h = roi
+            c0, c1 = (int(np.ceil((v - half) / mt.BLOCK)) for v in (x, x + w))
+            r0, r1 = (int(np.ceil((v - half) / mt.BLOCK)) for v in (y, y + h))
+            mask[max(r0, 0) : max(r1, 0), max(c0, 0) : max(c1, 0)] = 1
+        else:
+            grid = np.round((np.asarray(roi, dtype=np.float64) - half) / mt.BLOCK)
+            cv2.fillPoly(mask, [grid.astype(np.int32)], 1)
+        return mask
+
+    def metrics(self, motion: np.ndarray) -> Dict[str, np.ndarray]:
+        """(frames, rois) arrays of energy, active ratio and dominant direction."""
+        frames = len(motion)
+        mx = motion[..., 0]
+        my = motion[..., 1]
+        squared = mx * mx + my * my
+        active = squared >= self.active_px * self.active_px
+
+        masks = self.masks.reshape(len(self.names), -1).T
+        energy = squared.reshape(frames, -1) @ masks / self.block_counts
+        ratio = active.reshape(frames, -1).astype(np.float32) @ masks / self.block_counts
+
+        # Magnitude-weighted histogram of directions, over the active blocks
+        # inside any ROI only, so the cost follows the amount of motion
+        b, r, c = np.nonzero(active & (self.masks.any(axis=0)))
+        bx, by = mx[b, r, c], my[b, r, c]
+        angle = np.degrees(np.arctan2(by, bx)) % 360.0
+        sector = ((angle + 180.0 / DIRECTION_BINS) // (360.0 / DIRECTION_BINS)).astype(np.int64)
+        cell = b * DIRECTION_BINS + sector % DIRECTION_BINS
+        weight = np.sqrt(squared[b, r, c])
+        direction = np.full((frames, len(self.names)), np.nan)
+        for k in range(len(self.names)):
+            inside = self.masks[k][r, c] > 0
+            hist = np.bincount(
+                cell[inside], weights=weight[inside], minlength=frames * DIRECTION_BINS
+            ).reshape(frames, DIRECTION_BINS)
+            moving = hist.sum(axis=1) > 0
+            direction[moving, k] = hist[moving].argmax(axis=1) * (360.0 / DIRECTION_BINS)
+
+        return {"energy": energy, "active_ratio": ratio, "direction_deg": direction}
+
+    def _debounce(self, frame_numbers: np.ndarray, values: Dict[str, np.ndarray]) -> List[Dict]:
+        events = []
+        ratio = values["active_ratio"]
+        energy = values["energy"]
+        for k, name in enumerate(self.names):
+            state = self.states[name]
+            above = ratio[:, k] >= self.start_ratio
+            below = ratio[:, k] < self.stop_ratio
+            for i, frame_num in enumerate(frame_numbers):
+                frame_num = int(frame_num)
+                if state.active:
+                    state.peak_energy = max(state.peak_energy, float(energy[i, k]))
+                    state.run = state.run + 1 if below[i] else 0
+                    if state.run == 1:
+                        state.run_start = frame_num
+                    if state.run >= self.stop_frames:
+                        # Motion ended where the quiet run began
+                        events.append(self._event(name, "stop", state.run_start, state))
+                        state.active, state.run = False, 0
+                else:
+                    state.run = state.run + 1 if above[i] else 0
+                    if state.run == 1:
+                        state.run_start = frame_num
+                    if state.run >= self.start_frames:
+                        state.active, state.run = True, 0
+                        state.started_frame = state.run_start
+                        state.peak_energy = float(energy[i, k])
+                        events.append(self._event(name, "start", state.started_frame, state))
+                state.last_frame = frame_num
+        return events
+
+    def _event(self, roi: str, kind: str, frame_num: int, state: RoiState) -> Dict:
+        event = {"roi": roi, "event": kind, "frame": frame_num, "time_s": frame_num / self.fps}
+        if kind == "stop":
+            event["duration_s"] = (frame_num - state.started_frame) / self.fps
+            event["peak_energy"] = state.peak_energy
+        return event
+
+    def process(self, frame_numbers: np.ndarray, motion: np.ndarray) -> Tuple[pd.DataFrame, List[Dict]]:
+        if not len(frame_numbers):
+            return pd.DataFrame(), []
+        values = self.metrics(motion)
+        events = self._debounce(frame_numbers, values)
+
+        n_frames, n_rois = values["energy"].shape
+        table = pd.DataFrame(
+            {
+                "frame": np.repeat(frame_numbers, n_rois),
+                "roi": np.tile(self.names, n_frames),
+                **{key: value.ravel() for key, value in values.items()},
+            }
+        )
+        return table, events
+
+    def finish(self) -> List[Dict]:
+        """Stop events for regions still in motion when the stream ends."""
+        events = []
+        for name, state in self.states.items():
+            if state.active:
+                events.append(self._event(name, "stop", state.last_frame + 1, state))
+                state.active = False
+        return events
+
+
+def follow_block_motion(
+    path: str, width: int, height: int, idle_timeout: float = 5.0, coverage: bool = False
+) -> Iterator[Tuple[np.ndarray, ...]]:
+    """Block motion batches of an output that is still being written."""
+    follower = mv.MotionVectorFollower(path, idle_timeout=idle_timeout)
+    while not follower.finished:
+        frames = follower.poll()
+        if frames:
+            yield mt.block_motion(frames, width, height, coverage)
+        else:
+            time.sleep(follower.poll_interval)
+
+
+def analyze(
+    batches: Iterable[Tuple[np.ndarray, np.ndarray]],
+    analyzer: MotionAnalyzer,
+    on_event=None,
+) -> Tuple[pd.DataFrame, List[Dict]]:
+    """Run an analyzer over block motion batches (mt.iter_block_motion,
+    follow_block_motion or MotionTensor.batches). on_event(event) is called as
+    soon as each event is detected."""
+    tables, events = [], []
+    for frame_numbers, motion in batches:
+        if motion.dtype == np.int16:
+            motion = motion.astype(np.float32) / mt.QPEL  # MotionTensor batches
+        table, batch_events = analyzer.process(frame_numbers, motion)
+        tables.append(table)
+        events.extend(batch_events)
+        if on_event:
+            for event in batch_events:
+                on_event(event)
+    for event in analyzer.finish():
+        events.append(event)
+        if on_event:
+            on_event(event)
+    return (pd.concat(tables, ignore_index=True) if tables else pd.DataFrame()), events
+
+
+def parse_roi(text: str) -> Tuple[str, Roi]:
+    """name:x,y,w,h"""
+    name, _, coords = text.partition(":")
+    x, y, w, h = (int(v) for v in coords.split(","))
+    return name, (x, y, w, h)
+
+
+def main(argv):
+    if len(argv) < 2:
+        print(__doc__)
+        return 1
+
+    path = argv[1]
+    settings, rois = {}, {}
+    for arg in argv[2:]:
+        key, _, value = arg.partition("=")
+        if key == "roi":
+            name, roi = parse_roi(value)
+            rois[name] = roi
+        else:
+            settings[key] = value
+
+    size = ffprobe.frame_size(settings)
+    if size is None:
+        return 1
+    width, height, video_fps = size
+    fps = float(settings.get("fps", 0)) or video_fps or 25.0
+
+    analyzer = MotionAnalyzer(
+        width,
+        height,
+        rois,
+        fps=fps,
+        active_px=float(settings.get("active", 1.0)),
+        start_ratio=float(settings.get("start", 0.05)),
+        stop_ratio=float(settings.get("stop", 0.02)),
+        start_frames=int(settings.get("on", 3)),
+        stop_frames=int(settings.get("off", 15)),
+    )
+    camera = settings.get("camera")
+    if settings.get("follow", "0") != "0":
+        batches = follow_block_motion(path, width, height, coverage=bool(camera))
+    else:
+        batches = mt.iter_block_motion(path, width, height, coverage=bool(camera))
+    if camera:
+        batches = gm.compensate(batches, gm.GlobalMotionEstimator(width, height, camera))
+
+    def print_event(event):
+        extra = f" duration={event['duration_s']:.2f}s" if event["event"] == "stop" else ""
+        print(f"{event['time_s']:9.2f}s  frame {event['frame']:>7}  {event['roi']:<12} {event['event']}{extra}")
+
+    start = time.perf_counter()
+    table, events = analyze(batches, analyzer, print_event)
+    elapsed = time.perf_counter() - start
+
+    frames = table["frame"].nunique() if not table.empty else 0
+    print(
+        f"{frames} frames, {len(events)} events in {elapsed:.2f}s "
+        f"({frames / elapsed if elapsed else 0:.0f} fps, {frames / elapsed / fps if elapsed else 0:.0f}x real time)"
+    )
+    if "out" in settings:
+        table.to_csv(settings["out"], index=False)
+        print(f"Saved per-frame activity: {settings['out']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,278 @@
+"""Temporal aggregate pyramid of a long extraction, for "when was there motion" queries.
+
+    python -m utils.motion_pyramid <mv_file> <output.npz> [video=<file> | size=<W>x<H>] [fps=25] [moving=1.0]
+    python -m utils.motion_pyramid <pyramid.npz> [level=second|minute|hour] [from=<s>] [to=<s>] [min_ratio=0.05]
+
+The first form reads an output (.csv, .csv.zst or .mvb) once, one chunk of rows
+at a time, and aggregates it per second of video: frames with vectors, vector
+count, moving vectors (at least `moving` px), magnitude sum and maximum, and
+the moving vectors per cell of a coarse GRID x GRID spatial grid. Minutes and
+hours are aggregated from the seconds. Every column of every level is stored as
+its own array in one compressed .npz, so a query loads only the level and
+columns it reads. The second form prints the motion periods of a pyramid.
+"""
+
+import json
+import sys
+import time
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+import utils.ffprobe as ffprobe
+import utils.motion_tensor as mt
+
+GRID = 4  # coarse spatial histogram of GRID x GRID cells
+LEVELS = {"second": 1, "minute": 60, "hour": 3600}
+
+
+class _Seconds:
+    """Per-second accumulators that grow as the stream gets longer."""
+
+    def __init__(self, capacity: int = 3600):
+        self.length = 0
+        self.columns = {
+            "frames": np.zeros(capacity, dtype=np.int64),
+            "vectors": np.zeros(capacity, dtype=np.int64),
+            "moving": np.zeros(capacity, dtype=np.int64),
+            "magnitude_sum": np.zeros(capacity, dtype=np.float64),
+            "magnitude_max": np.zeros(capacity, dtype=np.float32),
+            "spatial": np.zeros((capacity, GRID * GRID), dtype=np.int64),
+        }
+
+    def reserve(self, length: int):
+        capacity = len(self.columns["frames"])
+        if length > capacity:
+            capacity = max(length, 2 * capacity)
+            for name, column in self.columns.items():
+                grown = np.zeros((capacity,) + column.shape[1:], dtype=column.dtype)
+                grown[: len(column)] = column
+                self.columns[name] = grown
+        self.length = max(self.length, length)
+
+    def trimmed(self) -> Dict[str, np.ndarray]:
+        return {name: column[: self.length] for name, column in self.columns.items()}
+
+
+def _magnitude_px(chunk) -> np.ndarray:
+    """Vector length in pixels; from the positions when there is no motion_scale."""
+    scale = mt.column(chunk, "motion_scale").astype(np.float64)
+    valid = scale > 0
+    mx = np.where(
+        valid,
+        mt.column(chunk, "motion_x") / np.where(valid, scale, 1.0),
+        mt.column(chunk, "dst_x").astype(np.float64) - mt.column(chunk, "src_x"),
+    )
+    my = np.where(
+        valid,
+        mt.column(chunk, "motion_y") / np.where(valid, scale, 1.0),
+        mt.column(chunk, "dst_y").astype(np.float64) - mt.column(chunk, "src_y"),
+    )
+    return np.hypot(mx, my)
+
+
+def _aggregate(seconds: Dict[str, np.ndarray], factor: int) -> Dict[str, np.ndarray]:
+    """Coarser level: sums of counts, maximum of maxima over factor seconds."""
+    n = -(-len(seconds["frames"]) // factor)
+    level = {}
+    for name, column in seconds.items():
+        padded = np.zeros((n * factor,) + column.shape[1:], dtype=column.dtype)
+        padded[: len(column)] = column
+        blocks = padded.reshape((n, factor) + column.shape[1:])
+        level[name] = blocks.max(axis=1) if name == "magnitude_max" else blocks.sum(axis=1)
+    return level
+
+
+def build_motion_pyramid(
+    mv_file: str,
+    output_path: str,
+    width: int,
+    height: int,
+    fps: float = 25.0,
+    moving_px: float = 1.0,
+    chunk_rows: int = 1_000_000,
+) -> "MotionPyramid":
+    """Aggregate an output file into a pyramid in a single streaming pass.
+
+    Frame numbers start at 1, so frame f falls in second (f - 1) // fps.
+    """
+    seconds = _Seconds()
+    last_frame = None
+    for chunk in mt.record_chunks(mv_file, chunk_rows):
+        frames = mt.column(chunk, "frame").astype(np.int64)
+        if not len(frames):
+            continue
+        second = ((frames - 1) / fps).astype(np.int64)
+        seconds.reserve(int(second.max()) + 1)
+        size = len(seconds.columns["frames"])
+        columns = seconds.columns
+
+        # A frame can span two chunks; count it in the first
+        unique_frames = np.unique(frames)
+        if last_frame is not None:
+            unique_frames = unique_frames[unique_frames != last_frame]
+        last_frame = int(frames[-1])
+        columns["frames"] += np.bincount(
+            ((unique_frames - 1) / fps).astype(np.int64), minlength=size
+        )
+
+        magnitude = _magnitude_px(chunk)
+        moving = magnitude >= moving_px
+        columns["vectors"] += np.bincount(second, minlength=size)
+        columns["moving"] += np.bincount(second[moving], minlength=size)
+        columns["magnitude_sum"] += np.bincount(second, weights=magnitude, minlength=size)
+        np.maximum.at(columns["magnitude_max"], second, magnitude.astype(np.float32))
+
+        gx = np.clip(mt.column(chunk, "dst_x").astype(np.int64) * GRID // width, 0, GRID - 1)
+        gy = np.clip(mt.column(chunk, "dst_y").astype(np.int64) * GRID // height, 0, GRID - 1)
+        cell = (second * GRID + gy) * GRID + gx
+        columns["spatial"] += np.bincount(
+            cell[moving], minlength=size * GRID * GRID
+        ).reshape(size, GRID * GRID)
+
+    base = seconds.trimmed()
+    arrays = {}
+    for level, factor in LEVELS.items():
+        values = base if factor == 1 else _aggregate(base, factor)
+        for name, column in values.items():
+            arrays[f"{level}.{name}"] = column
+    meta = {
+        "source": str(mv_file),
+        "fps": fps,
+        "width": width,
+        "height": height,
+        "grid": GRID,
+        "moving_px": moving_px,
+        "levels": LEVELS,
+    }
+    with open(output_path, "wb") as f:
+        np.savez_compressed(f, meta=np.array(json.dumps(meta)), **arrays)
+    return MotionPyramid(output_path)
+
+
+class MotionPyramid:
+    """Read access to a pyramid written by build_motion_pyramid.
+
+    Arrays are loaded from the .npz on first use, one level at a time, so a
+    query over a day of video at minute level reads 1440 rows.
+    """
+
+    def __init__(self, path: str):
+        self.archive = np.load(path)
+        self.meta = json.loads(str(self.archive["meta"]))
+        self._levels: Dict[str, pd.DataFrame] = {}
+
+    def level(self, name: str) -> pd.DataFrame:
+        """One row per bin: start_s, end_s, frames, vectors, moving, moving_ratio,
+        mean_magnitude and max_magnitude (px)."""
+        if name not in self._levels:
+            seconds = LEVELS[name]
+            vectors = self.archive[f"{name}.vectors"]
+            moving = self.archive[f"{name}.moving"]
+            start = np.arange(len(vectors), dtype=np.int64) * seconds
+            with np.errstate(invalid="ignore", divide="ignore"):
+                self._levels[name] = pd.DataFrame(
+                    {
+                        "start_s": start,
+                        "end_s": start + seconds,
+                        "frames": self.archive[f"{name}.frames"],
+                        "vectors": vectors,
+                        "moving": moving,
+                        "moving_ratio": np.nan_to_num(moving / vectors),
+                        "mean_magnitude": np.nan_to_num(self.archive[f"{name}.magnitude_sum"] / vectors),
+                        "max_magnitude": self.archive[f"{name}.magnitude_max"],
+                    }
+                )
+        return self._levels[name]
+
+    def spatial(self, name: str) -> np.ndarray:
+        """(bins, GRID, GRID) moving vector counts per spatial cell."""
+        grid = self.meta["grid"]
+        return self.archive[f"{name}.spatial"].reshape(-1, grid, grid)
+
+    def pick_level(self, start_s: float, end_s: float, max_points: int = 2000) -> str:
+        """Finest level that covers the window in at most max_points bins."""
+        for name, seconds in LEVELS.items():
+            if (end_s - start_s) / seconds <= max_points:
+                return name
+        return list(LEVELS)[-1]
+
+    def window(self, start_s: float = 0, end_s: Optional[float] = None, level: Optional[str] = None) -> pd.DataFrame:
+        """Bins overlapping [start_s, end_s), at level or the one pick_level chooses."""
+        if end_s is None:
+            end_s = len(self.archive["second.frames"])
+        table = self.level(level or self.pick_level(start_s, end_s))
+        first = int(np.searchsorted(table["end_s"].to_numpy(), start_s, side="right"))
+        last = int(np.searchsorted(table["start_s"].to_numpy(), end_s, side="left"))
+        return table.iloc[first:last]
+
+    def motion_periods(
+        self,
+        level: str = "second",
+        min_ratio: float = 0.05,
+        start_s: float = 0,
+        end_s: Optional[float] = None,
+    ) -> pd.DataFrame:
+        """Runs of consecutive bins whose moving_ratio is at least min_ratio."""
+        table = self.window(start_s, end_s, level)
+        active = (table["moving_ratio"] >= min_ratio).to_numpy()
+        edges = np.diff(np.concatenate([[0], active.astype(np.int8), [0]]))
+        starts, ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+        moving = np.concatenate([[0], np.cumsum(table["moving"].to_numpy())])
+        max_magnitude = table["max_magnitude"].to_numpy()
+        return pd.DataFrame(
+            {
+                "start_s": table["start_s"].to_numpy()[starts],
+                "end_s": table["end_s"].to_numpy()[ends - 1],
+                "duration_s": table["end_s"].to_numpy()[ends - 1] - table["start_s"].to_numpy()[starts],
+                "moving": moving[ends] - moving[starts],
+                "max_magnitude": [max_magnitude[s:e].max() for s, e in zip(starts, ends)],
+            }
+        )
+
+
+def main(argv):
+    if len(argv) < 2:
+        print(__doc__)
+        return 1
+
+    settings = dict(arg.split("=", 1) for arg in argv[2:] if "=" in arg)
+    if argv[1].endswith(".npz"):
+        start = time.perf_counter()
+        pyramid = MotionPyramid(argv[1])
+        periods = pyramid.motion_periods(
+            settings.get("level", "second"),
+            float(settings.get("min_ratio", 0.05)),
+            float(settings.get("from", 0)),
+            float(settings["to"]) if "to" in settings else None,
+        )
+        elapsed = time.perf_counter() - start
+        print(periods.round(2).to_string(index=False) if len(periods) else "No motion")
+        print(f"{len(periods)} motion periods in {1000.0 * elapsed:.1f} ms")
+        return 0
+
+    if len(argv) < 3:
+        print(__doc__)
+        return 1
+    mv_file, output_path = argv[1], argv[2]
+    size = ffprobe.frame_size(settings)
+    if size is None:
+        return 1
+    width, height, video_fps = size
+    fps = float(settings.get("fps", 0)) or video_fps
+
+    start = time.perf_counter()
+    pyramid = build_motion_pyramid(
+        mv_file, output_path, width, height, fps or 25.0, float(settings.get("moving", 1.0))
+    )
+    elapsed = time.perf_counter() - start
+    seconds = pyramid.level("second")
+    print(
+        f"{int(seconds['vectors'].sum()):,} vectors, {len(seconds)} s of video in {elapsed:.2f}s: {output_path}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
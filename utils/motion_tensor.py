@@ -0,0 +1,401 @@
+"""Dense per-frame motion tensors built from extractor output, for ML consumers.
+
+    python -m utils.motion_tensor <mv_file> <output_prefix> [video_file]
+
+writes <output_prefix>.motion.npy, an int16 (frames, ceil(H/16), ceil(W/16), 2)
+array of the (x, y) motion of each 16x16 macroblock in quarter pixels, and
+<output_prefix>.partitions.npy, a uint8 (frames, rows, cols) bit mask of the
+partition sizes each macroblock was coded with (PARTITION_BITS). Both are plain
+.npy files, memory-mapped when opened with MotionTensor.
+"""
+
+import json
+import math
+import sys
+from typing import Iterable, Iterator, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+import utils.ffprobe as ffprobe
+import video_generation.motion_vector as mv
+
+BLOCK = 16
+QPEL = 4  # tensor values are in 1/QPEL pixels
+
+# Bit of each partition size (w x h) in the partitions tensor; a macroblock
+# without vectors (intra coded) is 0
+PARTITION_BITS = {
+    "16x16": 1,
+    "16x8": 2,
+    "8x16": 4,
+    "8x8": 8,
+    "sub8x8": 16,  # 8x4, 4x8 and 4x4
+}
+
+COLUMNS = [
+    "frame",
+    "source",
+    "w",
+    "h",
+    "src_x",
+    "src_y",
+    "dst_x",
+    "dst_y",
+    "motion_x",
+    "motion_y",
+    "motion_scale",
+]
+
+
+def record_chunks(path: str, chunk_rows: int) -> Iterator:
+    """Rows of an output file in frame order, chunk_rows at a time. .mvb chunks
+    are record array slices of a memory map, CSV chunks are dataframes."""
+    if str(path).endswith(".mvb"):
+        records = np.memmap(path, dtype=mv.RECORD_DTYPE, mode="r", offset=len(mv.BINARY_MAGIC))
+        for start in range(0, len(records), chunk_rows):
+            yield records[start : start + chunk_rows]
+    else:
+        with mv.open_motion_vectors(path) as handle:
+            yield from pd.read_csv(handle, chunksize=chunk_rows, usecols=COLUMNS)
+
+
+def column(chunk, name: str) -> np.ndarray:
+    """One column of a record_chunks chunk (record array or dataframe) as an array."""
+    return np.asarray(chunk[name])
+
+
+def frame_range(path: str, chunk_rows: int = 1_000_000) -> Tuple[int, int]:
+    """First and last frame number in an output file."""
+    first, last = None, None
+    for chunk in record_chunks(path, chunk_rows):
+        frames = column(chunk, "frame")
+        if len(frames):
+            first = int(frames.min()) if first is None else min(first, int(frames.min()))
+            last = int(frames.max()) if last is None else max(last, int(frames.max()))
+    if first is None:
+        raise ValueError(f"No motion vectors in {path}")
+    return first, last
+
+
+def _partition_bits(w: np.ndarray, h: np.ndarray) -> np.ndarray:
+    bits = np.full(len(w), PARTITION_BITS["sub8x8"], dtype=np.uint8)
+    bits[(w == 16) & (h == 16)] = PARTITION_BITS["16x16"]
+    bits[(w == 16) & (h == 8)] = PARTITION_BITS["16x8"]
+    bits[(w == 8) & (h == 16)] = PARTITION_BITS["8x16"]
+    bits[(w == 8) & (h == 8)] = PARTITION_BITS["8x8"]
+    return bits
+
+
+def _scatter(chunk, first_frame: int, n_frames: int, rows: int, cols: int, partitions: bool = True):
+    """Area-weighted sums of a chunk's vectors per (frame, macroblock).
+
+    Returns the first frame index of the chunk and arrays of shape
+    (chunk frames, rows * cols): weight, sum x, sum y and partition bits.
+    Vectors referencing a future frame are negated so that every vector points
+    the way the content moved (past to present).
+    """
+    index = column(chunk, "frame").astype(np.int64) - first_frame
+    keep = (index >= 0) & (index < n_frames)
+    if not keep.all():
+        chunk = chunk[keep]
+        index = index[keep]
+    if not len(index):
+        return None
+    return _block_sums(chunk, index, rows, cols, partitions)
+
+
+def _block_sums(chunk, index: np.ndarray, rows: int, cols: int, partitions: bool = True):
+    w = column(chunk, "w")
+    h = column(chunk, "h")
+    dst_x = column(chunk, "dst_x")
+    dst_y = column(chunk, "dst_y")
+    area = w.astype(np.float64) * h
+    signed_area = np.where(column(chunk, "source") > 0, area, -area)
+
+    # motion / motion_scale is src - dst; without a scale fall back to the positions
+    scale = column(chunk, "motion_scale").astype(np.float64)
+    if (scale > 0).all():
+        factor = signed_area * (QPEL / scale)
+        moved_x = column(chunk, "motion_x") * factor
+        moved_y = column(chunk, "motion_y") * factor
+    else:
+        valid_scale = scale > 0
+        safe_scale = np.where(valid_scale, scale, 1.0)
+        moved_x = signed_area * np.where(
+            valid_scale,
+            column(chunk, "motion_x") * QPEL / safe_scale,
+            (column(chunk, "src_x").astype(np.int64) - dst_x) * QPEL,
+        )
+        moved_y = signed_area * np.where(
+            valid_scale,
+            column(chunk, "motion_y") * QPEL / safe_scale,
+            (column(chunk, "src_y").astype(np.int64) - dst_y) * QPEL,
+        )
+
+    frame0 = int(index.min())
+    span = int(index.max()) - frame0 + 1
+    cells = rows * cols
+    cell = (index - frame0) * cells
+    cell += np.clip(dst_y // BLOCK, 0, rows - 1).astype(np.int64) * cols
+    cell += np.clip(dst_x // BLOCK, 0, cols - 1)
+    size = span * cells
+
+    weight = np.bincount(cell, weights=area, minlength=size)
+    sum_x = np.bincount(cell, weights=moved_x, minlength=size)
+    sum_y = np.bincount(cell, weights=moved_y, minlength=size)
+    present_bits = np.zeros(size, dtype=np.uint8)
+    if partitions:
+        bits = _partition_bits(w, h)
+        for bit in PARTITION_BITS.values():
+            present = np.bincount(cell[bits == bit], minlength=size) > 0
+            present_bits[present] |= bit
+
+    shape = (span, cells)
+    return (
+        frame0,
+        weight.reshape(shape),
+        sum_x.reshape(shape),
+        sum_y.reshape(shape),
+        present_bits.reshape(shape),
+    )
+
+
+def _mean_motion(weight: np.ndarray, sum_x: np.ndarray, sum_y: np.ndarray) -> np.ndarray:
+    """Mean motion in 1/QPEL pixels, (frames, cells, 2); 0 where a cell has no vectors."""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.stack([sum_x / weight, sum_y / weight], axis=-1)
+    return np.nan_to_num(mean, nan=0.0)
+
+
+def iter_block_sums(
+    mv_file: str,
+    rows: int,
+    cols: int,
+    first_frame: int,
+    frames: int,
+    chunk_rows: int = 1_000_000,
+    partitions: bool = True,
+):
+    """Yield (first frame index, weight, sum x, sum y, bits) for runs of complete frames.
+
+    The last frame of a chunk may continue in the next one; its sums are
+    carried over and yielded once the frame is complete.
+    """
+    carry = None
+    for chunk in record_chunks(mv_file, chunk_rows):
+        sums = _scatter(chunk, first_frame, frames, rows, cols, partitions)
+        if sums is None:
+            continue
+        frame0, weight, sum_x, sum_y, bits = sums
+        if carry is not None:
+            if carry[0] == frame0:
+                weight[0] += carry[1][0]
+                sum_x[0] += carry[2][0]
+                sum_y[0] += carry[3][0]
+                bits[0] |= carry[4][0]
+            else:
+                yield carry
+        if len(weight) > 1:
+            yield frame0, weight[:-1], sum_x[:-1], sum_y[:-1], bits[:-1]
+        last = len(weight) - 1
+        carry = (
+            frame0 + last,
+            weight[last:],
+            sum_x[last:],
+            sum_y[last:],
+            bits[last:],
+        )
+    if carry is not None:
+        yield carry
+
+
+def iter_block_motion(
+    mv_file: str, width: int, height: int, chunk_rows: int = 1_000_000, coverage: bool = False
+) -> Iterator[Tuple[np.ndarray, ...]]:
+    """Stream an output file as (frame numbers, float32 (n, rows, cols, 2)
+    block motion in pixels) batches, one per chunk of rows. Frames without
+    vectors (I-frames) are left out. With coverage, each batch also has a bool
+    (n, rows, cols) array of the blocks that had vectors."""
+    rows, cols = math.ceil(height / BLOCK), math.ceil(width / BLOCK)
+    for frame0, weight, sum_x, sum_y, _ in iter_block_sums(
+        mv_file, rows, cols, 0, sys.maxsize, chunk_rows, partitions=False
+    ):
+        has_vectors = weight.sum(axis=1) > 0
+        motion = _mean_motion(weight[has_vectors], sum_x[has_vectors], sum_y[has_vectors])
+        frame_numbers = np.flatnonzero(has_vectors) + frame0
+        motion = (motion / QPEL).astype(np.float32).reshape(-1, rows, cols, 2)
+        covered = weight[has_vectors].reshape(-1, rows, cols) != 0
+        yield (frame_numbers, motion, covered)[: 2 + coverage]
+
+
+def block_motion(
+    frames: Iterable, width: int, height: int, coverage: bool = False
+) -> Tuple[np.ndarray, ...]:
+    """Block motion of (frame number, rows) pairs, e.g. from
+    mv.MotionVectorFollower.poll() or (ring_frame.frame_num, ring_frame.mvs).
+
+    rows may be dataframes or record arrays. Returns the frame numbers and a
+    float32 (n, rows, cols, 2) array of mean block motion in pixels, and with
+    coverage a bool (n, rows, cols) array of the blocks that had vectors.
+    """
+    frames = [(int(frame_num), rows) for frame_num, rows in frames]
+    grid_rows, grid_cols = math.ceil(height / BLOCK), math.ceil(width / BLOCK)
+    frame_numbers = np.array([frame_num for frame_num, _ in frames], dtype=np.int64)
+    if not frames:
+        empty = np.zeros((0, grid_rows, grid_cols, 2), dtype=np.float32)
+        return (frame_numbers, empty, np.zeros(empty.shape[:3], dtype=bool))[: 2 + coverage]
+
+    lengths = [len(rows) for _, rows in frames]
+    columns = {
+        name: np.concatenate([np.asarray(rows[name]) for _, rows in frames])
+        for name in COLUMNS[1:]
+    }
+    index = np.repeat(np.arange(len(frames)), lengths)
+    motion = np.zeros((len(frames), grid_rows * grid_cols, 2))
+    covered = np.zeros((len(frames), grid_rows * grid_cols), dtype=bool)
+    if len(index):
+        frame0, weight, sum_x, sum_y, _ = _block_sums(
+            columns, index, grid_rows, grid_cols, partitions=False
+        )
+        motion[frame0 : frame0 + len(weight)] = _mean_motion(weight, sum_x, sum_y)
+        covered[frame0 : frame0 + len(weight)] = weight != 0
+    motion = (motion / QPEL).astype(np.float32).reshape(-1, grid_rows, grid_cols, 2)
+    return (frame_numbers, motion, covered.reshape(-1, grid_rows, grid_cols))[: 2 + coverage]
+
+
+def build_motion_tensor(
+    mv_file: str,
+    output_prefix: str,
+    width: int,
+    height: int,
+    first_frame: Optional[int] = None,
+    frames: Optional[int] = None,
+    chunk_rows: int = 1_000_000,
+) -> "MotionTensor":
+    """Convert an extractor output (.csv, .csv.zst or .mvb) into motion and
+    partition tensors, one chunk of rows at a time.
+
+    Without first_frame/frames the file is scanned once for its frame range.
+    Frames without vectors (I-frames) are all zero.
+    """
+    if first_frame is None or frames is None:
+        low, high = frame_range(mv_file, chunk_rows)
+        first_frame = low if first_frame is None else first_frame
+        frames = high - first_frame + 1 if frames is None else frames
+
+    rows, cols = math.ceil(height / BLOCK), math.ceil(width / BLOCK)
+    motion = np.lib.format.open_memmap(
+        f"{output_prefix}.motion.npy", mode="w+", dtype=np.int16, shape=(frames, rows, cols, 2)
+    )
+    partitions = np.lib.format.open_memmap(
+        f"{output_prefix}.partitions.npy", mode="w+", dtype=np.uint8, shape=(frames, rows, cols)
+    )
+
+    for frame0, weight, sum_x, sum_y, bits in iter_block_sums(
+        mv_file, rows, cols, first_frame, frames, chunk_rows
+    ):
+        span = len(weight)
+        mean = np.rint(_mean_motion(weight, sum_x, sum_y))
+        mean = np.clip(mean, np.iinfo(np.int16).min, np.iinfo(np.int16).max)
+        motion[frame0 : frame0 + span] = mean.reshape(span, rows, cols, 2).astype(np.int16)
+        partitions[frame0 : frame0 + span] = bits.reshape(span, rows, cols)
+
+    motion.flush()
+    partitions.flush()
+    del motion, partitions
+
+    with open(f"{output_prefix}.json", "w") as f:
+        json.dump(
+            {
+                "source": str(mv_file),
+                "first_frame": first_frame,
+                "frames": frames,
+                "width": width,
+                "height": height,
+                "block": BLOCK,
+                "qpel": QPEL,
+                "partition_bits": PARTITION_BITS,
+            },
+            f,
+            indent=4,
+        )
+    return MotionTensor(output_prefix)
+
+
+class MotionTensor:
+    """Read-only, memory-mapped view of a tensor written by build_motion_tensor.
+
+    Indexing is by position (0 = first_frame) and returns memory-mapped views,
+    so slicing is random access and only the touched frames are read from disk.
+    """
+
+    def __init__(self, prefix: str):
+        with open(f"{prefix}.json") as f:
+            self.meta = json.load(f)
+        self.first_frame = self.meta["first_frame"]
+        self.motion = np.load(f"{prefix}.motion.npy", mmap_mode="r")
+        self.partitions = np.load(f"{prefix}.partitions.npy", mmap_mode="r")
+
+    def __len__(self) -> int:
+        return self.motion.shape[0]
+
+    def __getitem__(self, index) -> np.ndarray:
+        return self.motion[index]
+
+    def frame(self, frame_num: int) -> np.ndarray:
+        """Motion of one frame by its frame number."""
+        return self.motion[frame_num - self.first_frame]
+
+    def mask(self, partition: str, index=slice(None)) -> np.ndarray:
+        """Boolean (frames, rows, cols) mask of macroblocks with a partition
+        size from PARTITION_BITS (e.g. "8x8", "16x8")."""
+        return (self.partitions[index] & PARTITION_BITS[partition]) != 0
+
+    def batches(
+        self, batch_size: int, start: int = 0, stop: Optional[int] = None, drop_last: bool = False
+    ) -> Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """Yield (frame numbers, motion, partitions) for consecutive batches of frames.
+
+        The arrays are views of the memory maps; copy them (or convert to a
+        framework tensor) before keeping them past the next batch if the file
+        may be rewritten.
+        """
+        stop = len(self) if stop is None else min(stop, len(self))
+        for begin in range(start, stop, batch_size):
+            end = min(begin + batch_size, stop)
+            if drop_last and end - begin < batch_size:
+                return
+            yield (
+                np.arange(begin, end) + self.first_frame,
+                self.motion[begin:end],
+                self.partitions[begin:end],
+            )
+
+
+def main(argv):
+    if len(argv) < 3:
+        print(__doc__)
+        return 1
+
+    mv_file, output_prefix = argv[1], argv[2]
+    if len(argv) > 3:
+        video = ffprobe.probe_video_stream(argv[3])
+        width, height = video["width"], video["height"]
+    else:
+        # Without the video, cover every destination the output refers to
+        width = height = 0
+        for chunk in record_chunks(mv_file, 1_000_000):
+            width = max(width, int(column(chunk, "dst_x").max()) + 1)
+            height = max(height, int(column(chunk, "dst_y").max()) + 1)
+
+    tensor = build_motion_tensor(mv_file, output_prefix, width, height)
+    print(
+        f"Motion tensor {tensor.motion.shape} ({tensor.motion.dtype}), frames "
+        f"{tensor.first_frame}-{tensor.first_frame + len(tensor) - 1}: {output_prefix}.motion.npy"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -3,6 +3,8 @@ from typing import List, Set
 import pandas as pd
 import sys
 
+from video_generation.motion_vector import open_motion_vectors
+
 
 def compare_frames(
     first_method_df: pd.DataFrame,
@@ -25,6 +27,13 @@ def compare_frames(
     second_method_indexed = second_method_df.set_index("frame")
 
     for frame_number in range(start_frame, end_frame + 1):
+        # Frames without motion vectors (e.g. I-frames) have no rows in either file
+        if (
+            frame_number not in first_method_indexed.index
+            and frame_number not in second_method_indexed.index
+        ):
+            continue
+
         # Use .loc for faster indexed access
         try:
             first_method_data = first_method_indexed.loc[frame_number]
@@ -76,6 +85,62 @@ def write_results(
             )
 
 
+def compare_all_rows(
+    first_method_df: pd.DataFrame, second_method_df: pd.DataFrame
+) -> List[str]:
+    """Differences between two outputs over every row and every column,
+    method_id included: the same columns and row count, and equal rows once
+    both are ordered by frame (rows within a frame keep their written order)."""
+    differences: List[str] = []
+    first = first_method_df.sort_values("frame", kind="stable", ignore_index=True)
+    second = second_method_df.sort_values("frame", kind="stable", ignore_index=True)
+
+    if list(first.columns) != list(second.columns):
+        return [f"Columns differ: first method={list(first.columns)}, second method={list(second.columns)}"]
+
+    if len(first) != len(second):
+        differences.append(f"Row count differs (first method={len(first)}, second method={len(second)})")
+        counts = (
+            pd.concat([first["frame"].value_counts(), second["frame"].value_counts()], axis=1, keys=["first", "second"])
+            .fillna(0)
+            .astype(int)
+        )
+        for frame_number, row in counts[counts["first"] != counts["second"]].sort_index().iterrows():
+            differences.append(
+                f"Frame {frame_number}: row count differs (first method={row['first']}, second method={row['second']})"
+            )
+        return differences
+
+    unequal = (first != second) & ~(first.isna() & second.isna())
+    for index in unequal.index[unequal.any(axis=1)]:
+        for column_name in unequal.columns[unequal.loc[index]]:
+            differences.append(
+                f"Frame {first.at[index, 'frame']}, row {index}: '{column_name}' differs "
+                f"(first method={first.at[index, column_name]}, second method={second.at[index, column_name]})"
+            )
+    return differences
+
+
+def compare_outputs(first_file_path, second_file_path, output_file_path, max_reported: int = 50) -> bool:
+    """Whether two outputs are identical row for row (see compare_all_rows);
+    the differences, at most max_reported of them, are written to output_file_path."""
+    with open_motion_vectors(first_file_path) as first_file:
+        first_method_dataframe = pd.read_csv(first_file)
+    with open_motion_vectors(second_file_path) as second_file:
+        second_method_dataframe = pd.read_csv(second_file)
+
+    differences = compare_all_rows(first_method_dataframe, second_method_dataframe)
+    with open(output_file_path, "w") as output_file:
+        if differences:
+            reported = differences[:max_reported]
+            if len(differences) > max_reported:
+                reported.append(f"... {len(differences) - max_reported} more differences")
+            output_file.write("\n".join(reported) + "\n")
+        else:
+            output_file.write(f"No differences found in {len(first_method_dataframe)} rows.\n")
+    return not differences
+
+
 def compare(
     first_file_path, second_file_path, start_frame, end_frame, output_file_path
 ):
@@ -85,8 +150,11 @@ def compare(
         sys.exit(1)
 
     try:
-        first_method_dataframe = pd.read_csv(first_file_path)
-        second_method_dataframe = pd.read_csv(second_file_path)
+        # .csv.zst outputs are decompressed while pandas reads them
+        with open_motion_vectors(first_file_path) as first_file:
+            first_method_dataframe = pd.read_csv(first_file)
+        with open_motion_vectors(second_file_path) as second_file:
+            second_method_dataframe = pd.read_csv(second_file)
 
         frame_differences: List[str] = compare_frames(
             first_method_dataframe, second_method_dataframe, start_frame, end_frame
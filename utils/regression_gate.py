@@ -0,0 +1,216 @@
+"""Performance regression gate: a run's results against a baseline run.
+
+    python -m utils.regression_gate <results_dir> [baseline=<results_dir>] [db=results/warehouse.sqlite]
+        [k=3] [min_change=5] [history=10]
+
+Compares FPS, time per frame, CPU and memory (RSS) per method and stream count
+(and thread count, cache state or affinity policy when both runs have them).
+The baseline is the given run folder, or else the newest earlier run on the
+same host in the results warehouse (utils/results_warehouse.py).
+
+A change only counts when it is larger than the metric's noise: the threshold
+is max(min_change %, k x the run-to-run variation of that method and stream
+count over the last `history` warehouse runs on the host). Without enough
+history, DEFAULT_NOISE is used. The verdict table is printed, saved to
+plots/regression_verdict.csv (picked up by the Confluence reports) and the
+exit status is 1 when any metric regressed.
+"""
+
+import sys
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+import utils.results_warehouse as warehouse
+
+# Metric -> +1 when higher is better, -1 when lower is better
+METRICS = {"fps": 1, "time_per_frame": -1, "cpu": -1, "memory": -1}
+
+# Relative run-to-run variation (as a fraction) assumed without history
+DEFAULT_NOISE = {"fps": 0.02, "time_per_frame": 0.02, "cpu": 0.03, "memory": 0.05}
+
+# Result columns that identify a configuration when both runs have them
+KEY_COLUMNS = ["method", "streams", "threads", "affinity", "input_cache"]
+
+VERDICT_CSV = Path("plots") / "regression_verdict.csv"
+
+
+def _load(results_dir) -> pd.DataFrame:
+    path = Path(results_dir) / warehouse.RESULTS_CSV
+    if not path.is_file():
+        raise FileNotFoundError(f"No {warehouse.RESULTS_CSV} in {results_dir}")
+    return pd.read_csv(path)
+
+
+def history_noise(db: warehouse.ResultsWarehouse, run_id: str, host: Optional[str], history: int = 10) -> pd.DataFrame:
+    """Robust relative variation (1.4826 x MAD / median) of each metric per
+    (method, streams) over the last `history` runs before run_id on host.
+    Configurations with fewer than 3 runs are left out."""
+    sql = (
+        "SELECT results.run_id, runs.started_at, method, streams, "
+        + ", ".join(METRICS)
+        + " FROM results JOIN runs ON runs.run_id = results.run_id "
+        "WHERE runs.started_at < (SELECT started_at FROM runs WHERE run_id = ?)"
+    )
+    params = [run_id]
+    if host:
+        sql += " AND runs.host = ?"
+        params.append(host)
+    df = db.query(sql, params)
+    if df.empty:
+        return pd.DataFrame()
+
+    per_run = df.groupby(["method", "streams", "started_at", "run_id"], as_index=False)[list(METRICS)].mean()
+    recent = per_run.sort_values("started_at").groupby(["method", "streams"]).tail(history)
+
+    def variation(values: pd.Series) -> float:
+        median = values.median()
+        if len(values) < 3 or not median:
+            return np.nan
+        return 1.4826 * (values - median).abs().median() / abs(median)
+
+    return recent.groupby(["method", "streams"])[list(METRICS)].agg(variation).reset_index()
+
+
+def compare(
+    current: pd.DataFrame,
+    baseline: pd.DataFrame,
+    noise: Optional[pd.DataFrame] = None,
+    k: float = 3.0,
+    min_change: float = 0.05,
+) -> pd.DataFrame:
+    """One row per configuration and metric: baseline, current, change_pct,
+    threshold_pct and status (regression, improvement or ok)."""
+    keys = [c for c in KEY_COLUMNS if c in current.columns and c in baseline.columns]
+    metrics = [m for m in METRICS if m in current.columns and m in baseline.columns]
+    current = current.groupby(keys, dropna=False)[metrics].mean()
+    baseline = baseline.groupby(keys, dropna=False)[metrics].mean()
+    both = current.join(baseline, how="inner", lsuffix="_current", rsuffix="_baseline").reset_index()
+
+    rows = []
+    for metric in metrics:
+        table = both[keys].copy()
+        table["metric"] = metric
+        table["baseline"] = both[f"{metric}_baseline"]
+        table["current"] = both[f"{metric}_current"]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            table["change_pct"] = 100.0 * (table["current"] - table["baseline"]) / table["baseline"].abs()
+
+        variation = pd.Series(DEFAULT_NOISE[metric], index=table.index)
+        if noise is not None and not noise.empty and metric in noise.columns:
+            measured = table[["method", "streams"]].merge(noise, on=["method", "streams"], how="left")[metric]
+            variation = measured.fillna(DEFAULT_NOISE[metric]).set_axis(table.index)
+        table["threshold_pct"] = 100.0 * np.maximum(min_change, k * variation)
+
+        worse = -METRICS[metric] * table["change_pct"]
+        table["status"] = np.select(
+            [worse > table["threshold_pct"], -worse > table["threshold_pct"]],
+            ["regression", "improvement"],
+            "ok",
+        )
+        rows.append(table)
+    verdict = pd.concat(rows, ignore_index=True)
+    return verdict.sort_values(keys + ["metric"], ignore_index=True)
+
+
+def load_verdict(results_dir) -> Optional[pd.DataFrame]:
+    """The verdict saved for a run, or None when the gate has not run on it."""
+    path = Path(results_dir) / VERDICT_CSV
+    return pd.read_csv(path) if path.is_file() else None
+
+
+def verdict_table(verdict: pd.DataFrame) -> dict:
+    """Verdict as one row per configuration with a cell per metric, for the
+    report templates: {"baseline_run", "metrics", "regressions", "rows": [
+    {"config", "cells": [{"change_pct", "status"}]}]}."""
+    keys = [c for c in KEY_COLUMNS if c in verdict.columns]
+    metrics = [m for m in METRICS if m in set(verdict["metric"])]
+    rows = []
+    for config, group in verdict.groupby(keys, sort=False, dropna=False):
+        config = config if isinstance(config, tuple) else (config,)
+        by_metric = group.set_index("metric")
+        rows.append(
+            {
+                "config": ", ".join(
+                    f"{value}" if key == "method" else f"{key}={value}"
+                    for key, value in zip(keys, config)
+                    if not pd.isna(value)
+                ),
+                "cells": [
+                    {
+                        "change_pct": by_metric.at[metric, "change_pct"],
+                        "status": by_metric.at[metric, "status"],
+                    }
+                    for metric in metrics
+                ],
+            }
+        )
+    return {
+        "baseline_run": verdict["baseline_run"].iloc[0] if "baseline_run" in verdict else None,
+        "metrics": metrics,
+        "regressions": int((verdict["status"] == "regression").sum()),
+        "rows": rows,
+    }
+
+
+def run_gate(
+    results_dir,
+    baseline_dir=None,
+    db_path=warehouse.DEFAULT_DB,
+    k: float = 3.0,
+    min_change: float = 0.05,
+    history: int = 10,
+) -> Optional[pd.DataFrame]:
+    """Compare a run against its baseline and save the verdict next to its
+    plots; returns None when there is no baseline to compare with."""
+    results_dir = Path(results_dir).resolve()
+    current = _load(results_dir)
+
+    noise = None
+    with warehouse.ResultsWarehouse(db_path) as db:
+        if not db.has_run(results_dir.name):
+            db.ingest_run(results_dir)
+        run = db.query("SELECT * FROM runs WHERE run_id = ?", (results_dir.name,)).iloc[0]
+        if baseline_dir is None:
+            previous = db.last_run(before=results_dir.name, host=run["host"])
+            if previous is None:
+                print(f"No earlier run to compare with in {db.path}; give baseline=<results_dir>")
+                return None
+            baseline_dir = previous["results_dir"]
+        noise = history_noise(db, results_dir.name, run["host"], history)
+
+    verdict = compare(current, _load(baseline_dir), noise, k, min_change)
+    verdict.insert(0, "baseline_run", Path(baseline_dir).name)
+    verdict.to_csv(results_dir / VERDICT_CSV, index=False)
+    return verdict
+
+
+def main(argv):
+    if len(argv) < 2:
+        print(__doc__)
+        return 1
+
+    settings = dict(arg.split("=", 1) for arg in argv[2:] if "=" in arg)
+    verdict = run_gate(
+        argv[1],
+        settings.get("baseline"),
+        settings.get("db", warehouse.DEFAULT_DB),
+        float(settings.get("k", 3.0)),
+        float(settings.get("min_change", 5.0)) / 100.0,
+        int(settings.get("history", 10)),
+    )
+    if verdict is None:
+        return 0
+
+    print(f"Baseline: {verdict['baseline_run'].iloc[0]}")
+    print(verdict.drop(columns="baseline_run").round(2).to_string(index=False))
+    regressions = verdict[verdict["status"] == "regression"]
+    improvements = verdict[verdict["status"] == "improvement"]
+    print(f"{len(regressions)} regressions, {len(improvements)} improvements: {Path(argv[1]) / VERDICT_CSV}")
+    return 1 if len(regressions) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
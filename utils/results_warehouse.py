@@ -0,0 +1,331 @@
+"""Results of every benchmark run in one indexed SQLite database.
+
+    python -m utils.results_warehouse ingest [results_dir ...] [db=results/warehouse.sqlite] [force=0]
+    python -m utils.results_warehouse runs [db=...]
+    python -m utils.results_warehouse trend [metric=fps] [streams=15] [method=...] [host=...] [out=<png>] [db=...]
+
+ingest adds results/<run>/plots/benchmark_results.csv of the given runs (all
+runs under results/ by default, skipping those already in the database) along
+with the run's environment.json (host, CPU, git commits, see
+record_environment) when the run has one. Queries then read the database
+instead of re-parsing every run's CSVs.
+"""
+
+import json
+import os
+import platform
+import sqlite3
+import subprocess
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+DEFAULT_DB = Path("results") / "warehouse.sqlite"
+RESULTS_CSV = Path("plots") / "benchmark_results.csv"
+ENVIRONMENT_JSON = "environment.json"
+
+# Columns of benchmark_results.csv with their own database column; any other
+# column (harness options such as threads) is kept in the options JSON
+RESULT_COLUMNS = {
+    "method": "TEXT",
+    "streams": "INTEGER",
+    "time_per_frame": "REAL",
+    "fps": "REAL",
+    "cpu": "REAL",
+    "memory": "REAL",
+    "mvs": "INTEGER",
+    "frames": "INTEGER",
+    "high_profile": "TEXT",
+    "min_stream_fps": "REAL",
+    "run_order": "INTEGER",
+    "input_cache": "TEXT",
+}
+
+RUN_COLUMNS = {
+    "run_id": "TEXT PRIMARY KEY",
+    "results_dir": "TEXT",
+    "started_at": "TEXT",
+    "ingested_at": "TEXT",
+    "git_commit": "TEXT",
+    "ffmpeg_commit": "TEXT",
+    "host": "TEXT",
+    "cpu_model": "TEXT",
+    "cpu_count": "INTEGER",
+    "kernel": "TEXT",
+    "python": "TEXT",
+    "video": "TEXT",
+    "environment": "TEXT",
+}
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS runs ({", ".join(f"{name} {kind}" for name, kind in RUN_COLUMNS.items())});
+CREATE TABLE IF NOT EXISTS results (
+    run_id TEXT NOT NULL REFERENCES runs(run_id) ON DELETE CASCADE,
+    git_commit TEXT,
+    host TEXT,
+    {", ".join(f"{name} {kind}" for name, kind in RESULT_COLUMNS.items())},
+    options TEXT
+);
+CREATE INDEX IF NOT EXISTS results_key ON results (method, streams, git_commit, host);
+CREATE INDEX IF NOT EXISTS results_run ON results (run_id);
+CREATE INDEX IF NOT EXISTS runs_started ON runs (started_at);
+"""
+
+
+def _git_commit(path: Path) -> Optional[str]:
+    # Only a checkout of its own (ffmpeg/ is a submodule), not the enclosing repository
+    if not (path / ".git").exists():
+        return None
+    try:
+        result = subprocess.run(
+            ["git", "-C", str(path), "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip() or None
+
+
+def _cpu_model() -> Optional[str]:
+    try:
+        with open("/proc/cpuinfo") as f:
+            for line in f:
+                if line.startswith("model name"):
+                    return line.split(":", 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or None
+
+
+def record_environment(results_dir, project_root, **run) -> Dict:
+    """Write <results_dir>/environment.json describing the host and code of a
+    run; extra keyword arguments (video, streams, ...) are stored as given."""
+    project_root = Path(project_root)
+    environment = {
+        "started_at": datetime.now().isoformat(timespec="seconds"),
+        "git_commit": _git_commit(project_root),
+        "ffmpeg_commit": _git_commit(project_root / "ffmpeg"),
+        "host": platform.node(),
+        "cpu_model": _cpu_model(),
+        "cpu_count": os.cpu_count(),
+        "kernel": platform.release(),
+        "python": platform.python_version(),
+        **{key: str(value) if isinstance(value, Path) else value for key, value in run.items()},
+    }
+    with open(Path(results_dir) / ENVIRONMENT_JSON, "w") as f:
+        json.dump(environment, f, indent=4)
+    return environment
+
+
+def _started_at(run_id: str) -> Optional[str]:
+    """Start time from a results folder name (YYYYMMDD_HHMM or YYYYMMDD_HHMMSS)."""
+    for fmt in ("%Y%m%d_%H%M%S", "%Y%m%d_%H%M"):
+        try:
+            return datetime.strptime(run_id, fmt).isoformat(timespec="seconds")
+        except ValueError:
+            continue
+    return None
+
+
+class ResultsWarehouse:
+    """Ingest and query benchmark results across runs."""
+
+    def __init__(self, path=DEFAULT_DB):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(self.path)
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def has_run(self, run_id: str) -> bool:
+        return self.connection.execute("SELECT 1 FROM runs WHERE run_id = ?", (run_id,)).fetchone() is not None
+
+    def ingest_run(self, results_dir) -> int:
+        """Add (or replace) one run; returns the number of result rows."""
+        results_dir = Path(results_dir).resolve()
+        csv_path = results_dir / RESULTS_CSV
+        if not csv_path.is_file():
+            raise FileNotFoundError(f"No {RESULTS_CSV} in {results_dir}")
+
+        run_id = results_dir.name
+        environment = {}
+        if (results_dir / ENVIRONMENT_JSON).is_file():
+            with open(results_dir / ENVIRONMENT_JSON) as f:
+                environment = json.load(f)
+        run = {name: environment.get(name) for name in RUN_COLUMNS}
+        run.update(
+            run_id=run_id,
+            results_dir=str(results_dir),
+            started_at=environment.get("started_at") or _started_at(run_id),
+            ingested_at=datetime.now().isoformat(timespec="seconds"),
+            environment=json.dumps(environment) if environment else None,
+        )
+
+        df = pd.read_csv(csv_path)
+        extra = [column for column in df.columns if column not in RESULT_COLUMNS]
+        rows = []
+        for record in df.to_dict("records"):
+            row = {name: record.get(name) for name in RESULT_COLUMNS}
+            row = {name: None if pd.isna(value) else value for name, value in row.items()}
+            options = {name: record[name] for name in extra if not pd.isna(record[name])}
+            rows.append(
+                (run_id, run["git_commit"], run["host"], *row.values(), json.dumps(options) if options else None)
+            )
+
+        result_names = ["run_id", "git_commit", "host", *RESULT_COLUMNS, "options"]
+        with self.connection:
+            self.connection.execute("DELETE FROM runs WHERE run_id = ?", (run_id,))
+            self.connection.execute(
+                f"INSERT INTO runs ({', '.join(run)}) VALUES ({', '.join('?' * len(run))})",
+                tuple(run.values()),
+            )
+            self.connection.executemany(
+                f"INSERT INTO results ({', '.join(result_names)}) VALUES ({', '.join('?' * len(result_names))})",
+                rows,
+            )
+        return len(rows)
+
+    def ingest_all(self, results_root="results", force: bool = False) -> List[str]:
+        """Ingest every run folder under results_root that has results and is
+        not in the database yet (or every one with force)."""
+        ingested = []
+        for results_dir in sorted(Path(results_root).iterdir()):
+            if not (results_dir / RESULTS_CSV).is_file():
+                continue
+            if not force and self.has_run(results_dir.name):
+                continue
+            self.ingest_run(results_dir)
+            ingested.append(results_dir.name)
+        return ingested
+
+    def query(self, sql: str, params=()) -> pd.DataFrame:
+        return pd.read_sql_query(sql, self.connection, params=params)
+
+    def runs(self) -> pd.DataFrame:
+        """One row per run, oldest first, with its result row count."""
+        return self.query(
+            "SELECT runs.*, COUNT(results.run_id) AS results FROM runs "
+            "LEFT JOIN results ON results.run_id = runs.run_id "
+            "GROUP BY runs.run_id ORDER BY started_at, runs.run_id"
+        )
+
+    def last_run(self, before: Optional[str] = None, host: Optional[str] = None) -> Optional[pd.Series]:
+        """Newest run, optionally started before a run id or on one host."""
+        sql, params = "SELECT * FROM runs WHERE 1 = 1", []
+        if before:
+            sql += " AND started_at < (SELECT started_at FROM runs WHERE run_id = ?)"
+            params.append(before)
+        if host:
+            sql += " AND host = ?"
+            params.append(host)
+        runs = self.query(sql + " ORDER BY started_at DESC, run_id DESC LIMIT 1", params)
+        return runs.iloc[0] if len(runs) else None
+
+    def results(
+        self,
+        run_id: Optional[str] = None,
+        method: Optional[str] = None,
+        streams: Optional[int] = None,
+        git_commit: Optional[str] = None,
+        host: Optional[str] = None,
+    ) -> pd.DataFrame:
+        """Result rows matching every filter given, with the run's start time."""
+        sql = "SELECT runs.started_at, results.* FROM results JOIN runs ON runs.run_id = results.run_id WHERE 1 = 1"
+        params = []
+        for column, value in (
+            ("results.run_id", run_id),
+            ("results.method", method),
+            ("results.streams", streams),
+            ("results.git_commit", git_commit),
+            ("results.host", host),
+        ):
+            if value is not None:
+                sql += f" AND {column} = ?"
+                params.append(value)
+        return self.query(sql + " ORDER BY runs.started_at, results.method, results.streams", params)
+
+    def trend(
+        self,
+        metric: str = "fps",
+        streams: Optional[int] = None,
+        method: Optional[str] = None,
+        host: Optional[str] = None,
+    ) -> pd.DataFrame:
+        """metric per run (rows, by start time) and method (columns). Runs with
+        several rows per method (e.g. a thread sweep) are averaged."""
+        if metric not in RESULT_COLUMNS:
+            raise ValueError(f"Unknown metric '{metric}', expected one of {list(RESULT_COLUMNS)}")
+        df = self.results(method=method, streams=streams, host=host)
+        if df.empty:
+            return pd.DataFrame()
+        return df.pivot_table(index=["started_at", "run_id"], columns="method", values=metric, aggfunc="mean")
+
+
+def plot_trend(trend: pd.DataFrame, metric: str, output_path: str):
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(16, 9))
+    x = pd.to_datetime(trend.index.get_level_values("started_at"))
+    for method in trend.columns:
+        ax.plot(x, trend[method], marker="o", label=method)
+    ax.set_xlabel("Run")
+    ax.set_ylabel(metric)
+    ax.set_title(f"{metric} across runs")
+    ax.grid(True, alpha=0.3)
+    ax.legend(fontsize=8)
+    fig.autofmt_xdate()
+    fig.tight_layout()
+    fig.savefig(output_path)
+    plt.close(fig)
+
+
+def main(argv):
+    if len(argv) < 2 or argv[1] not in ("ingest", "runs", "trend"):
+        print(__doc__)
+        return 1
+
+    command = argv[1]
+    settings = dict(arg.split("=", 1) for arg in argv[2:] if "=" in arg)
+    paths = [arg for arg in argv[2:] if "=" not in arg]
+
+    with ResultsWarehouse(settings.get("db", DEFAULT_DB)) as warehouse:
+        if command == "ingest":
+            if paths:
+                for path in paths:
+                    print(f"{Path(path).name}: {warehouse.ingest_run(path)} rows")
+            else:
+                ingested = warehouse.ingest_all(force=settings.get("force", "0") != "0")
+                print(f"Ingested {len(ingested)} runs into {warehouse.path}")
+        elif command == "runs":
+            print(warehouse.runs().to_string(index=False))
+        else:
+            metric = settings.get("metric", "fps")
+            trend = warehouse.trend(
+                metric,
+                int(settings["streams"]) if "streams" in settings else None,
+                settings.get("method"),
+                settings.get("host"),
+            )
+            if trend.empty:
+                print("No results match")
+                return 1
+            print(trend.round(2).to_string())
+            if "out" in settings:
+                plot_trend(trend, metric, settings["out"])
+                print(f"Saved trend chart: {settings['out']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,229 @@
+import mmap
+import os
+import time
+from typing import Iterator, List, Optional
+
+import numpy as np
+
+# Layouts of extractors/shm_ring.h (format=shm output)
+MAGIC = b"MVRING1"
+
+HEADER_DTYPE = np.dtype(
+    [
+        ("magic", "S8"),
+        ("slot_count", "<u4"),
+        ("slot_capacity", "<u4"),
+        ("mv_size", "<u4"),
+        ("header_size", "<u4"),
+        ("slot_bytes", "<u8"),
+        ("published", "<u8"),
+        ("closed", "<u4"),
+        ("writer_pid", "<i4"),
+        ("reserved", "V16"),
+    ]
+)
+
+SLOT_DTYPE = np.dtype(
+    [
+        ("seq", "<u8"),
+        ("frame_num", "<i4"),
+        ("method_id", "<i4"),
+        ("count", "<u4"),
+        ("truncated", "<u4"),
+        ("decoded_ns", "<i8"),
+        ("published_ns", "<i8"),
+        ("reserved", "V24"),
+    ]
+)
+
+# AVMotionVector with its natural C alignment (40 bytes)
+MOTION_VECTOR_DTYPE = np.dtype(
+    [
+        ("source", "<i4"),
+        ("w", "u1"),
+        ("h", "u1"),
+        ("src_x", "<i2"),
+        ("src_y", "<i2"),
+        ("dst_x", "<i2"),
+        ("dst_y", "<i2"),
+        ("flags", "<u8"),
+        ("motion_x", "<i4"),
+        ("motion_y", "<i4"),
+        ("motion_scale", "<u2"),
+    ],
+    align=True,
+)
+
+
+def shm_path(name: str) -> str:
+    return os.path.join("/dev/shm", name.lstrip("/"))
+
+
+def unlink(name: str) -> None:
+    """Remove a ring; the extractor leaves it in place for late readers."""
+    try:
+        os.unlink(shm_path(name))
+    except FileNotFoundError:
+        pass
+
+
+class RingFrame:
+    """One published frame. mvs is a view into shared memory, not a copy."""
+
+    def __init__(self, seq, slot, mvs, received_ns):
+        self.seq = seq
+        self.frame_num = int(slot["frame_num"])
+        self.method_id = int(slot["method_id"])
+        self.truncated = int(slot["truncated"])
+        self.decoded_ns = int(slot["decoded_ns"])
+        self.published_ns = int(slot["published_ns"])
+        self.received_ns = received_ns
+        self.mvs = mvs
+
+    @property
+    def latency_ms(self) -> float:
+        """Time from the decoder handing out the frame to the reader picking it up."""
+        return (self.received_ns - self.decoded_ns) / 1e6
+
+
+class MotionVectorRing:
+    """Reader of one extractor's shared-memory ring.
+
+    poll() returns the frames published since the last call. Their mvs arrays
+    are zero-copy views that stay valid only until the writer laps the ring
+    (slot_count frames later); check valid(frame) after using one, or copy it.
+    A reader that falls further behind than slot_count frames skips ahead and
+    counts the overwritten frames in dropped.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        with open(shm_path(name), "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        self._header = np.ndarray((1,), HEADER_DTYPE, buffer=self._map)
+        if self._header["magic"][0] != MAGIC:
+            self.close()
+            raise ValueError(f"{name} is not a motion vector ring (or is still being created)")
+        if self._header["mv_size"][0] != MOTION_VECTOR_DTYPE.itemsize:
+            self.close()
+            raise ValueError(
+                f"{name}: AVMotionVector is {self._header['mv_size'][0]} bytes, "
+                f"expected {MOTION_VECTOR_DTYPE.itemsize}"
+            )
+
+        self.slot_count = int(self._header["slot_count"][0])
+        self.slot_capacity = int(self._header["slot_capacity"][0])
+        header_size = int(self._header["header_size"][0])
+        slot_bytes = int(self._header["slot_bytes"][0])
+
+        self._slots = np.ndarray(
+            (self.slot_count,),
+            SLOT_DTYPE,
+            buffer=self._map,
+            offset=header_size,
+            strides=(slot_bytes,),
+        )
+        self._vectors = [
+            np.ndarray(
+                (self.slot_capacity,),
+                MOTION_VECTOR_DTYPE,
+                buffer=self._map,
+                offset=header_size + i * slot_bytes + SLOT_DTYPE.itemsize,
+            )
+            for i in range(self.slot_count)
+        ]
+        self.next_seq = 0
+        self.dropped = 0
+
+    @classmethod
+    def attach(cls, name: str, timeout: float = 10.0, interval: float = 0.01):
+        """Wait for the extractor to create the ring."""
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                return cls(name)
+            except (FileNotFoundError, ValueError):
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(interval)
+
+    @property
+    def published(self) -> int:
+        return int(self._header["published"][0])
+
+    @property
+    def closed(self) -> bool:
+        return bool(self._header["closed"][0])
+
+    def poll(self) -> List[RingFrame]:
+        published = self.published
+        if published - self.next_seq > self.slot_count:
+            skip = published - self.slot_count - self.next_seq
+            self.dropped += skip
+            self.next_seq += skip
+
+        frames = []
+        while self.next_seq < published:
+            index = self.next_seq % self.slot_count
+            expected = 2 * self.next_seq + 2
+            seq = int(self._slots["seq"][index])
+            if seq < expected:
+                break  # still being written
+            if seq > expected:
+                self.dropped += 1  # lapped while we were catching up
+                self.next_seq += 1
+                continue
+
+            slot = self._slots[index].copy()
+            frame = RingFrame(
+                self.next_seq,
+                slot,
+                self._vectors[index][: int(slot["count"])],
+                time.monotonic_ns(),
+            )
+            # Re-check: the writer may have started on this slot during the copy
+            if int(self._slots["seq"][index]) != expected:
+                self.dropped += 1
+            else:
+                frames.append(frame)
+            self.next_seq += 1
+        return frames
+
+    def valid(self, frame: RingFrame) -> bool:
+        """True while frame.mvs still holds that frame (the slot was not reused)."""
+        index = frame.seq % self.slot_count
+        return int(self._slots["seq"][index]) == 2 * frame.seq + 2
+
+    def frames(self, interval: float = 0.0002) -> Iterator[RingFrame]:
+        """Yield frames until the writer has closed the ring and it is drained."""
+        while True:
+            closed = self.closed
+            batch = self.poll()
+            yield from batch
+            if not batch:
+                if closed and self.next_seq >= self.published:
+                    return
+                time.sleep(interval)
+
+    def close(self) -> None:
+        # Views must go before the mapping can be closed
+        self._header = None
+        self._slots = None
+        self._vectors = []
+        try:
+            self._map.close()
+        except BufferError:
+            pass  # a caller still holds a frame view; the mapping goes with it
+
+
+def read_ring(name: str, timeout: float = 10.0) -> Iterator[RingFrame]:
+    """Attach to a ring, yield every frame until it is closed, then remove it."""
+    ring: Optional[MotionVectorRing] = None
+    try:
+        ring = MotionVectorRing.attach(name, timeout)
+        yield from ring.frames()
+    finally:
+        if ring is not None:
+            ring.close()
+        unlink(name)
@@ -0,0 +1,366 @@
+"""Long-running supervisor for a host's extractor processes.
+
+One asyncio loop launches N extractors of one method (see benchmarking/methods.py),
+reads each one's binary motion vector output from a pipe, hands complete frames
+to a consumer through a bounded queue and restarts streams that fail.
+
+A full queue stops the pipe from being read; the pipe then fills and the
+extractor's writer blocks, so a slow consumer slows decoding instead of
+growing memory without limit.
+
+    python -m utils.supervisor <input> <streams> [method=6] [key=value ...]
+
+{stream} and {port} in the input are replaced per stream (port = port_base + stream).
+"""
+
+import asyncio
+import inspect
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+import benchmarking.benchmark_python as bp
+import benchmarking.methods as mt
+import utils.ffprobe as ffprobe
+from video_generation.motion_vector import BINARY_MAGIC, RECORD_DTYPE
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+
+READ_CHUNK = 1 << 16
+
+
+class StreamState:
+    """Live counters of one supervised stream, read by the report loop."""
+
+    def __init__(self, index: int, input_path: str):
+        self.index = index
+        self.input = input_path
+        self.status = "starting"
+        self.pid: Optional[int] = None
+        self.restarts = 0
+        self.last_exit: Optional[int] = None
+        self.frames = 0  # frames delivered to the consumer, all runs
+        self.mvs = 0
+        self.last_frame = -1  # frame number of the current run
+        self.run_started = 0.0
+        self.fps = 0.0
+        self.lag_ms = float("nan")
+        self.rss_kb = 0
+        self.queued = 0
+        self.stats: Dict[str, Dict] = {}  # last STAT line of each kind
+
+    def row(self) -> Dict:
+        return {
+            "stream": self.index,
+            "status": self.status,
+            "pid": self.pid,
+            "restarts": self.restarts,
+            "frames": self.frames,
+            "mvs": self.mvs,
+            "fps": round(self.fps, 1),
+            "lag_ms": round(self.lag_ms, 1),
+            "rss_mb": round(self.rss_kb / 1024, 1),
+            "queued": self.queued,
+        }
+
+
+def read_rss_kb(pid: int) -> int:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except (FileNotFoundError, ProcessLookupError):
+        pass
+    return 0
+
+
+class Supervisor:
+    """Runs and restarts one extractor process per input.
+
+    consumer(state, frame_num, records) is called for every complete frame with
+    its RECORD_DTYPE rows; it may be a coroutine. Frames without motion vectors
+    (e.g. I-frames) write no rows and are not delivered.
+    """
+
+    def __init__(
+        self,
+        inputs: List[str],
+        method_id: int = 6,
+        options: Optional[Dict] = None,
+        consumer: Optional[Callable] = None,
+        source_fps: float = 0.0,
+        queue_frames: int = 32,
+        restart_on_exit: bool = False,
+        backoff_s: float = 1.0,
+        max_backoff_s: float = 30.0,
+        stable_s: float = 60.0,
+        report_interval_s: float = 2.0,
+    ):
+        self.exe = str(PROJECT_DIR / mt.METHODS[method_id]["exe"])
+        self.method_id = method_id
+        self.options = options or {}
+        self.consumer = consumer
+        self.source_fps = source_fps
+        self.queue_frames = queue_frames
+        self.restart_on_exit = restart_on_exit
+        self.backoff_s = backoff_s
+        self.max_backoff_s = max_backoff_s
+        self.stable_s = stable_s
+        self.report_interval_s = report_interval_s
+        self.streams = [StreamState(i, path) for i, path in enumerate(inputs)]
+        self.stopping = asyncio.Event()
+
+    async def run(self):
+        tasks = [asyncio.create_task(self._supervise(s)) for s in self.streams]
+        monitor = asyncio.create_task(self._monitor())
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            monitor.cancel()
+            self.print_report()
+
+    def stop(self):
+        self.stopping.set()
+
+    def snapshot(self) -> List[Dict]:
+        return [s.row() for s in self.streams]
+
+    async def _supervise(self, state: StreamState):
+        delay = self.backoff_s
+        while not self.stopping.is_set():
+            started = time.monotonic()
+            returncode = await self._run_once(state)
+            state.last_exit = returncode
+            state.pid = None
+
+            if self.stopping.is_set():
+                state.status = "stopped"
+                return
+            if returncode == 0 and not self.restart_on_exit:
+                state.status = "done"
+                return
+
+            # A run that stayed up long enough resets the backoff
+            if time.monotonic() - started >= self.stable_s:
+                delay = self.backoff_s
+            state.status = f"backoff {delay:g}s"
+            state.restarts += 1
+            try:
+                await asyncio.wait_for(self.stopping.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+            delay = min(delay * 2, self.max_backoff_s)
+        state.status = "stopped"
+
+    async def _run_once(self, state: StreamState) -> int:
+        # The child inherits the pipe under the same fd number and writes to /dev/fd/N
+        read_fd, write_fd = os.pipe()
+        cmd = [self.exe, state.input, "1", f"/dev/fd/{write_fd}", "format=binary"]
+        cmd += [f"{key}={value}" for key, value in self.options.items()]
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL,
+                pass_fds=(write_fd,),
+            )
+        except OSError as error:
+            os.close(read_fd)
+            print(f"Stream {state.index}: failed to start {self.exe}: {error}")
+            return -1
+        finally:
+            os.close(write_fd)
+
+        state.pid = proc.pid
+        state.status = "running"
+        state.run_started = time.monotonic()
+        state.last_frame = -1
+
+        loop = asyncio.get_running_loop()
+        reader = asyncio.StreamReader(limit=READ_CHUNK * 4)
+        transport, _ = await loop.connect_read_pipe(
+            lambda: asyncio.StreamReaderProtocol(reader), os.fdopen(read_fd, "rb", 0)
+        )
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_frames)
+
+        stop_task = asyncio.create_task(self.stopping.wait())
+        workers = [
+            asyncio.create_task(self._read_output(state, reader, queue)),
+            asyncio.create_task(self._consume(state, queue)),
+            asyncio.create_task(self._read_stats(state, proc.stdout)),
+        ]
+        work = asyncio.gather(*workers)
+        try:
+            await asyncio.wait({work, stop_task}, return_when=asyncio.FIRST_COMPLETED)
+            error = work.exception() if work.done() else None
+            if error is not None:
+                print(f"Stream {state.index}: {error!r}")
+            if stop_task.done() or error is not None:
+                # Nothing reads the pipe any more, so a child blocked writing to it never exits
+                transport.close()
+                await self._terminate(proc)
+            returncode = await proc.wait()
+            # A consumer or output error fails the run even when the extractor exited cleanly
+            return -1 if error is not None else returncode
+        finally:
+            stop_task.cancel()
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            transport.close()
+
+    async def _terminate(self, proc, timeout_s: float = 5.0):
+        if proc.returncode is not None:
+            return
+        proc.terminate()
+        try:
+            await asyncio.wait_for(proc.wait(), timeout_s)
+        except asyncio.TimeoutError:
+            proc.kill()
+
+    async def _read_output(self, state: StreamState, reader, queue):
+        """Cut the byte stream into records and queue complete frames."""
+        try:
+            magic = await reader.readexactly(len(BINARY_MAGIC))
+        except asyncio.IncompleteReadError:
+            await queue.put(None)
+            return
+        if magic != BINARY_MAGIC:
+            raise ValueError(f"unexpected output header {magic!r}")
+
+        pending = b""
+        held = None  # rows of the newest frame, which may continue in the next read
+        while True:
+            data = await reader.read(READ_CHUNK)
+            if not data:
+                break
+            pending += data
+            usable = len(pending) - len(pending) % RECORD_DTYPE.itemsize
+            records = np.frombuffer(pending[:usable], dtype=RECORD_DTYPE)
+            pending = pending[usable:]
+            if held is not None:
+                records = np.concatenate([held, records])
+            if len(records) == 0:
+                continue
+
+            frames = records["frame"]
+            # Row index where each new frame starts; the last group is held back
+            starts = np.flatnonzero(np.diff(frames)) + 1
+            bounds = [0, *starts.tolist()]
+            for begin, end in zip(bounds[:-1], bounds[1:]):
+                await queue.put((int(frames[begin]), records[begin:end]))
+                state.queued = queue.qsize()
+            held = records[bounds[-1] :].copy()
+
+        if held is not None and len(held):
+            await queue.put((int(held["frame"][0]), held))
+        await queue.put(None)
+
+    async def _consume(self, state: StreamState, queue):
+        while True:
+            item = await queue.get()
+            state.queued = queue.qsize()
+            if item is None:
+                return
+            frame_num, records = item
+            if self.consumer is not None:
+                result = self.consumer(state, frame_num, records)
+                if inspect.isawaitable(result):
+                    await result
+            state.frames += 1
+            state.mvs += len(records)
+            state.last_frame = frame_num
+
+    async def _read_stats(self, state: StreamState, stdout):
+        async for line in stdout:
+            text = line.decode(errors="replace").strip()
+            if text.startswith("STAT "):
+                parsed = bp.parse_stat_lines(text, text.split()[1])
+                if not parsed.empty:
+                    state.stats[text.split()[1]] = parsed.iloc[0].to_dict()
+
+    async def _monitor(self):
+        """Sample FPS, lag and RSS once a second; print the table every report interval."""
+        previous = {s.index: (time.monotonic(), s.frames) for s in self.streams}
+        last_report = time.monotonic()
+        while True:
+            await asyncio.sleep(1.0)
+            now = time.monotonic()
+            for s in self.streams:
+                t0, frames0 = previous[s.index]
+                s.fps = (s.frames - frames0) / (now - t0) if now > t0 else 0.0
+                previous[s.index] = (now, s.frames)
+                s.rss_kb = read_rss_kb(s.pid) if s.pid else 0
+                if self.source_fps > 0 and s.pid and s.last_frame >= 0:
+                    # How far the consumer is behind a live source started with this run
+                    media_ms = (s.last_frame + 1) * 1000.0 / self.source_fps
+                    s.lag_ms = max(0.0, (now - s.run_started) * 1000.0 - media_ms)
+            if self.report_interval_s and now - last_report >= self.report_interval_s:
+                self.print_report()
+                last_report = now
+
+    def print_report(self):
+        print(
+            f"{'Stream':>6} | {'Status':<12} | {'PID':>7} | {'Restarts':>8} | {'Frames':>8} "
+            f"| {'FPS':>7} | {'Lag (ms)':>9} | {'RSS (MB)':>8} | {'Queued':>6}"
+        )
+        for s in self.streams:
+            r = s.row()
+            print(
+                f"{r['stream']:>6} | {r['status']:<12} | {str(r['pid'] or '-'):>7} | {r['restarts']:>8} "
+                f"| {r['frames']:>8} | {r['fps']:>7.1f} | {r['lag_ms']:>9.1f} | {r['rss_mb']:>8.1f} "
+                f"| {r['queued']:>6}"
+            )
+        print(flush=True)
+
+
+# key=value options the supervisor consumes; the rest go to every extractor
+SUPERVISOR_KEYS = {"method", "queue", "loop", "fps", "port_base", "report", "max_backoff"}
+
+
+def expand_inputs(input_path: str, streams: int, port_base: int) -> List[str]:
+    return [
+        input_path.replace("{stream}", str(i)).replace("{port}", str(port_base + i))
+        for i in range(streams)
+    ]
+
+
+def main(argv):
+    if len(argv) < 3:
+        print(__doc__)
+        return 1
+
+    input_path, streams = argv[1], int(argv[2])
+    settings, options = {}, {}
+    for arg in argv[3:]:
+        key, _, value = arg.partition("=")
+        (settings if key in SUPERVISOR_KEYS else options)[key] = value
+
+    source_fps = float(settings.get("fps", 0))
+    if not source_fps and "{" not in input_path and os.path.isfile(input_path):
+        source_fps = ffprobe.probe_video_stream(input_path)["fps"]
+
+    supervisor = Supervisor(
+        expand_inputs(input_path, streams, int(settings.get("port_base", 18554))),
+        method_id=int(settings.get("method", 6)),
+        options=options,
+        source_fps=source_fps,
+        queue_frames=int(settings.get("queue", 32)),
+        restart_on_exit=settings.get("loop", "0") != "0",
+        max_backoff_s=float(settings.get("max_backoff", 30)),
+        report_interval_s=float(settings.get("report", 2)),
+    )
+    try:
+        asyncio.run(supervisor.run())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -1,10 +1,9 @@
-import cv2
-import numpy as np
 import sys
-from tqdm import tqdm
 from typing import List, Optional
 
 import motion_vector as mv
+import video_sink as vs
+from grid_video import create_grid_video
 
 
 def create_combined_video(
@@ -13,132 +12,29 @@ def create_combined_video(
     output_path: str,
     video_segment_index: Optional[int] = None,
     max_frames: int = 660,
+    encoder: str = vs.DEFAULT_ENCODER,
+    preset: str = vs.DEFAULT_PRESET,
 ):
-    video_capture = cv2.VideoCapture(input_video_filename)
-    if not video_capture.isOpened():
-        raise IOError(f"Cannot open video file {input_video_filename}")
-
-    try:
-        frame_width = int(video_capture.get(cv2.CAP_PROP_FRAME_WIDTH))
-        frame_height = int(video_capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
-        fps = int(video_capture.get(cv2.CAP_PROP_FPS))
-
-        # Calculate number of segments: one per motion dataframe + one for original video
-        if len(motion_dataframes) > 0:
-            num_segments = len(motion_dataframes) + 1
-        else:
-            num_segments = 1
-        combined_width = frame_width * num_segments
-
-        # Default video segment index: append the video after the motion segments
-        if video_segment_index is None:
-            video_segment_index = len(motion_dataframes)
-
-        # Determine maximum frames across all data sources
-        max_csv_frames = (
-            max(
-                (dataframe["frame"].max() if not dataframe.empty else 0)
-                for dataframe in motion_dataframes
-            )
-            if motion_dataframes
-            else 0
-        )
-        total_video_frames = int(video_capture.get(cv2.CAP_PROP_FRAME_COUNT))
-        num_frames = max(max_csv_frames, total_video_frames)
-
-        # Initialize video writer for output
-        fourcc = cv2.VideoWriter_fourcc(*"mp4v")
-        video_writer = cv2.VideoWriter(
-            output_path, fourcc, fps, (combined_width, frame_height)
-        )
-
-        # Reset to first frame
-        video_capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
-
-        for frame_number in tqdm(
-            range(1, num_frames + 1), desc="Rendering video frames"
-        ):
-            if frame_number > max_frames:
-                break
-
-            # Initialize combined frame canvas
-            combined_frame = np.zeros((frame_height, combined_width, 3), dtype=np.uint8)
-
-            # Read current video frame
-            if frame_number <= total_video_frames:
-                frame_read_success, video_frame = video_capture.read()
-                if not frame_read_success:
-                    video_frame = np.zeros(
-                        (frame_height, frame_width, 3), dtype=np.uint8
-                    )
-                else:
-                    video_frame = cv2.resize(video_frame, (frame_width, frame_height))
-            else:
-                video_frame = np.zeros((frame_height, frame_width, 3), dtype=np.uint8)
-
-            for segment_index in range(num_segments):
-                segment_x_offset = segment_index * frame_width
-
-                if segment_index == video_segment_index:
-                    # Place original video frame
-                    combined_frame[
-                        :, segment_x_offset : segment_x_offset + frame_width
-                    ] = video_frame
-                else:
-                    # Draw motion vectors for corresponding method
-                    motion_df_index = (
-                        segment_index
-                        if segment_index < video_segment_index
-                        else segment_index - 1
-                    )
-
-                    # Handle out-of-range indices gracefully
-                    if motion_df_index < 0 or motion_df_index >= len(motion_dataframes):
-                        segment_image = np.zeros(
-                            (frame_height, frame_width, 3), dtype=np.uint8
-                        )
-                    else:
-                        current_dataframe = motion_dataframes[motion_df_index]
-                        segment_image = np.zeros(
-                            (frame_height, frame_width, 3), dtype=np.uint8
-                        )
-                        frame_motion_data = current_dataframe[
-                            current_dataframe["frame"] == frame_number
-                        ]
-
-                        frame_motion_data = mv.reduce_motion_vectors(
-                            frame_motion_data, max_vectors=15000
-                        )
-                        mv.draw_motion_vectors(segment_image, frame_motion_data)
-
-                    combined_frame[
-                        :, segment_x_offset : segment_x_offset + frame_width
-                    ] = segment_image
-
-                # Draw vertical dividing line between segments
-                if segment_index > 0:
-                    cv2.line(
-                        combined_frame,
-                        (segment_x_offset, 0),
-                        (segment_x_offset, frame_height),
-                        (128, 128, 128),
-                        1,
-                    )
-
-            video_writer.write(combined_frame)
-
-        video_writer.release()
-        return output_path
-
-    finally:
-        video_capture.release()
+    """Side-by-side video of the motion dataframes and the source video, one row of
+    len(motion_dataframes) + 1 panels; see grid_video.create_grid_video."""
+    return create_grid_video(
+        input_video_filename,
+        motion_dataframes,
+        output_path,
+        end_frame=max_frames,
+        columns=len(motion_dataframes) + 1,
+        video_panel=video_segment_index,
+        encoder=encoder,
+        preset=preset,
+    )
 
 
 if __name__ == "__main__":
     if len(sys.argv) < 4:
         print(
             "Usage: python combine_motion_vectors_with_video.py "
-            "[video_file] [csv_file] [results_path] [video_segment_index] [max_frames]"
+            "[video_file] [csv_file_orig] [csv_file_cust] [results_path] "
+            "[video_segment_index] [max_frames] [encoder] [preset]"
         )
         sys.exit(1)
 
@@ -160,6 +56,9 @@ if __name__ == "__main__":
     else:
         max_frames_to_process = 660
 
+    encoder = sys.argv[7] if len(sys.argv) > 7 else vs.DEFAULT_ENCODER
+    preset = sys.argv[8] if len(sys.argv) > 8 else vs.DEFAULT_PRESET
+
     output_path = f"{results_directory}/combined_motion_vectors_with_video.mp4"
     output_file_path = create_combined_video(
         input_video_filename,
@@ -167,5 +66,7 @@ if __name__ == "__main__":
         output_path,
         video_position,
         max_frames_to_process,
+        encoder,
+        preset,
     )
     print(f"Combined video saved as {output_file_path}")
@@ -0,0 +1,76 @@
+import itertools
+import os
+import sys
+import time
+
+import pandas as pd
+
+import motion_vector as mv
+from generate_motion_vectors_video import create_motion_vector_video
+
+# (label, encoder, preset); "none" renders without encoding and is the baseline
+ENCODER_SWEEP = [
+    ("none", "none", None),
+    ("mp4v (cv2)", "mp4v", None),
+    ("x264 ultrafast", "x264", "ultrafast"),
+    ("x264 veryfast", "x264", "veryfast"),
+    ("x264 medium", "x264", "medium"),
+    ("project mpeg4", "project", None),
+]
+
+
+def run_encoder_benchmark(mv_file, output_dir, max_frames=300, width=1920, height=1080, fps=24):
+    """Render the same frames once per encoder and compare end-to-end throughput.
+
+    Frames are parsed before timing starts, so the numbers cover drawing and
+    encoding only. encode_ms is what each sink adds per frame over rendering
+    alone; with a piped encoder most of it overlaps with drawing.
+    """
+    frames = list(itertools.islice(mv.iter_motion_vector_frames(mv_file), max_frames))
+    if not frames:
+        print(f"No motion vectors in {mv_file}")
+        return pd.DataFrame()
+
+    rows = []
+    for label, encoder, preset in ENCODER_SWEEP:
+        output_path = os.path.join(output_dir, f"encoder_{label.split()[0]}_{preset or 'default'}.mp4")
+        start = time.perf_counter()
+        try:
+            create_motion_vector_video(
+                frames, output_path, width, height, fps, encoder=encoder, preset=preset
+            )
+        except (FileNotFoundError, RuntimeError) as error:
+            print(f"Skipping {label}: {error}")
+            continue
+        elapsed = time.perf_counter() - start
+
+        size = os.path.getsize(output_path) if encoder != "none" else 0
+        rows.append(
+            {
+                "encoder": label,
+                "frames": len(frames),
+                "fps": len(frames) / elapsed,
+                "ms_per_frame": 1000.0 * elapsed / len(frames),
+                "size_mb": size / (1024 * 1024),
+            }
+        )
+
+    df = pd.DataFrame(rows)
+    baseline = df.loc[df["encoder"] == "none", "ms_per_frame"]
+    if not baseline.empty:
+        df["encode_ms"] = (df["ms_per_frame"] - baseline.iloc[0]).clip(lower=0)
+
+    csv_path = os.path.join(output_dir, "encoder_benchmark.csv")
+    df.to_csv(csv_path, index=False)
+    print(df.round(2).to_string(index=False))
+    print(f"Saved encoder benchmark results: {csv_path}")
+    return df
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("Usage: python encoder_benchmark.py [mv_file (.csv, .csv.zst, .mvb)] [output_dir] [max_frames]")
+        sys.exit(1)
+
+    max_frames = int(sys.argv[3]) if len(sys.argv) > 3 else 300
+    run_encoder_benchmark(sys.argv[1], sys.argv[2], max_frames)
@@ -4,35 +4,41 @@ import cv2
 import pandas as pd
 import os
 from tqdm import tqdm
+from typing import Iterable, Tuple
 
 import motion_vector as mv
+import video_sink as vs
 
 
 def create_motion_vector_video(
-    df: pd.DataFrame,
+    frames: Iterable[Tuple[int, pd.DataFrame]],
     output_path: str,
     width: int = 1920,
     height: int = 1080,
     fps: int = 24,
     max_vectors: int = 15000,
+    encoder: str = vs.DEFAULT_ENCODER,
+    preset: str = vs.DEFAULT_PRESET,
+    style: str = "arrows",
 ):
-    """Create motion vector visualization video."""
+    """Create motion vector visualization video from (frame, rows) pairs in frame order.
 
-    frames = sorted(df["frame"].unique())
-    print(f"Creating video with {len(frames)} frames...")
+    Pass mv.iter_motion_vector_frames() to render while the file is read, or
+    df.groupby("frame") for data already in memory. encoder is one of
+    vs.ENCODERS; the ffmpeg ones encode in a separate process. style is one of
+    mv.STYLES; "heatmap" costs about the same per frame at any vector count.
+    """
 
-    writer = cv2.VideoWriter(
-        output_path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height)
-    )
-
-    for frame_num in tqdm(frames, desc="Rendering"):
-        frame_data = df[df["frame"] == frame_num]
+    writer = vs.open_video_sink(output_path, width, height, fps, encoder, preset)
 
-        if len(frame_data) > max_vectors:
-            frame_data = mv.reduce_motion_vectors(frame_data, max_vectors)
+    rendered = 0
+    vectors = 0
+    for frame_num, frame_data in tqdm(frames, desc="Rendering"):
+        rendered += 1
+        vectors += len(frame_data)
 
         img = np.zeros((height, width, 3), dtype=np.uint8)
-        mv.draw_motion_vectors(img, frame_data)
+        mv.draw_motion(img, frame_data, style, max_vectors)
 
         cv2.putText(
             img,
@@ -56,31 +62,35 @@ def create_motion_vector_video(
         writer.write(img)
 
     writer.release()
+    print(f"Rendered {rendered} frames with {vectors:,} motion vectors.")
     print(f"Saved optimized motion vector video: {output_path}")
 
 
 if __name__ == "__main__":
     if len(sys.argv) < 3:
-        print("Usage: python generate_motion_vectors_video.py [csv_file] [output_dir]")
+        print(
+            "Usage: python generate_motion_vectors_video.py "
+            "[csv_or_csv.zst_file] [output_dir] [encoder (x264, project, mp4v)] [preset] "
+            "[style (arrows, heatmap)]"
+        )
         sys.exit(1)
 
     csv_file = sys.argv[1]
     output_dir = sys.argv[2]
+    encoder = sys.argv[3] if len(sys.argv) > 3 else vs.DEFAULT_ENCODER
+    preset = sys.argv[4] if len(sys.argv) > 4 else vs.DEFAULT_PRESET
+    style = sys.argv[5] if len(sys.argv) > 5 else "arrows"
 
     if not os.path.isfile(csv_file):
         print(f"Error: File '{csv_file}' not found.")
         sys.exit(1)
 
-    print("Loading motion vector data...")
-    df = mv.load_motion_vectors(csv_file)
-
-    output_path = os.path.join(output_dir, "motion_vectors_video.mp4")
-
-    print(f"Loaded {len(df):,} motion vectors.")
-    print(
-        f"Frames in data: {sorted(df['frame'].unique())[:10]}{'...' if len(df['frame'].unique())>10 else ''}"
-    )
+    name = "motion_vectors_video.mp4" if style == "arrows" else f"motion_vectors_{style}.mp4"
+    output_path = os.path.join(output_dir, name)
 
+    # Frames are rendered as they are read (and decompressed for .csv.zst)
     print("Creating motion vector video...")
-    create_motion_vector_video(df, output_path)
+    create_motion_vector_video(
+        mv.iter_motion_vector_frames(csv_file), output_path, encoder=encoder, preset=preset, style=style
+    )
     print("Visualization complete!")
@@ -0,0 +1,200 @@
+import math
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Union
+
+import cv2
+import numpy as np
+import pandas as pd
+from tqdm import tqdm
+
+import motion_vector as mv
+import video_sink as vs
+
+
+class MethodFrames:
+    """One method's motion vectors sorted by frame, so a frame is a slice
+    found by binary search instead of a filter over the whole table."""
+
+    def __init__(self, source: Union[str, pd.DataFrame], start_frame: int, end_frame: int):
+        df = mv.load_motion_vectors(source) if isinstance(source, str) else source
+        if "method_id" in df.columns and not df.empty:
+            self.label = f"Method {int(df['method_id'].iloc[0])}"
+        elif isinstance(source, str):
+            self.label = os.path.basename(source).split(".")[0]
+        else:
+            self.label = ""
+
+        df = df[(df["frame"] >= start_frame) & (df["frame"] <= end_frame)]
+        self.df = df.sort_values("frame", kind="stable").reset_index(drop=True)
+        self.frames = self.df["frame"].to_numpy()
+
+    def frame(self, frame_num: int) -> pd.DataFrame:
+        begin, end = np.searchsorted(self.frames, [frame_num, frame_num + 1])
+        return self.df.iloc[begin:end]
+
+    def last_frame(self) -> int:
+        return int(self.frames[-1]) if len(self.frames) else 0
+
+
+def _render_panel(
+    panel: np.ndarray,
+    method: MethodFrames,
+    frame_num: int,
+    max_vectors: int,
+    style: str,
+    background: Optional[np.ndarray],
+):
+    if background is None:
+        panel.fill(0)
+    else:
+        np.copyto(panel, background)
+    frame_data = method.frame(frame_num)
+    if len(frame_data):
+        alpha = 0.6 if background is not None else None
+        mv.draw_motion(panel, frame_data, style, max_vectors, alpha)
+    cv2.putText(panel, method.label, (20, 40), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (255, 255, 255), 2)
+
+
+def create_grid_video(
+    input_video_filename: str,
+    motion_sources: List[Union[str, pd.DataFrame]],
+    output_path: str,
+    start_frame: int = 1,
+    end_frame: Optional[int] = None,
+    columns: Optional[int] = None,
+    video_panel: Optional[int] = None,
+    workers: Optional[int] = None,
+    max_vectors: int = 15000,
+    encoder: str = vs.DEFAULT_ENCODER,
+    preset: str = vs.DEFAULT_PRESET,
+    style: str = "arrows",
+    overlay: bool = False,
+):
+    """Render the source video and any number of methods' motion vectors as a grid.
+
+    motion_sources are output files or already loaded dataframes. Frames are
+    numbered from 1 like the extractor output; start_frame..end_frame (inclusive,
+    capped at the last frame with content) is rendered, and a later start seeks
+    to the preceding keyframe and decodes forward instead of reading from
+    frame 1. The source is decoded once per
+    output frame, the canvas is allocated once and every panel is a view into
+    it. Method panels are drawn concurrently with each other and with decoding
+    the next source frame. style is one of mv.STYLES; with overlay the method
+    panels are drawn over the source frame instead of black.
+    """
+    video_capture = cv2.VideoCapture(input_video_filename)
+    if not video_capture.isOpened():
+        raise IOError(f"Cannot open video file {input_video_filename}")
+
+    try:
+        width = int(video_capture.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(video_capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        fps = video_capture.get(cv2.CAP_PROP_FPS) or 25
+        total_video_frames = int(video_capture.get(cv2.CAP_PROP_FRAME_COUNT))
+
+        start_frame = max(1, start_frame)
+        methods = [
+            MethodFrames(source, start_frame, end_frame or sys.maxsize)
+            for source in motion_sources
+        ]
+        available = max([total_video_frames] + [m.last_frame() for m in methods])
+        end_frame = min(end_frame, available) if end_frame else available
+
+        n_panels = len(methods) + 1
+        if video_panel is None:
+            video_panel = len(methods)
+        columns = columns or min(n_panels, 3)
+        rows = math.ceil(n_panels / columns)
+
+        canvas = np.zeros((rows * height, columns * width, 3), dtype=np.uint8)
+        panels = [
+            canvas[
+                (i // columns) * height : (i // columns + 1) * height,
+                (i % columns) * width : (i % columns + 1) * width,
+            ]
+            for i in range(n_panels)
+        ]
+        video_view = panels[video_panel]
+        method_views = panels[:video_panel] + panels[video_panel + 1 :]
+
+        # Two decode buffers: the next frame is decoded while this one is drawn
+        buffers = [np.empty((height, width, 3), dtype=np.uint8) for _ in range(2)]
+
+        def read(index: int) -> bool:
+            if index > total_video_frames:
+                return False
+            ok, _ = video_capture.read(buffers[index % 2])
+            return ok
+
+        if start_frame > 1:
+            video_capture.set(cv2.CAP_PROP_POS_FRAMES, start_frame - 1)
+
+        writer = vs.open_video_sink(output_path, canvas.shape[1], canvas.shape[0], fps, encoder, preset)
+        try:
+            with ThreadPoolExecutor(max_workers=workers or min(len(methods) + 1, os.cpu_count() or 1)) as pool:
+                pending_read = pool.submit(read, start_frame)
+                for frame_number in tqdm(range(start_frame, end_frame + 1), desc="Rendering grid frames"):
+                    has_video = pending_read.result()
+                    if frame_number < end_frame:
+                        pending_read = pool.submit(read, frame_number + 1)
+
+                    background = buffers[frame_number % 2] if overlay and has_video else None
+                    jobs = [
+                        pool.submit(
+                            _render_panel, view, method, frame_number, max_vectors, style, background
+                        )
+                        for view, method in zip(method_views, methods)
+                    ]
+                    if has_video:
+                        np.copyto(video_view, buffers[frame_number % 2])
+                    else:
+                        video_view.fill(0)
+                    for job in jobs:
+                        job.result()
+
+                    for c in range(1, columns):
+                        cv2.line(canvas, (c * width, 0), (c * width, canvas.shape[0]), (128, 128, 128), 1)
+                    for r in range(1, rows):
+                        cv2.line(canvas, (0, r * height), (canvas.shape[1], r * height), (128, 128, 128), 1)
+
+                    writer.write(canvas)
+        finally:
+            writer.release()
+        return output_path
+
+    finally:
+        video_capture.release()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 4:
+        print(
+            "Usage: python grid_video.py [video_file] [output.mp4] [mv_file ...] "
+            "[start=1] [end=] [columns=] [video_panel=] [workers=] [encoder=] [preset=] "
+            "[style=arrows|heatmap] [overlay=0|1]"
+        )
+        sys.exit(1)
+
+    files = [arg for arg in sys.argv[3:] if "=" not in arg]
+    settings = dict(arg.split("=", 1) for arg in sys.argv[3:] if "=" in arg)
+
+    def optional_int(key):
+        return int(settings[key]) if settings.get(key) else None
+
+    output_file_path = create_grid_video(
+        sys.argv[1],
+        files,
+        sys.argv[2],
+        start_frame=int(settings.get("start", 1)),
+        end_frame=optional_int("end"),
+        columns=optional_int("columns"),
+        video_panel=optional_int("video_panel"),
+        workers=optional_int("workers"),
+        encoder=settings.get("encoder", vs.DEFAULT_ENCODER),
+        preset=settings.get("preset", vs.DEFAULT_PRESET),
+        style=settings.get("style", "arrows"),
+        overlay=settings.get("overlay", "0") != "0",
+    )
+    print(f"Grid video saved as {output_file_path}")
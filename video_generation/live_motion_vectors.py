@@ -0,0 +1,155 @@
+import sys
+import time
+import numpy as np
+import cv2
+from typing import Optional
+
+import motion_vector as mv
+import video_sink as vs
+
+
+class FrameBudget:
+    """Decides which of the frames available right now get rendered.
+
+    At most one second of backlog is kept (a renderer started late jumps to
+    the live edge). When one render takes longer than a frame interval at fps,
+    only the share of frames that fits is rendered, evenly spaced and always
+    including the newest, so the output keeps up with the extraction.
+    """
+
+    def __init__(self, fps: float):
+        self.frame_ms = 1000.0 / fps
+        self.max_backlog = max(1, int(fps))
+        self.render_ms = 0.0  # moving average of one render
+        self.dropped = 0
+
+    def select(self, frames):
+        keep = frames[-self.max_backlog :]
+        if self.render_ms > self.frame_ms:
+            fit = max(1, int(len(keep) * self.frame_ms / self.render_ms))
+            picks = np.linspace(len(keep) - 1, 0, fit).round().astype(int)[::-1]
+            keep = [keep[i] for i in picks]
+        self.dropped += len(frames) - len(keep)
+        return keep
+
+    def record(self, elapsed_ms: float):
+        self.render_ms = elapsed_ms if not self.render_ms else 0.8 * self.render_ms + 0.2 * elapsed_ms
+
+
+def render_live(
+    mv_file: str,
+    output: str,
+    video_file: Optional[str] = None,
+    fps: float = 25.0,
+    width: int = 1920,
+    height: int = 1080,
+    max_vectors: int = 15000,
+    idle_timeout: float = 5.0,
+    encoder: str = vs.DEFAULT_ENCODER,
+    preset: str = vs.DEFAULT_PRESET,
+    style: str = "arrows",
+):
+    """Render motion vectors of an extraction that is still running.
+
+    output is an .mp4 path for a rolling overlay video or "preview" for a
+    window. With video_file the vectors are drawn over the matching source
+    frames, otherwise over a black canvas. style is one of mv.STYLES.
+    """
+    capture = None
+    video_pos = 0
+    if video_file:
+        capture = cv2.VideoCapture(video_file)
+        if not capture.isOpened():
+            raise IOError(f"Cannot open video file {video_file}")
+        width = int(capture.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+
+    preview = output == "preview"
+    writer = None
+    if not preview:
+        writer = vs.open_video_sink(output, width, height, fps, encoder, preset)
+
+    follower = mv.MotionVectorFollower(mv_file, idle_timeout=idle_timeout)
+    budget = FrameBudget(fps)
+    canvas = np.zeros((height, width, 3), dtype=np.uint8)
+    video_frame = None
+    rendered = 0
+    next_due = time.monotonic()
+
+    try:
+        while not follower.finished:
+            frames = follower.poll()
+            if not frames:
+                time.sleep(follower.poll_interval)
+                continue
+
+            for frame_num, frame_data in budget.select(frames):
+                start = time.monotonic()
+
+                if capture is not None:
+                    # Skip ahead to the frame; dropped frames are only grabbed, not decoded
+                    while video_pos <= frame_num:
+                        if video_pos == frame_num:
+                            ok, video_frame = capture.read()
+                        else:
+                            ok = capture.grab()
+                        video_pos += 1
+                        if not ok:
+                            video_frame = None
+                            break
+                if video_frame is not None:
+                    np.copyto(canvas, video_frame)
+                else:
+                    canvas.fill(0)
+
+                alpha = 0.6 if video_frame is not None else None
+                mv.draw_motion(canvas, frame_data, style, max_vectors, alpha)
+                cv2.putText(
+                    canvas,
+                    f"Frame: {frame_num}  dropped: {budget.dropped}",
+                    (50, 50),
+                    cv2.FONT_HERSHEY_SIMPLEX,
+                    1.0,
+                    (255, 255, 255),
+                    2,
+                )
+
+                if preview:
+                    cv2.imshow("Motion vectors", canvas)
+                    if cv2.waitKey(1) & 0xFF == ord("q"):
+                        return
+                else:
+                    writer.write(canvas)
+                rendered += 1
+                budget.record((time.monotonic() - start) * 1000.0)
+
+                if preview:
+                    # Hold the preview at the target rate
+                    next_due = max(next_due + budget.frame_ms / 1000.0, time.monotonic())
+                    time.sleep(max(0.0, next_due - time.monotonic()))
+    finally:
+        if writer is not None:
+            writer.release()
+        if capture is not None:
+            capture.release()
+        if preview:
+            cv2.destroyAllWindows()
+        print(f"Rendered {rendered} frames, dropped {budget.dropped} to stay live.")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print(
+            "Usage: python live_motion_vectors.py "
+            "[mv_file (.csv, .csv.zst, .mvb)] [output.mp4 | preview] [video_file] [fps] [encoder] [style]"
+        )
+        sys.exit(1)
+
+    mv_file = sys.argv[1]
+    output = sys.argv[2]
+    video_file = sys.argv[3] if len(sys.argv) > 3 and sys.argv[3] else None
+    fps = float(sys.argv[4]) if len(sys.argv) > 4 else 25.0
+    encoder = sys.argv[5] if len(sys.argv) > 5 else vs.DEFAULT_ENCODER
+    style = sys.argv[6] if len(sys.argv) > 6 else "arrows"
+
+    render_live(mv_file, output, video_file, fps, encoder=encoder, style=style)
@@ -1,10 +1,230 @@
+import io
+import os
+import time
+from typing import Iterator, List, Optional, Tuple
+
 import numpy as np
 import pandas as pd
 import cv2
 
 
+# format=binary output: b"MVB1" followed by packed MotionVectorRecord rows
+# (extractors/writer.h), the CSV columns in the same order
+BINARY_MAGIC = b"MVB1"
+RECORD_DTYPE = np.dtype(
+    [
+        ("frame", "<i4"),
+        ("method_id", "<i4"),
+        ("source", "<i4"),
+        ("w", "u1"),
+        ("h", "u1"),
+        ("src_x", "<i2"),
+        ("src_y", "<i2"),
+        ("dst_x", "<i2"),
+        ("dst_y", "<i2"),
+        ("flags", "<u8"),
+        ("motion_x", "<i4"),
+        ("motion_y", "<i4"),
+        ("motion_scale", "<u2"),
+    ]
+)
+
+
+def records_to_dataframe(records: np.ndarray) -> pd.DataFrame:
+    return pd.DataFrame({name: records[name] for name in RECORD_DTYPE.names})
+
+
+def add_magnitude(df: pd.DataFrame) -> pd.DataFrame:
+    """Compute the vector length once per row when the data is read, for
+    reduce_motion_vectors and draw_motion_vectors to share."""
+    if "motion_x" in df.columns and "motion_y" in df.columns:
+        df["magnitude"] = np.hypot(df["motion_x"], df["motion_y"]).astype(np.float32)
+    return df
+
+
+def read_binary_motion_vectors(path: str) -> pd.DataFrame:
+    with open(path, "rb") as f:
+        if f.read(len(BINARY_MAGIC)) != BINARY_MAGIC:
+            raise ValueError(f"{path} is not a binary motion vector file")
+        records = np.frombuffer(f.read(), dtype=RECORD_DTYPE)
+    return records_to_dataframe(records)
+
+
+def open_motion_vectors(path: str) -> io.TextIOBase:
+    """Open an extractor output for reading; .zst files are decompressed as they are read.
+
+    The writer's format=zstd output is a sequence of zstd frames (one per
+    flush_frames video frames), so all frames are read, not only the first.
+    """
+    if str(path).endswith(".zst"):
+        import zstandard
+
+        reader = zstandard.ZstdDecompressor().stream_reader(
+            open(path, "rb"), read_across_frames=True, closefd=True
+        )
+        return io.TextIOWrapper(reader, encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
+
+
+def motion_vector_file(directory: str, method_id: int, stream: int = 0) -> str:
+    """Output of one method and stream in a results directory, compressed or not."""
+    base = os.path.join(str(directory), f"method{method_id}_output_{stream}.csv")
+    return base + ".zst" if os.path.exists(base + ".zst") else base
+
+
+def iter_motion_vector_frames(
+    path: str, chunksize: int = 200_000, usecols: Optional[list] = None
+) -> Iterator[Tuple[int, pd.DataFrame]]:
+    """Yield (frame, rows) one frame at a time without loading the whole file.
+
+    Rows are read in chunks; the last frame of a chunk is held back until the
+    next chunk shows it is complete.
+    """
+    pending = None
+    for chunk in _read_chunks(path, chunksize, usecols):
+        add_magnitude(chunk)
+        if pending is not None:
+            chunk = pd.concat([pending, chunk], ignore_index=True)
+        last = chunk["frame"].iloc[-1]
+        pending = chunk[chunk["frame"] == last]
+        for frame_num, frame_data in chunk[chunk["frame"] != last].groupby(
+            "frame", sort=False
+        ):
+            yield frame_num, frame_data
+    if pending is not None and not pending.empty:
+        yield pending["frame"].iloc[0], pending
+
+
+def _read_chunks(path: str, chunksize: int, usecols: Optional[list]) -> Iterator[pd.DataFrame]:
+    if str(path).endswith(".mvb"):
+        records = np.memmap(path, dtype=RECORD_DTYPE, mode="r", offset=len(BINARY_MAGIC))
+        for begin in range(0, len(records), chunksize):
+            chunk = records_to_dataframe(records[begin : begin + chunksize])
+            yield chunk[usecols] if usecols else chunk
+        return
+    with open_motion_vectors(path) as handle:
+        yield from pd.read_csv(handle, chunksize=chunksize, usecols=usecols)
+
+
+class MotionVectorFollower:
+    """Reads an extractor output while it is still being written (like tail -f).
+
+    Works on .csv, .csv.zst (complete zstd blocks, see flush_frames=) and .mvb
+    files. poll() returns the frames that became complete since the last call;
+    a frame is complete once a row of a later frame has been written, so the
+    newest frame is held back until the next one starts or the file has been
+    idle for idle_timeout seconds (the extraction is then taken as finished).
+    """
+
+    def __init__(self, path: str, poll_interval: float = 0.1, idle_timeout: float = 5.0):
+        self.path = str(path)
+        self.poll_interval = poll_interval
+        self.idle_timeout = idle_timeout
+        self.binary = self.path.endswith(".mvb")
+        self.compressed = self.path.endswith(".zst")
+        self.finished = False
+        self._file = None
+        self._pending = b""  # bytes after the last complete line / record
+        self._columns: Optional[List[str]] = None
+        self._held: Optional[pd.DataFrame] = None
+        self._last_data = time.monotonic()
+        self._zstd = None
+
+    def _open(self) -> bool:
+        if self._file is None:
+            try:
+                self._file = open(self.path, "rb")
+            except FileNotFoundError:
+                return False
+            if self.compressed:
+                import zstandard
+
+                self._zstd = zstandard.ZstdDecompressor()
+                self._decoder = self._zstd.decompressobj()
+        return True
+
+    def _read_new(self) -> bytes:
+        data = self._file.read()
+        if not self.compressed or not data:
+            return data
+        out = []
+        while data:
+            out.append(self._decoder.decompress(data))
+            if not self._decoder.eof:
+                break
+            # One zstd block ended; the next one needs a fresh decoder
+            data = self._decoder.unused_data
+            self._decoder = self._zstd.decompressobj()
+        return b"".join(out)
+
+    def _parse(self, data: bytes) -> Optional[pd.DataFrame]:
+        buf = self._pending + data
+        if self.binary:
+            if self._columns is None:
+                if len(buf) < len(BINARY_MAGIC):
+                    self._pending = buf
+                    return None
+                if buf[: len(BINARY_MAGIC)] != BINARY_MAGIC:
+                    raise ValueError(f"{self.path} is not a binary motion vector file")
+                buf = buf[len(BINARY_MAGIC) :]
+                self._columns = list(RECORD_DTYPE.names)
+            usable = len(buf) - len(buf) % RECORD_DTYPE.itemsize
+            self._pending = buf[usable:]
+            if not usable:
+                return None
+            return records_to_dataframe(np.frombuffer(buf[:usable], dtype=RECORD_DTYPE))
+
+        end = buf.rfind(b"\n") + 1
+        self._pending = buf[end:]
+        if not end:
+            return None
+        lines = buf[:end]
+        if self._columns is None:
+            header_end = lines.index(b"\n") + 1
+            self._columns = lines[:header_end].decode().strip().split(",")
+            lines = lines[header_end:]
+            if not lines:
+                return None
+        return pd.read_csv(io.BytesIO(lines), header=None, names=self._columns)
+
+    def poll(self) -> List[Tuple[int, pd.DataFrame]]:
+        if self.finished or not self._open():
+            return []
+
+        rows = self._parse(self._read_new())
+        now = time.monotonic()
+        if rows is not None and not rows.empty:
+            self._last_data = now
+            add_magnitude(rows)
+            if self._held is not None:
+                rows = pd.concat([self._held, rows], ignore_index=True)
+            last = rows["frame"].iloc[-1]
+            self._held = rows[rows["frame"] == last]
+            rows = rows[rows["frame"] != last]
+        elif now - self._last_data >= self.idle_timeout:
+            # Nothing new for a while: the writer is done, release the last frame
+            self.finished = True
+            rows, self._held = self._held, None
+            self._file.close()
+
+        if rows is None or rows.empty:
+            return []
+        return [(frame_num, frame_data) for frame_num, frame_data in rows.groupby("frame", sort=False)]
+
+    def __iter__(self) -> Iterator[Tuple[int, pd.DataFrame]]:
+        while not self.finished:
+            frames = self.poll()
+            yield from frames
+            if not frames:
+                time.sleep(self.poll_interval)
+
+
 def load_motion_vectors(csv_file: str) -> pd.DataFrame:
-    df = pd.read_csv(csv_file)
+    if str(csv_file).endswith(".mvb"):
+        df = read_binary_motion_vectors(csv_file)
+    else:
+        with open_motion_vectors(csv_file) as handle:
+            df = pd.read_csv(handle)
 
     # Verify and convert columns to numeric types
     expected_cols = [
@@ -36,24 +256,69 @@ def load_motion_vectors(csv_file: str) -> pd.DataFrame:
     if "motion_y" not in df.columns:
         df["motion_y"] = df["dst_y"] - df["src_y"]
 
-    return df.reset_index(drop=True)
+    return add_magnitude(df.reset_index(drop=True))
 
 
-def reduce_motion_vectors(frame_data: pd.DataFrame, max_vectors: int = 10000):
-    # Calculate motion magnitude
-    mag = np.hypot(frame_data["motion_x"], frame_data["motion_y"])
-    frame_data = frame_data.copy()
-    frame_data["magnitude"] = mag
+def _magnitude(frame_data: pd.DataFrame) -> np.ndarray:
+    if "magnitude" in frame_data.columns:
+        return frame_data["magnitude"].to_numpy()
+    return np.hypot(frame_data["motion_x"].to_numpy(), frame_data["motion_y"].to_numpy())
 
-    # Keep only significant motion (magnitude > 2 pixels)
-    significant = frame_data[mag > 2]
 
-    # If still too many, sample by magnitude
-    if len(significant) > max_vectors:
-        # Sort by magnitude and keep the largest motions
-        significant = significant.nlargest(max_vectors, "magnitude")
+def cell_quota(counts: np.ndarray, budget: int) -> int:
+    """Largest per-cell cap q with sum(min(count, q)) <= budget. Cells with
+    fewer vectors than q keep them all, so their unused share goes to the
+    crowded cells."""
+    low, high = 0, int(counts.max())
+    while low < high:
+        q = (low + high + 1) // 2
+        if np.minimum(counts, q).sum() <= budget:
+            low = q
+        else:
+            high = q - 1
+    return low
 
-    return significant
+
+def reduce_motion_vectors(frame_data: pd.DataFrame, max_vectors: int = 10000, cell: int = 128):
+    """Level-of-detail reduction to at most max_vectors significant vectors.
+
+    Vectors shorter than 2 px are dropped (they are not drawn). If more remain,
+    the frame is split into cell x cell pixel cells that share the budget, and
+    each cell keeps its longest vectors (argpartition, no full sort). Dense
+    motion in one region then cannot crowd out the rest of the frame. Rows keep
+    their original order.
+    """
+    mag = _magnitude(frame_data)
+    significant = np.flatnonzero(mag > 2)
+    if max_vectors <= 0:
+        return frame_data.iloc[:0]
+    if len(significant) <= max_vectors:
+        return frame_data.iloc[significant]
+
+    src_x = frame_data["src_x"].to_numpy()[significant]
+    src_y = frame_data["src_y"].to_numpy()[significant]
+    cols = int(src_x.max()) // cell + 1
+    cells = (np.maximum(src_y, 0) // cell * cols + np.maximum(src_x, 0) // cell).astype(np.int64)
+
+    # Group rows by cell; a stable sort of small integers is a radix sort in numpy
+    order = np.argsort(cells.astype(np.uint16) if cells.max() < 1 << 16 else cells, kind="stable")
+    counts = np.bincount(cells)
+    quota = cell_quota(counts, max_vectors)
+    caps = np.minimum(counts, quota)
+    # The budget left below the next whole quota goes to the most crowded cells
+    over = np.flatnonzero(counts > quota)
+    left = max_vectors - int(caps.sum())
+    caps[over[np.argsort(-counts[over], kind="stable")[:left]]] += 1
+    bounds = np.concatenate([[0], np.cumsum(counts)])
+
+    keep = []
+    for c in np.flatnonzero(caps):
+        rows = order[bounds[c] : bounds[c + 1]]
+        if len(rows) > caps[c]:
+            rows = rows[np.argpartition(-mag[significant[rows]], caps[c] - 1)[: caps[c]]]
+        keep.append(rows)
+    selected = significant[np.sort(np.concatenate(keep))]
+    return frame_data.iloc[selected]
 
 
 def draw_motion_vectors(img: np.ndarray, frame_data: pd.DataFrame):
@@ -61,10 +326,7 @@ def draw_motion_vectors(img: np.ndarray, frame_data: pd.DataFrame):
     src_y = frame_data["src_y"].values.astype(int)
     dst_x = frame_data["dst_x"].values.astype(int)
     dst_y = frame_data["dst_y"].values.astype(int)
-    motion_x = frame_data["motion_x"].values
-    motion_y = frame_data["motion_y"].values
-
-    mag = np.hypot(motion_x, motion_y)
+    mag = _magnitude(frame_data)
 
     valid_magnitude_mask = mag >= 2
 
@@ -86,3 +348,89 @@ def draw_motion_vectors(img: np.ndarray, frame_data: pd.DataFrame):
         cv2.circle(img, (src_x[idx], src_y[idx]), 1, (255, 255, 255), -1)
 
     return img
+
+
+# Visualization styles: one arrow per vector, or a per-block flow heatmap
+STYLES = ("arrows", "heatmap")
+
+
+def motion_grid(frame_data: pd.DataFrame, width: int, height: int, block: int = 16):
+    """Mean displacement (dst - src) and vector count of each block x block cell.
+
+    Vectors are binned by destination with np.bincount, so the cost grows with
+    the vector count only linearly and with no per-vector drawing.
+    """
+    cols = -(-width // block)
+    rows = -(-height // block)
+    dst_x = frame_data["dst_x"].to_numpy(dtype=np.int64)
+    dst_y = frame_data["dst_y"].to_numpy(dtype=np.int64)
+    dx = dst_x - frame_data["src_x"].to_numpy(dtype=np.int64)
+    dy = dst_y - frame_data["src_y"].to_numpy(dtype=np.int64)
+
+    cell = np.clip(dst_y // block, 0, rows - 1) * cols + np.clip(dst_x // block, 0, cols - 1)
+    count = np.bincount(cell, minlength=rows * cols)
+    scale = 1.0 / np.maximum(count, 1)
+    mean_x = np.bincount(cell, weights=dx, minlength=rows * cols) * scale
+    mean_y = np.bincount(cell, weights=dy, minlength=rows * cols) * scale
+    return (
+        mean_x.reshape(rows, cols),
+        mean_y.reshape(rows, cols),
+        count.reshape(rows, cols),
+    )
+
+
+def draw_motion_heatmap(
+    img: np.ndarray,
+    frame_data: pd.DataFrame,
+    block: int = 16,
+    max_magnitude: float = 20.0,
+    alpha: Optional[float] = None,
+):
+    """Draw the block grid as an HSV flow map: hue is the direction, brightness
+    the magnitude (full at max_magnitude pixels, the arrows' red threshold).
+
+    alpha None replaces img; otherwise blocks with vectors are blended over it.
+    """
+    height, width = img.shape[:2]
+    mean_x, mean_y, count = motion_grid(frame_data, width, height, block)
+    magnitude, angle = cv2.cartToPolar(
+        mean_x.astype(np.float32), mean_y.astype(np.float32), angleInDegrees=True
+    )
+
+    hsv = np.empty(mean_x.shape + (3,), dtype=np.uint8)
+    hsv[..., 0] = (angle / 2).astype(np.uint8)  # OpenCV hue is 0-179
+    hsv[..., 1] = 255
+    hsv[..., 2] = np.clip(magnitude * (255.0 / max_magnitude), 0, 255).astype(np.uint8)
+    hsv[..., 2][count == 0] = 0
+
+    grid_size = (mean_x.shape[1] * block, mean_x.shape[0] * block)
+    heat = cv2.resize(
+        cv2.cvtColor(hsv, cv2.COLOR_HSV2BGR), grid_size, interpolation=cv2.INTER_NEAREST
+    )[:height, :width]
+
+    if alpha is None:
+        np.copyto(img, heat)
+    else:
+        covered = cv2.resize(
+            (count > 0).astype(np.uint8), grid_size, interpolation=cv2.INTER_NEAREST
+        )[:height, :width].astype(bool)
+        blended = cv2.addWeighted(img, 1.0 - alpha, heat, alpha, 0.0)
+        np.copyto(img, blended, where=covered[..., None])
+    return img
+
+
+def draw_motion(
+    img: np.ndarray,
+    frame_data: pd.DataFrame,
+    style: str = "arrows",
+    max_vectors: int = 15000,
+    alpha: Optional[float] = None,
+):
+    """Draw one frame's vectors in one of STYLES; alpha only applies to the heatmap."""
+    if style == "heatmap":
+        return draw_motion_heatmap(img, frame_data, alpha=alpha)
+    if style != "arrows":
+        raise ValueError(f"Unknown style '{style}', expected one of {STYLES}")
+    if len(frame_data) > max_vectors:
+        frame_data = reduce_motion_vectors(frame_data, max_vectors)
+    return draw_motion_vectors(img, frame_data)
@@ -0,0 +1,212 @@
+import functools
+import queue
+import shutil
+import subprocess
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional
+
+import cv2
+import numpy as np
+
+# ffmpeg of the patched build (see CUSTOM_PREFIX in the makefile)
+PROJECT_FFMPEG = (
+    Path(__file__).resolve().parent.parent / "ffmpeg" / "FFmpeg-8.0-custom" / "bin" / "ffmpeg"
+)
+
+# "auto" picks the first of AUTO_ENCODERS this host can run (see resolve_encoder)
+DEFAULT_ENCODER = "auto"
+DEFAULT_PRESET = "veryfast"
+
+# Encoders fed through a pipe. libx264 is not enabled in the project build, so
+# "x264" uses the ffmpeg on PATH; "project" uses the project's own build with
+# its native (slice-threaded) MPEG-4 encoder.
+FFMPEG_ENCODERS = {
+    "x264": {"tool": "path", "args": ["-c:v", "libx264", "-pix_fmt", "yuv420p"], "preset": True},
+    "project": {"tool": "project", "args": ["-c:v", "mpeg4", "-q:v", "4", "-pix_fmt", "yuv420p"]},
+}
+
+# "none" discards frames (render-only baseline), "mp4v" is cv2.VideoWriter
+ENCODERS = ["auto", "none", "mp4v", *FFMPEG_ENCODERS]
+
+# Preference order of "auto"; mp4v only needs cv2
+AUTO_ENCODERS = ["x264", "project", "mp4v"]
+
+
+def find_ffmpeg(tool: str) -> str:
+    """ffmpeg binary for an encoder: "path" prefers PATH, "project" the project build."""
+    candidates = [shutil.which("ffmpeg"), PROJECT_FFMPEG]
+    if tool == "project":
+        candidates.reverse()
+    for candidate in candidates:
+        if candidate and Path(candidate).is_file():
+            return str(candidate)
+    raise FileNotFoundError(f"ffmpeg not found in {PROJECT_FFMPEG.parent} or PATH")
+
+
+@functools.lru_cache(maxsize=None)
+def _has_encoder(ffmpeg: str, codec: str) -> bool:
+    try:
+        result = subprocess.run(
+            [ffmpeg, "-hide_banner", "-encoders"], capture_output=True, text=True, timeout=30
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return False
+    return any(line.split()[1:2] == [codec] for line in result.stdout.splitlines())
+
+
+def encoder_available(encoder: str) -> bool:
+    """Whether the ffmpeg an encoder would use has its codec (always True for none and mp4v)."""
+    if encoder not in FFMPEG_ENCODERS:
+        return encoder in ENCODERS and encoder != "auto"
+    spec = FFMPEG_ENCODERS[encoder]
+    try:
+        ffmpeg = find_ffmpeg(spec["tool"])
+    except FileNotFoundError:
+        return False
+    return _has_encoder(ffmpeg, spec["args"][spec["args"].index("-c:v") + 1])
+
+
+def resolve_encoder(encoder: str) -> str:
+    """The encoder to use for "auto": x264 when an ffmpeg with libx264 is found,
+    else the project build's MPEG-4, else cv2's mp4v. Other names are returned as given."""
+    if encoder != "auto":
+        return encoder
+    return next(e for e in AUTO_ENCODERS if encoder_available(e))
+
+
+class NullSink:
+    """Discards frames, to time rendering alone."""
+
+    def __init__(self):
+        self.frames = 0
+        self.blocked_s = 0.0
+
+    def write(self, frame: np.ndarray):
+        self.frames += 1
+
+    def release(self):
+        pass
+
+
+class FfmpegSink:
+    """Streams raw BGR frames to an ffmpeg process.
+
+    write() copies the frame into a bounded queue and returns; a thread feeds
+    the queue to ffmpeg's stdin, so rendering the next frame overlaps with
+    encoding the previous ones. When the encoder falls queue_frames behind,
+    write() blocks (blocked_s) instead of buffering without limit.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        width: int,
+        height: int,
+        fps: float,
+        codec_args: List[str],
+        ffmpeg: str,
+        preset: Optional[str] = None,
+        queue_frames: int = 8,
+    ):
+        self.shape = (height, width, 3)
+        cmd = [
+            ffmpeg,
+            "-hide_banner",
+            "-loglevel",
+            "error",
+            "-y",
+            "-f",
+            "rawvideo",
+            "-pix_fmt",
+            "bgr24",
+            "-s",
+            f"{width}x{height}",
+            "-r",
+            str(fps),
+            "-i",
+            "-",
+            "-an",
+            # 4:2:0 needs even dimensions
+            "-vf",
+            "pad=ceil(iw/2)*2:ceil(ih/2)*2",
+            *codec_args,
+        ]
+        if preset:
+            cmd += ["-preset", preset]
+        cmd.append(str(path))
+
+        self.process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+        self.queue: queue.Queue = queue.Queue(maxsize=queue_frames)
+        self.error: Optional[Exception] = None
+        self.frames = 0
+        self.blocked_s = 0.0
+        self.thread = threading.Thread(target=self._feed, daemon=True)
+        self.thread.start()
+
+    def _feed(self):
+        while True:
+            data = self.queue.get()
+            if data is None:
+                break
+            if self.error is None:
+                try:
+                    self.process.stdin.write(data)
+                except OSError as error:
+                    self.error = error  # ffmpeg exited; keep draining the queue
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
+
+    def write(self, frame: np.ndarray):
+        if self.error is not None:
+            self.release()
+        if frame.shape != self.shape or frame.dtype != np.uint8:
+            raise ValueError(f"Expected a {self.shape} uint8 frame, got {frame.shape} {frame.dtype}")
+
+        # A copy: callers reuse their canvas for the next frame
+        data = frame.tobytes()
+        start = time.perf_counter()
+        self.queue.put(data)
+        self.blocked_s += time.perf_counter() - start
+        self.frames += 1
+
+    def release(self):
+        if self.process.returncode is not None:
+            return
+        self.queue.put(None)
+        self.thread.join()
+        stderr = self.process.stderr.read().decode(errors="replace").strip()
+        if self.process.wait() != 0:
+            raise RuntimeError(f"ffmpeg exited with code {self.process.returncode}: {stderr}")
+
+
+def open_video_sink(
+    path: str,
+    width: int,
+    height: int,
+    fps: float,
+    encoder: str = DEFAULT_ENCODER,
+    preset: str = DEFAULT_PRESET,
+):
+    """Return a writer with write(frame) and release() for one of ENCODERS."""
+    encoder = resolve_encoder(encoder)
+    if encoder == "none":
+        return NullSink()
+    if encoder == "mp4v":
+        return cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    if encoder not in FFMPEG_ENCODERS:
+        raise ValueError(f"Unknown encoder '{encoder}', expected one of {ENCODERS}")
+
+    spec = FFMPEG_ENCODERS[encoder]
+    return FfmpegSink(
+        path,
+        width,
+        height,
+        fps,
+        spec["args"],
+        find_ffmpeg(spec["tool"]),
+        preset=preset if spec.get("preset") else None,
+    )